@@ -0,0 +1,92 @@
+"""Type annotation helpers that don't depend on GI
+
+These are shared by the backends that read introspection data without
+importing gi, so nothing here may import it.
+"""
+
+import enum
+
+from .ir import Subscript, TypeRef
+
+
+class GTypeTag(enum.IntEnum):
+    """Type tags, with the same values as GI's GITypeTag"""
+
+    ARRAY = 15
+    BOOLEAN = 1
+    DOUBLE = 11
+    ERROR = 20
+    FILENAME = 14
+    FLOAT = 10
+    GHASH = 19
+    GLIST = 17
+    GSLIST = 18
+    GTYPE = 12
+    INT16 = 4
+    INT32 = 6
+    INT64 = 8
+    INT8 = 2
+    INTERFACE = 16
+    UINT16 = 5
+    UINT32 = 7
+    UINT64 = 9
+    UINT8 = 3
+    UNICHAR = 21
+    UTF8 = 13
+    VOID = 0
+
+    @classmethod
+    def from_typeinfo(cls, typeinfo):
+        type_tag = typeinfo.get_tag()
+        return cls(type_tag)
+
+    def as_pytype(self):
+        mapping = {
+            GTypeTag.ARRAY: list,
+            GTypeTag.BOOLEAN: bool,
+            GTypeTag.DOUBLE: float,
+            GTypeTag.ERROR: TypeRef('gi.repository.GLib', 'Error'),
+            GTypeTag.FILENAME: str,
+            GTypeTag.FLOAT: float,
+            GTypeTag.GHASH: dict,
+            GTypeTag.GLIST: list,
+            GTypeTag.GSLIST: list,
+            GTypeTag.GTYPE: TypeRef('gi.repository.GObject', 'GType'),
+            GTypeTag.INT16: int,
+            GTypeTag.INT32: int,
+            GTypeTag.INT64: int,
+            GTypeTag.INT8: int,
+            # We shouldn't typing.Any here, but currently this occurs
+            # only once in a context in which GTypeTag is used, and
+            # it's not worth the additional introspection complication.
+            GTypeTag.INTERFACE: 'typing.Any',
+            GTypeTag.UINT16: int,
+            GTypeTag.UINT32: int,
+            GTypeTag.UINT64: int,
+            GTypeTag.UINT8: int,
+            GTypeTag.UNICHAR: str,
+            GTypeTag.UTF8: str,
+            GTypeTag.VOID: None,
+        }
+        return mapping[self]
+
+
+def combine_return_types(return_types, *, strip_bool_result=False):
+    """Combine a return value and any OUT parameters into one annotation"""
+
+    # If the function was wrapped with the strip_bool_result decorator
+    # then we just remove the first return type to emulate that.
+    if strip_bool_result:
+        if return_types[0] != bool:
+            raise RuntimeError('Tried to strip a non-boolean return type')
+        return_types = return_types[1:]
+        if not return_types:
+            raise RuntimeError('No returns left after boolean stripping')
+
+    if len(return_types) == 1:
+        return return_types[0]
+
+    # Remove None returns in a list; these are functions with OUT
+    # params that have gained a real Python return type.
+    return_types = [r for r in return_types if r is not None]
+    return Subscript('typing.Tuple', return_types)
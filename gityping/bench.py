@@ -0,0 +1,246 @@
+"""Benchmarks for stub generation
+
+Each repetition for a namespace runs in a freshly spawned process, so
+that importing the namespace is measured cold and peak RSS reflects
+just that namespace. Generation is split into phases:
+
+ * import: pinning versions and loading the namespace
+ * load: the backend's attribute loading
+ * build: building the stub records from the loaded attributes
+ * render: rendering the records as a stub
+ * write: writing the stub to a scratch directory
+
+Layouts (see `gityping.package`) are compared by generating stubs in
+each of them for a sample project that uses a few classes from each
+namespace, and timing a cold run of a type checker over the project.
+"""
+
+import math
+import multiprocessing
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from . import __version__
+from .ir import Class
+
+
+#: Phases timed for each repetition, in order
+PHASES = ('import', 'load', 'build', 'render', 'write')
+
+
+def time_namespace(name, backend):
+    """Generate a namespace's stub once, timing each phase
+
+    This is run in a fresh worker process for every repetition.
+    """
+    from .const import GI_FREE_BACKENDS
+    from .ir import Module
+    from .main import get_backend, require_versions
+    from .render import render_module
+    from .writer import StubWriter
+
+    timings = {}
+
+    start = time.perf_counter()
+    if backend not in GI_FREE_BACKENDS:
+        require_versions()
+    generator = get_backend(backend)
+    module = generator.load_namespace(name)
+    timings['import'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    attrs = generator.load_module_attrs(module)
+    timings['load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    records = list(generator.generate_attr_records(module, attrs))
+    timings['build'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stub = render_module(Module(module.__name__, records))
+    timings['render'] = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as stub_dir:
+        start = time.perf_counter()
+        StubWriter(Path(stub_dir)).write_stub(module.__name__, stub)
+        timings['write'] = time.perf_counter() - start
+
+    # Only report the pygobject version if it was actually used
+    gi = sys.modules.get('gi')
+    gi_version = getattr(gi, '__version__', None)
+
+    # ru_maxrss is in KiB on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return timings, peak_rss, gi_version
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def summarise(values):
+    return {
+        'median': statistics.median(values),
+        'p95': percentile(values, 0.95),
+    }
+
+
+def run_benchmarks(names, *, backend='module', repetitions=5, warmup=1):
+    """Benchmark stub generation for the given namespaces
+
+    Returns a JSON-serialisable dictionary of per-namespace phase
+    timings (in seconds) and peak RSS (in KiB), summarised as median
+    and 95th percentile over `repetitions` runs, after discarding
+    `warmup` runs.
+    """
+    results = {
+        'gityping': __version__,
+        'backend': backend,
+        'repetitions': repetitions,
+        'warmup': warmup,
+        'namespaces': {},
+    }
+
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=1, maxtasksperchild=1) as pool:
+        for name in names:
+            runs = [
+                pool.apply(time_namespace, (name, backend))
+                for i in range(warmup + repetitions)
+            ][warmup:]
+
+            namespace_results = {}
+            for phase in PHASES:
+                namespace_results[phase] = summarise(
+                    [timings[phase] for timings, _, _ in runs])
+            namespace_results['total'] = summarise(
+                [sum(timings.values()) for timings, _, _ in runs])
+            namespace_results['peak_rss_kib'] = summarise(
+                [peak_rss for _, peak_rss, _ in runs])
+
+            results['pygobject'] = runs[0][2]
+            results['namespaces'][name] = namespace_results
+
+    return results
+
+
+#: Classes from each namespace that the sample project uses
+SAMPLE_CLASSES = 3
+
+
+def pick_sample_classes(module, count=SAMPLE_CLASSES):
+    """Pick classes spread across a module record's members"""
+    classes = [
+        record.name for attr_name, record in module.members
+        if isinstance(record, Class)
+    ]
+    step = max(len(classes) // count, 1)
+    return classes[::step][:count]
+
+
+def format_sample_project(samples):
+    """Write a sample module using the given `(namespace, class)` pairs"""
+    namespaces = sorted({name for name, cls in samples})
+    lines = ["from gi.repository import {}".format(", ".join(namespaces))]
+    for index, (name, cls) in enumerate(samples):
+        lines.extend([
+            "",
+            "",
+            "def use_{}(value: {}.{}) -> None:".format(index, name, cls),
+            "    print(value)",
+        ])
+    return "\n".join(lines) + "\n"
+
+
+def write_sample_projects(names, project_base, backend):
+    """Write a sample project for each layout, with stubs for `names`
+
+    Returns the project directories by layout.
+    """
+    from .const import GI_FREE_BACKENDS, LAYOUTS
+    from .main import get_backend, require_versions
+    from .package import render_namespace
+    from .writer import StubWriter
+
+    if backend not in GI_FREE_BACKENDS:
+        require_versions()
+    generator = get_backend(backend)
+
+    projects = {layout: project_base / layout for layout in LAYOUTS}
+    writers = {
+        layout: StubWriter(project / 'typings', layout)
+        for layout, project in projects.items()
+    }
+
+    samples = []
+    for name in names:
+        module = generator.build_module(generator.load_namespace(name))
+        samples.extend(
+            (name, cls) for cls in pick_sample_classes(module))
+        for layout, writer in writers.items():
+            writer.write_namespace(
+                module.name, render_namespace(module, layout))
+
+    sample = format_sample_project(samples)
+    for project in projects.values():
+        (project / 'sample.py').write_text(sample)
+    return projects
+
+
+def time_checker(command, project):
+    env = dict(os.environ, MYPYPATH=str(project / 'typings'))
+    start = time.perf_counter()
+    subprocess.run(
+        command, cwd=str(project), env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def run_layout_benchmarks(
+        names, *, checker='mypy', backend='module', repetitions=5,
+        warmup=1):
+    """Benchmark a type checker on a sample project for each layout
+
+    Returns a JSON-serialisable dictionary of checker wall times (in
+    seconds) by layout, summarised as median and 95th percentile over
+    `repetitions` runs, after discarding `warmup` runs. Raises
+    FileNotFoundError if the checker isn't installed.
+    """
+    from .const import CHECKERS
+
+    command = list(CHECKERS[checker])
+    executable = shutil.which(command[0])
+    if executable is None:
+        raise FileNotFoundError(
+            'Type checker {} is not installed'.format(checker))
+    command[0] = executable
+
+    results = {
+        'gityping': __version__,
+        'checker': checker,
+        'backend': backend,
+        'repetitions': repetitions,
+        'warmup': warmup,
+        'namespaces': list(names),
+        'layouts': {},
+    }
+
+    with tempfile.TemporaryDirectory() as project_base:
+        projects = write_sample_projects(names, Path(project_base), backend)
+        for layout, project in projects.items():
+            times = [
+                time_checker(command, project)
+                for i in range(warmup + repetitions)
+            ][warmup:]
+            results['layouts'][layout] = summarise(times)
+
+    return results
@@ -0,0 +1,128 @@
+"""Fingerprints for skipping regeneration of unchanged namespaces
+
+A namespace's stub only depends on the typelibs of the namespace and of
+everything it (transitively) depends on, on their pygobject overrides
+modules (which e.g. supply parent classes from GObject), on pygobject
+and on gityping's own source, so we hash those and keep the result
+alongside the generated stubs. A change to a dependency then also
+regenerates its dependents. Computing a fingerprint only requires
+reading the typelibs' headers; we never require the namespaces with GI,
+which would pin their versions in this process, and never import the
+Python modules. For the GIR backend, the GIR files of the namespace and
+its dependencies are hashed instead of their typelibs.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from . import __version__
+from .const import GI_FREE_BACKENDS
+
+
+log = logging.getLogger(__name__)
+
+#: Name of the fingerprint cache file in the stubs base directory
+CACHE_FILENAME = '.gityping-cache.json'
+
+
+def get_dependency_names(name: str, version: str, backend: str = 'module'):
+    """Get a namespace's name, followed by all of its dependencies'"""
+    if backend == 'gir':
+        from .gir import get_gir_paths
+
+        return [
+            gir_path.stem.rsplit('-', 1)[0]
+            for gir_path in get_gir_paths(name, version)
+        ]
+
+    from .typelib import get_typelib_closure
+
+    return [
+        typelib.namespace for typelib in get_typelib_closure(name, version)]
+
+
+def get_overrides_path(name: str):
+    from .overrides import find_overrides
+
+    overrides_path = find_overrides(name)
+    return str(overrides_path) if overrides_path else None
+
+
+def get_overrides_paths(name: str, version: str, backend: str = 'module'):
+    """Get the overrides of a namespace and all of its dependencies"""
+    overrides_paths = (
+        get_overrides_path(n)
+        for n in get_dependency_names(name, version, backend))
+    return [path for path in overrides_paths if path]
+
+
+def get_source_paths(name: str, version: str, backend: str):
+    """Get the files that a namespace's stub is generated from"""
+    if backend == 'gir':
+        from .gir import get_gir_paths
+
+        source_paths = get_gir_paths(name, version)
+    else:
+        from .typelib import get_typelib_paths
+
+        source_paths = get_typelib_paths(name, version)
+    return source_paths + get_overrides_paths(name, version, backend)
+
+
+@functools.lru_cache()
+def get_generator_digest() -> str:
+    """Get a digest of gityping's own source, which every stub depends on
+
+    Unlike `__version__`, this changes whenever the generator does.
+    """
+    digest = hashlib.sha256()
+    package_path = Path(__file__).parent
+    for source_path in sorted(package_path.glob('*.py')):
+        digest.update('{}\0'.format(source_path.name).encode())
+        digest.update(source_path.read_bytes())
+    return digest.hexdigest()
+
+
+def namespace_fingerprint(
+        name: str, version: str, backend: str = 'module',
+        compact: bool = False) -> str:
+    fingerprint = hashlib.sha256()
+    fingerprint.update('gityping {} {} ({}{})\0'.format(
+        __version__, get_generator_digest(), backend,
+        ', compact' if compact else '').encode())
+    fingerprint.update('{}-{}\0'.format(name, version).encode())
+    if backend not in GI_FREE_BACKENDS:
+        import gi
+
+        fingerprint.update('pygobject {}\0'.format(gi.__version__).encode())
+
+    for index, source_path in enumerate(
+            get_source_paths(name, version, backend)):
+        if index:
+            fingerprint.update(b'\0')
+        fingerprint.update(Path(source_path).read_bytes())
+
+    return fingerprint.hexdigest()
+
+
+def load_fingerprints(stubs_base_path: Path) -> dict:
+    cache_file = stubs_base_path / CACHE_FILENAME
+    try:
+        with cache_file.open() as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        log.warning('Ignoring corrupt fingerprint cache {}: {}'.format(
+            cache_file, e))
+        return {}
+
+
+def save_fingerprints(stubs_base_path: Path, fingerprints: dict):
+    stubs_base_path.mkdir(parents=True, exist_ok=True)
+    cache_file = stubs_base_path / CACHE_FILENAME
+    with cache_file.open('w') as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
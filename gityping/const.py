@@ -10,6 +10,48 @@ ATTR_IGNORE_LIST = [
     'widget',
 ]
 
+#: pygobject's static classes, e.g. enum bases, which GObject exports but
+#: which have no introspection data; the GI-free backends stub them as
+#: empty classes
+GOBJECT_STATIC_CLASSES = (
+    'GBoxed', 'GEnum', 'GFlags', 'GInterface', 'GPointer', 'GType')
+
+#: The types of the attributes that pygobject gives every namespace's
+#: module, which the GI-free backends stub without the module
+PYGI_MODULE_ATTRS = {'_namespace': 'str', '_version': 'str'}
+
+#: Stub generation backends, mapped to the module implementing them
+BACKENDS = {
+    # Stubs from the classes pygobject creates for each attribute
+    'module': 'gityping.gityping',
+    # Stubs directly from GIRepository infos
+    'repository': 'gityping.repository',
+    # Stubs from GIR XML, without importing gi
+    'gir': 'gityping.gir',
+    # Stubs from memory-mapped typelibs, without importing gi
+    'typelib': 'gityping.typelib',
+}
+
+#: Backends that never import gi, and so don't need versions pinned
+GI_FREE_BACKENDS = {'gir', 'typelib'}
+
+#: Output layouts for a namespace's stub; see `gityping.package`
+LAYOUTS = ('module', 'package')
+
+#: Kinds of request that the stub server answers; see `gityping.server`
+REQUEST_KINDS = ('namespace', 'class', 'signature', 'metrics')
+
+#: Type checker commands for benchmarking layouts, run in a project
+#: directory with the stubs in its `typings` subdirectory (pyright's
+#: default stub path, and given to mypy as MYPYPATH)
+CHECKERS = {
+    'mypy': (
+        'mypy', '--no-incremental', '--follow-imports=silent',
+        '--config-file=', 'sample.py',
+    ),
+    'pyright': ('pyright', 'sample.py'),
+}
+
 MODULES = (
     ('GObject', '2.0'),
     ('GLib', '2.0'),
@@ -0,0 +1,191 @@
+"""Discovery of installed typelibs and the namespace dependency graph
+
+Rather than generating the namespaces configured in `MODULES`, we can
+scan the typelib search path for everything that's installed. Each
+typelib's header lists the namespaces it directly depends on, which is
+enough to build the dependency graph without loading any typelib
+through GI, and to generate dependencies before the namespaces that
+need them.
+
+A graph only holds one version of each namespace, so a namespace that
+needs a different version of something that has already been selected
+is skipped. A version matrix instead has a separate graph per target;
+see `gityping.matrix`.
+"""
+
+import collections
+import logging
+import re
+
+from .const import MODULES
+from .typelib import get_typelib, get_typelib_search_path
+
+
+log = logging.getLogger(__name__)
+
+#: A namespace in the dependency graph, with its direct dependencies
+Node = collections.namedtuple('Node', ['version', 'dependencies'])
+
+
+def version_key(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+
+def discover_typelibs():
+    """Find the typelibs installed on the search path
+
+    Returns a dictionary of each namespace's available versions, newest
+    first, ordered by namespace.
+    """
+    versions = collections.defaultdict(set)
+    for directory in get_typelib_search_path():
+        if not directory.is_dir():
+            continue
+        for typelib_path in directory.glob('*-*.typelib'):
+            name, version = typelib_path.stem.rsplit('-', 1)
+            versions[name].add(version)
+
+    return collections.OrderedDict(
+        (name, sorted(versions[name], key=version_key, reverse=True))
+        for name in sorted(versions)
+    )
+
+
+def parse_target(target):
+    """Split a `Name` or `Name-Version` target, with None for no version"""
+    name, _, version = target.partition('-')
+    return name, version or None
+
+
+def select_versions(available, names=()):
+    """Choose the version to generate of each of the given namespaces
+
+    Names may be given as `Name-Version` to choose a version. Otherwise,
+    versions configured in `MODULES` are used if they're installed, and
+    the newest version is used if not. All available namespaces are
+    selected if no names are given.
+    """
+    pinned = dict(MODULES)
+    targets = []
+    for name, version in map(parse_target, names or available):
+        versions = available[name]
+        version = version or pinned.get(name)
+        if version not in versions:
+            version = versions[0]
+        targets.append((name, version))
+    return targets
+
+
+def get_closure(name, version, graph):
+    """Get the graph nodes needed to add a namespace to `graph`
+
+    Raises `ValueError` if any namespace needed is already in the graph
+    with a different version.
+    """
+    closure = collections.OrderedDict()
+    pending = [(name, version)]
+    while pending:
+        name, version = pending.pop(0)
+        node = graph.get(name) or closure.get(name)
+        if node is not None:
+            if node.version != version:
+                raise ValueError('needs {}-{} but {}-{} is selected'.format(
+                    name, version, name, node.version))
+            continue
+        dependencies = get_typelib(name, version).dependencies
+        closure[name] = Node(version, frozenset(dependencies))
+        pending.extend(dependencies.items())
+    return closure
+
+
+def build_graph(targets):
+    """Build the dependency graph of namespaces and their dependencies
+
+    `targets` are `(name, version)` pairs. Returns a dictionary mapping
+    the names of the targets and everything they (transitively) depend
+    on to their `Node`. Targets that can't be loaded, or that conflict
+    with earlier targets, are skipped with a warning.
+    """
+    graph = collections.OrderedDict()
+    for name, version in targets:
+        try:
+            closure = get_closure(name, version, graph)
+        except (FileNotFoundError, ValueError) as e:
+            log.warning('Skipping {}-{}: {}'.format(name, version, e))
+            continue
+        graph.update(closure)
+    return graph
+
+
+def get_generation_order(graph):
+    """Sort the names in a dependency graph, dependencies first
+
+    Namespaces with no ordering between them are sorted by name.
+    """
+    waiting = {name: set(node.dependencies) for name, node in graph.items()}
+    order = []
+    ready = sorted(name for name, deps in waiting.items() if not deps)
+    while ready:
+        name = ready.pop(0)
+        del waiting[name]
+        order.append(name)
+        for dependent, deps in waiting.items():
+            if name in deps:
+                deps.discard(name)
+                if not deps:
+                    ready.append(dependent)
+        ready.sort()
+
+    if waiting:
+        raise ValueError('Dependency cycle between {}'.format(
+            ', '.join(sorted(waiting))))
+    return order
+
+
+def order_graph(graph):
+    """Get a copy of a dependency graph ordered with dependencies first"""
+    return collections.OrderedDict(
+        (name, graph[name]) for name in get_generation_order(graph))
+
+
+def discover_targets(names=()):
+    """Choose the installed namespace versions to generate
+
+    See `select_versions()`; raises `FileNotFoundError` if a namespace
+    (or a requested version of it) isn't installed.
+    """
+    available = discover_typelibs()
+    missing = [
+        target for target, (name, version) in zip(
+            names, map(parse_target, names))
+        if name not in available or (
+            version and version not in available[name])
+    ]
+    if missing:
+        raise FileNotFoundError('No typelibs found for {}'.format(
+            ', '.join(missing)))
+    return select_versions(available, names)
+
+
+def discover_namespaces(names=()):
+    """Get the dependency graph of installed namespaces to generate
+
+    If names are given, only those namespaces and their dependencies
+    are included. The graph is ordered with dependencies first.
+    """
+    return order_graph(build_graph(discover_targets(names)))
+
+
+def build_matrix(targets):
+    """Build a separate dependency graph for each target
+
+    Unlike `build_graph()`, targets may include several versions of a
+    namespace. Returns a dictionary mapping each target that could be
+    loaded to its ordered graph.
+    """
+    matrix = collections.OrderedDict()
+    for target in targets:
+        graph = build_graph([target])
+        if graph:
+            matrix[target] = order_graph(graph)
+    return matrix
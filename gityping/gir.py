@@ -0,0 +1,786 @@
+"""Stub generation from GIR XML, without importing gi
+
+This backend reads a namespace's `.gir` file instead of loading its
+typelib, and builds the same records as the `repository` backend. GIR
+files are parsed incrementally, and each top-level element is discarded
+as soon as it has been handled, so memory use stays flat even for very
+large namespaces.
+
+Each namespace is parsed twice: a quick first pass indexes the names it
+defines (keeping only what's needed to resolve types and inherited
+members), and a second pass builds records for each element in turn.
+Elements are wrapped in stand-ins for the GIRepository infos that
+the typelib would give, so that records are built by
+`infos.InfoBuilder`, as they are for the other backends. The members
+that pygobject's override classes add are read from their source; see
+`gityping.overrides`.
+"""
+
+import heapq
+import logging
+import os
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+from .annotations import GTypeTag
+from .const import (
+    ATTR_IGNORE_LIST,
+    GOBJECT_STATIC_CLASSES,
+    MODULES,
+    PYGI_MODULE_ATTRS,
+)
+from .infos import Direction, InfoBuilder, InfoTypes, escape_name
+from .ir import Class, Module, Variable
+from .overrides import add_override_members
+from .render import render_module
+
+
+log = logging.getLogger(__name__)
+
+CORE = '{http://www.gtk.org/introspection/core/1.0}'
+C = '{http://www.gtk.org/introspection/c/1.0}'
+GLIB = '{http://www.gtk.org/introspection/glib/1.0}'
+
+#: Type tags for GIR's basic and special-cased container type names
+BASIC_TYPES = {
+    'none': GTypeTag.VOID,
+    'gpointer': GTypeTag.VOID,
+    'gconstpointer': GTypeTag.VOID,
+    'gboolean': GTypeTag.BOOLEAN,
+    'gchar': GTypeTag.INT8,
+    'gint8': GTypeTag.INT8,
+    'guchar': GTypeTag.UINT8,
+    'guint8': GTypeTag.UINT8,
+    'gshort': GTypeTag.INT16,
+    'gint16': GTypeTag.INT16,
+    'gushort': GTypeTag.UINT16,
+    'guint16': GTypeTag.UINT16,
+    'gint': GTypeTag.INT32,
+    'gint32': GTypeTag.INT32,
+    'guint': GTypeTag.UINT32,
+    'guint32': GTypeTag.UINT32,
+    'gunichar2': GTypeTag.UINT16,
+    'gint64': GTypeTag.INT64,
+    'glong': GTypeTag.INT64,
+    'gssize': GTypeTag.INT64,
+    'goffset': GTypeTag.INT64,
+    'gintptr': GTypeTag.INT64,
+    'time_t': GTypeTag.INT64,
+    'guint64': GTypeTag.UINT64,
+    'gulong': GTypeTag.UINT64,
+    'gsize': GTypeTag.UINT64,
+    'guintptr': GTypeTag.UINT64,
+    'gfloat': GTypeTag.FLOAT,
+    'gdouble': GTypeTag.DOUBLE,
+    'long double': GTypeTag.DOUBLE,
+    'GType': GTypeTag.GTYPE,
+    'utf8': GTypeTag.UTF8,
+    'filename': GTypeTag.FILENAME,
+    'gunichar': GTypeTag.UNICHAR,
+    'GLib.Array': GTypeTag.ARRAY,
+    'GLib.ByteArray': GTypeTag.ARRAY,
+    'GLib.PtrArray': GTypeTag.ARRAY,
+    'GLib.List': GTypeTag.GLIST,
+    'GLib.SList': GTypeTag.GSLIST,
+    'GLib.HashTable': GTypeTag.GHASH,
+    'GLib.Error': GTypeTag.ERROR,
+}
+
+#: Elements for types that pygobject wraps as classes
+CLASS_ELEMENTS = {
+    CORE + 'class',
+    CORE + 'interface',
+    CORE + 'record',
+    CORE + 'union',
+    CORE + 'enumeration',
+    CORE + 'bitfield',
+    GLIB + 'boxed',
+}
+
+#: Elements for callables, which the typelib compiler skips if they're
+#: marked as not introspectable
+CALLABLE_ELEMENTS = {
+    CORE + 'callback',
+    CORE + 'constructor',
+    CORE + 'function',
+    CORE + 'method',
+    CORE + 'virtual-method',
+}
+
+#: Namespace elements that have infos in the compiled typelib
+TYPELIB_ELEMENTS = CLASS_ELEMENTS | {
+    CORE + 'callback',
+    CORE + 'constant',
+    CORE + 'function',
+}
+
+#: Elements that describe the type of a value
+TYPE_ELEMENTS = {
+    CORE + 'array',
+    CORE + 'callback',
+    CORE + 'type',
+    CORE + 'varargs',
+}
+
+#: Elements that only document their parent
+DOC_ELEMENTS = {
+    CORE + 'doc',
+    CORE + 'doc-deprecated',
+    CORE + 'doc-stability',
+    CORE + 'doc-version',
+    CORE + 'source-position',
+}
+
+#: Argument directions, by their GIR names
+DIRECTIONS = {
+    'in': Direction.IN,
+    'out': Direction.OUT,
+    'inout': Direction.INOUT,
+}
+
+
+def get_gir_search_path():
+    """Get the directories to look for GIR files in, in order"""
+    search_path = [
+        Path(p) for p in os.environ.get('GI_GIR_PATH', '').split(os.pathsep)
+        if p
+    ]
+    data_dirs = (
+        os.environ.get('XDG_DATA_DIRS') or '/usr/local/share:/usr/share')
+    search_path.extend(
+        Path(d) / 'gir-1.0' for d in data_dirs.split(os.pathsep) if d)
+    return search_path
+
+
+def find_gir(name, version) -> Path:
+    filename = '{}-{}.gir'.format(name, version)
+    for directory in get_gir_search_path():
+        gir_path = directory / filename
+        if gir_path.exists():
+            return gir_path
+    raise FileNotFoundError('Couldn\'t find {} in {}'.format(
+        filename, ', '.join(str(d) for d in get_gir_search_path())))
+
+
+def read_includes(gir_path: Path):
+    """Get the namespaces a GIR file includes, without parsing the rest"""
+    includes = {}
+    for event, elem in ElementTree.iterparse(str(gir_path), ('start',)):
+        if elem.tag == CORE + 'include':
+            includes[elem.get('name')] = elem.get('version')
+        elif elem.tag == CORE + 'namespace':
+            break
+    return includes
+
+
+def get_gir_paths(name, version):
+    """Get the GIR files that a namespace's stub is generated from
+
+    This is the namespace's own GIR file, followed by those of all the
+    namespaces it (transitively) includes.
+    """
+    gir_paths = []
+    pending = [(name, version)]
+    seen = set(pending)
+    while pending:
+        gir_path = find_gir(*pending.pop(0))
+        gir_paths.append(gir_path)
+        for include in read_includes(gir_path).items():
+            if include not in seen:
+                seen.add(include)
+                pending.append(include)
+    return gir_paths
+
+
+def iter_gir(gir_path: Path):
+    """Incrementally parse a GIR file, yielding its top-level elements
+
+    These are the repository's includes and the namespace's children.
+    Each element is complete when it's yielded, and is detached from
+    the tree once the caller moves on, so the tree never grows.
+    """
+    parents = []
+    for event, elem in ElementTree.iterparse(
+            str(gir_path), ('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if len(parents) == 2 or (
+                len(parents) == 1 and elem.tag == CORE + 'include'):
+            yield elem
+            parents[-1].remove(elem)
+
+
+def get_element_name(elem):
+    # glib:boxed elements are named in their own namespace
+    return elem.get('name') or elem.get(GLIB + 'name')
+
+
+def get_callable_name(elem):
+    # Functions that shadow another take the shadowed function's name
+    return elem.get('shadows') or elem.get('name')
+
+
+def get_info_name(elem):
+    """Get the (unescaped) name that GI gives an element's info"""
+    if elem.tag in CALLABLE_ELEMENTS:
+        return get_callable_name(elem)
+    return get_element_name(elem)
+
+
+def is_introspectable(elem):
+    return not (
+        elem.tag in CALLABLE_ELEMENTS and elem.get('introspectable') == '0')
+
+
+def get_type_element(elem):
+    """Get the element describing the type of a value, if any"""
+    if elem is None:
+        return None
+    for child in elem:
+        if child.tag in TYPE_ELEMENTS:
+            return child
+    return None
+
+
+def strip_docs(elem):
+    for child in list(elem):
+        if child.tag in DOC_ELEMENTS:
+            elem.remove(child)
+        else:
+            strip_docs(child)
+
+
+def get_skeleton(elem):
+    """Copy an element and its children, without their contents
+
+    This is enough to list a class's members, e.g., for working out
+    which names its subclasses inherit.
+    """
+    skeleton = ElementTree.Element(elem.tag, elem.attrib)
+    skeleton.extend(
+        ElementTree.Element(child.tag, child.attrib) for child in elem
+        if child.tag not in DOC_ELEMENTS)
+    return skeleton
+
+
+class GirIndex:
+    """The names that a GIR namespace defines
+
+    Callbacks, aliases and class structs are kept in full, since types
+    and classes may refer to them, and classes and interfaces are kept
+    without their members' contents, since subclasses may inherit their
+    members. For everything else, only the element tag is kept.
+    """
+
+    def __init__(self, namespace, version):
+        self.namespace = namespace
+        self.version = version
+        self.gir_path = find_gir(namespace, version)
+        self.includes = {}
+        self.kinds = {}
+        self.definitions = {}
+        #: Names of the infos that are in the typelib, in document order
+        self.names = []
+
+        for elem in iter_gir(self.gir_path):
+            if elem.tag == CORE + 'include':
+                self.includes[elem.get('name')] = elem.get('version')
+                continue
+
+            name = get_element_name(elem)
+            if not name:
+                continue
+            self.kinds[name] = elem.tag
+            if elem.tag in (CORE + 'alias', CORE + 'callback') or (
+                    elem.get(GLIB + 'is-gtype-struct-for')):
+                strip_docs(elem)
+                self.definitions[name] = elem
+            elif elem.tag in (CORE + 'class', CORE + 'interface'):
+                self.definitions[name] = get_skeleton(elem)
+            if elem.tag in TYPELIB_ELEMENTS and is_introspectable(elem):
+                self.names.append(get_info_name(elem))
+
+    def __repr__(self):
+        return '<GirIndex {}-{}>'.format(self.namespace, self.version)
+
+    def find_index(self, namespace):
+        """Find the index of a namespace that this one (maybe) includes"""
+        pending = [self]
+        seen = set()
+        while pending:
+            index = pending.pop(0)
+            if index.namespace == namespace:
+                return index
+            seen.add(index.namespace)
+            for name, version in index.includes.items():
+                if name not in seen:
+                    pending.append(get_index(name, version))
+        return None
+
+    def lookup(self, type_name):
+        """Find the index defining a type name, and its unqualified name"""
+        if '.' in type_name:
+            namespace, name = type_name.split('.', 1)
+            index = self.find_index(namespace)
+        else:
+            index, name = self, type_name
+        if index is None or name not in index.kinds:
+            return None, name
+        return index, name
+
+    def get_info(self, name):
+        """Get the info for a name that this namespace defines"""
+        elem = self.definitions.get(name)
+        if elem is None:
+            # Types that are only referred to just need their names
+            elem = ElementTree.Element(self.kinds[name], name=name)
+        return make_info(self, elem)
+
+    def find_info(self, type_name):
+        """Get the info for a (maybe qualified) type name, or None"""
+        index, name = self.lookup(type_name)
+        if index is None:
+            return None
+        return index.get_info(name)
+
+
+#: Indexes of the GIR namespaces loaded in this process
+gir_indexes = {}
+
+
+def get_index(namespace, version):
+    try:
+        return gir_indexes[(namespace, version)]
+    except KeyError:
+        index = gir_indexes[(namespace, version)] = GirIndex(
+            namespace, version)
+        return index
+
+
+def forget_namespace(namespace):
+    """Drop every cached version of a namespace, e.g., once it's rebuilt"""
+    for key in [key for key in gir_indexes if key[0] == namespace]:
+        del gir_indexes[key]
+
+
+def get_basic_tag(index, type_name):
+    """Get the type tag of a basic or special-cased type, if it is one"""
+    type_tag = BASIC_TYPES.get(type_name)
+    if type_tag is None and '.' not in type_name:
+        type_tag = BASIC_TYPES.get(
+            '{}.{}'.format(index.namespace, type_name))
+    return type_tag
+
+
+def get_type_info(index, elem):
+    """Get the type info for a type element, resolving any aliases
+
+    GI has no aliases, so they're replaced by the types they stand for,
+    as given in their own namespaces.
+    """
+    while elem is not None and elem.tag == CORE + 'type':
+        type_name = elem.get('name')
+        if type_name is None or (
+                get_basic_tag(index, type_name) is not None):
+            break
+        alias_index, name = index.lookup(type_name)
+        if alias_index is None or (
+                alias_index.kinds[name] != CORE + 'alias'):
+            break
+        index = alias_index
+        elem = get_type_element(alias_index.definitions[name])
+    return TypeInfo(index, elem)
+
+
+class TypeInfo:
+    """A type element, mirroring GITypeInfo
+
+    Types that can't be resolved are treated as gpointers.
+    """
+
+    __slots__ = ('index', 'elem', 'tag', 'pointer', 'interface')
+
+    def __init__(self, index: GirIndex, elem):
+        self.index = index
+        self.elem = elem
+        self.interface = None
+        self.tag, self.pointer = self.resolve()
+
+    def resolve(self):
+        elem = self.elem
+        if elem is None or elem.tag == CORE + 'varargs':
+            return GTypeTag.VOID, False
+        if elem.tag == CORE + 'callback':
+            # Callbacks given in full are anonymous, unlike those that
+            # are referred to by name
+            self.interface = CallbackInfo(self.index, elem, container=self)
+            return GTypeTag.INTERFACE, True
+
+        is_pointer = '*' in (elem.get(C + 'type') or '')
+        if elem.tag == CORE + 'array':
+            return GTypeTag.ARRAY, is_pointer
+
+        type_name = elem.get('name')
+        if type_name is None:
+            # Types that the scanner couldn't work out are gpointers
+            return GTypeTag.VOID, True
+
+        type_tag = get_basic_tag(self.index, type_name)
+        if type_tag == GTypeTag.VOID:
+            return type_tag, is_pointer or type_name != 'none'
+        if type_tag is not None:
+            return type_tag, is_pointer
+
+        self.interface = self.index.find_info(type_name)
+        if self.interface is None:
+            log.error('Unknown type {} in {}'.format(type_name, self.index))
+            return GTypeTag.VOID, True
+        return GTypeTag.INTERFACE, is_pointer
+
+    def get_tag(self):
+        return self.tag
+
+    def is_pointer(self):
+        return self.pointer
+
+    def get_interface(self):
+        return self.interface
+
+    def get_param_type(self, n):
+        params = [child for child in self.elem if child.tag in TYPE_ELEMENTS]
+        if n >= len(params):
+            return None
+        return get_type_info(self.index, params[n])
+
+    def get_array_length(self):
+        return int(self.elem.get('length', -1))
+
+
+class BaseInfo:
+    """An element of a GIR namespace, mirroring GIBaseInfo"""
+
+    __slots__ = ('index', 'elem', 'container')
+
+    def __init__(self, index: GirIndex, elem, container=None):
+        self.index = index
+        self.elem = elem
+        self.container = container
+
+    def __repr__(self):
+        return '<{} {}.{}>'.format(
+            type(self).__name__, self.get_namespace(), self.get_name())
+
+    def get_name(self):
+        # pygobject escapes keywords in info names
+        return escape_name(self.get_name_unescaped())
+
+    def get_name_unescaped(self):
+        return get_info_name(self.elem)
+
+    def get_namespace(self):
+        return self.index.namespace
+
+    def get_container(self):
+        return self.container
+
+    @property
+    def __name__(self):
+        return self.get_name()
+
+    def get_children(self, tags, info_cls):
+        return [
+            info_cls(self.index, child, container=self)
+            for child in self.elem
+            if child.tag in tags and is_introspectable(child)
+        ]
+
+
+class ArgInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_direction(self):
+        return DIRECTIONS[self.elem.get('direction', 'in')]
+
+    def get_type(self):
+        return get_type_info(self.index, get_type_element(self.elem))
+
+
+class CallableInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_return_type(self):
+        return get_type_info(self.index, get_type_element(
+            self.elem.find(CORE + 'return-value')))
+
+    def get_arguments(self):
+        return [
+            ArgInfo(self.index, argument, container=self)
+            for argument in self.elem.iterfind(
+                '{0}parameters/{0}parameter'.format(CORE))
+        ]
+
+
+class FunctionInfo(CallableInfo):
+    __slots__ = ()
+
+    def is_constructor(self):
+        return self.elem.tag == CORE + 'constructor'
+
+    def is_method(self):
+        return self.elem.tag == CORE + 'method'
+
+
+class CallbackInfo(CallableInfo):
+    __slots__ = ()
+
+
+class VFuncInfo(CallableInfo):
+    __slots__ = ()
+
+
+class FieldInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_type(self):
+        return get_type_info(self.index, get_type_element(self.elem))
+
+
+class ConstantInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_type(self):
+        return get_type_info(self.index, get_type_element(self.elem))
+
+
+class ValueInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_value(self):
+        return int(self.elem.get('value'))
+
+
+#: Elements for the methods of a class
+METHOD_ELEMENTS = {
+    CORE + 'constructor',
+    CORE + 'function',
+    CORE + 'method',
+}
+
+
+class RegisteredTypeInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_methods(self):
+        return self.get_children(METHOD_ELEMENTS, FunctionInfo)
+
+    def get_fields(self):
+        return self.get_children({CORE + 'field'}, FieldInfo)
+
+    def get_constants(self):
+        return self.get_children({CORE + 'constant'}, ConstantInfo)
+
+
+class StructInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+
+class UnionInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+
+class EnumInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def is_flags(self):
+        return self.elem.tag == CORE + 'bitfield'
+
+    def get_values(self):
+        return self.get_children({CORE + 'member'}, ValueInfo)
+
+
+class InterfaceInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+
+class ObjectInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def get_related_info(self, type_name):
+        info = self.index.find_info(type_name)
+        if info is None:
+            log.error('Unknown type {} in {}'.format(type_name, self.index))
+        return info
+
+    def get_parent(self):
+        parent = self.elem.get('parent')
+        return self.get_related_info(parent) if parent else None
+
+    def get_class_struct(self):
+        class_struct = self.elem.get(GLIB + 'type-struct')
+        if not class_struct:
+            return None
+        return self.get_related_info(class_struct)
+
+    def get_interfaces(self):
+        interfaces = (
+            self.get_related_info(child.get('name'))
+            for child in self.elem.iterfind(CORE + 'implements'))
+        return [info for info in interfaces if info is not None]
+
+    def get_vfuncs(self):
+        return self.get_children({CORE + 'virtual-method'}, VFuncInfo)
+
+
+#: Info classes for each kind of element
+INFO_CLASSES = {
+    CORE + 'bitfield': EnumInfo,
+    CORE + 'callback': CallbackInfo,
+    CORE + 'class': ObjectInfo,
+    CORE + 'constant': ConstantInfo,
+    CORE + 'enumeration': EnumInfo,
+    CORE + 'function': FunctionInfo,
+    CORE + 'interface': InterfaceInfo,
+    CORE + 'record': StructInfo,
+    CORE + 'union': UnionInfo,
+    GLIB + 'boxed': StructInfo,
+}
+
+
+def make_info(index, elem):
+    return INFO_CLASSES[elem.tag](index, elem)
+
+
+#: The element wrappers' info classes, for `InfoBuilder`
+GIR_INFO_TYPES = InfoTypes(
+    CallableInfo=CallableInfo,
+    CallbackInfo=CallbackInfo,
+    ConstantInfo=ConstantInfo,
+    EnumInfo=EnumInfo,
+    FunctionInfo=FunctionInfo,
+    InterfaceInfo=InterfaceInfo,
+    ObjectInfo=ObjectInfo,
+    RegisteredTypeInfo=RegisteredTypeInfo,
+    StructInfo=StructInfo,
+    UnionInfo=UnionInfo,
+    VFuncInfo=VFuncInfo,
+)
+
+
+class GirNamespace(InfoBuilder):
+    """A GIR namespace, standing in for the pygobject module
+
+    This is also the builder for the namespace's stub, and so holds its
+    memoised type annotations.
+    """
+
+    def __init__(self, namespace, version):
+        super().__init__(GIR_INFO_TYPES)
+        self.__name__ = 'gi.repository.{}'.format(namespace)
+        self.namespace = namespace
+        self.version = version
+        self.index = get_index(namespace, version)
+
+    def __repr__(self):
+        return '<GirNamespace {}-{}>'.format(self.namespace, self.version)
+
+
+def load_namespace(name, version=None):
+    """Load a namespace, by default at the version configured in `MODULES`"""
+    return GirNamespace(name, version or dict(MODULES)[name])
+
+
+def load_module_attrs(module):
+    """Get the sorted names that a namespace defines"""
+    names = {escape_name(name) for name in module.index.names}
+    names.update(PYGI_MODULE_ATTRS)
+    if module.namespace == 'GObject':
+        names.update(GOBJECT_STATIC_CLASSES)
+    return sorted(names)
+
+
+def generate_static_records(module, attrs):
+    """Generate the records for attributes that aren't in the GIR
+
+    These are pygobject's module attributes, and empty classes for
+    GObject's static base classes.
+    """
+    for attr_name in attrs:
+        if attr_name in PYGI_MODULE_ATTRS:
+            yield attr_name, Variable(
+                attr_name, PYGI_MODULE_ATTRS[attr_name])
+        elif module.namespace == 'GObject' and (
+                attr_name in GOBJECT_STATIC_CLASSES):
+            yield attr_name, Class(attr_name, None, [])
+
+
+def generate_document_records(module, attrs):
+    wanted = set(attrs)
+    for elem in iter_gir(module.index.gir_path):
+        if elem.tag not in INFO_CLASSES:
+            continue
+        attr_name = escape_name(get_info_name(elem))
+        if attr_name not in wanted or not is_introspectable(elem):
+            continue
+        if attr_name.startswith('__') or attr_name in ATTR_IGNORE_LIST:
+            continue
+        if not attr_name.isidentifier():
+            log.debug('Skipping invalid identifier {}'.format(
+                attr_name))
+            continue
+
+        record = module.build_info_record(
+            attr_name, make_info(module.index, elem))
+        if isinstance(record, Class):
+            record = add_override_members(
+                record, module.namespace, attr_name)
+        if record is not None:
+            yield attr_name, record
+
+
+def generate_attr_records(module, attrs):
+    """Generate stub records for the given namespace attributes
+
+    Records are generated in the same order as `attrs`, which must be
+    sorted. GIR files are normally sorted by name, in which case records
+    are streamed straight from the parser. Classes that pygobject
+    overrides get the members their overrides add.
+    """
+    records = generate_document_records(module, attrs)
+    names = [escape_name(name) for name in module.index.names]
+    if names != sorted(names):
+        log.debug('{} is not sorted; buffering records'.format(module))
+        records = sorted(records, key=lambda r: r[0])
+    yield from heapq.merge(
+        generate_static_records(module, attrs), records,
+        key=lambda r: r[0])
+
+
+# Attributes aren't loaded until they're generated, so listing them is
+# the same as loading them; see `gityping.list_module_attrs()`
+list_module_attrs = load_module_attrs
+generate_listed_attr_records = generate_attr_records
+
+
+def build_module_shard(module, index, count):
+    """Build the records for a shard of the namespace; see gityping.py"""
+    attrs = load_module_attrs(module)
+    records = list(generate_attr_records(module, attrs[index::count]))
+    module.typeinfo_cache.log_stats(module)
+    return Module(module.__name__, records)
+
+
+def build_module(module):
+    return build_module_shard(module, 0, 1)
+
+
+def generate_module_records(module):
+    """Generate all of a namespace's records lazily; see gityping.py"""
+    yield from generate_attr_records(module, load_module_attrs(module))
+    module.typeinfo_cache.log_stats(module)
+
+
+def generate_module_stub(module):
+    return render_module(build_module(module))
@@ -1,22 +1,22 @@
-import enum
+import importlib
 import inspect
-import io
 import logging
+import sys
 import types
 import typing
 
 from gi._gi import (
+    BaseInfo,
     CallableInfo,
-    Direction,
+    CallbackInfo,
+    ConstantInfo,
     EnumInfo,
-    FieldInfo,
     FunctionInfo,
     InterfaceInfo,
     ObjectInfo,
     RegisteredTypeInfo,
+    Repository,
     StructInfo,
-    TypeInfo,
-    TypeTag,
     UnionInfo,
     VFuncInfo,
 )
@@ -28,77 +28,103 @@ from .const import (
     PYGI_BOOL_OVERRIDE_FN,
     PYGI_STATIC_BINDINGS,
 )
+from .infos import InfoBuilder, InfoTypes
+from .ir import (
+    Class,
+    EnumMember,
+    Expression,
+    Function,
+    Module,
+    Parameter,
+    TypeRef,
+    Variable,
+)
+from .render import Renderer, render_module
 
 
 log = logging.getLogger(__name__)
 
 
-class GTypeTag(enum.IntEnum):
-    ARRAY = TypeTag.ARRAY
-    BOOLEAN = TypeTag.BOOLEAN
-    DOUBLE = TypeTag.DOUBLE
-    ERROR = TypeTag.ERROR
-    FILENAME = TypeTag.FILENAME
-    FLOAT = TypeTag.FLOAT
-    GHASH = TypeTag.GHASH
-    GLIST = TypeTag.GLIST
-    GSLIST = TypeTag.GSLIST
-    GTYPE = TypeTag.GTYPE
-    INT16 = TypeTag.INT16
-    INT32 = TypeTag.INT32
-    INT64 = TypeTag.INT64
-    INT8 = TypeTag.INT8
-    INTERFACE = TypeTag.INTERFACE
-    UINT16 = TypeTag.UINT16
-    UINT32 = TypeTag.UINT32
-    UINT64 = TypeTag.UINT64
-    UINT8 = TypeTag.UINT8
-    UNICHAR = TypeTag.UNICHAR
-    UTF8 = TypeTag.UTF8
-    VOID = TypeTag.VOID
-
-    @classmethod
-    def from_typeinfo(cls, typeinfo):
-        type_tag = typeinfo.get_tag()
-        return cls(type_tag)
-
-    def as_pytype(self):
-        mapping = {
-            GTypeTag.ARRAY: list,
-            GTypeTag.BOOLEAN: bool,
-            GTypeTag.DOUBLE: float,
-            GTypeTag.ERROR: 'gi.repository.GLib.Error',
-            GTypeTag.FILENAME: str,
-            GTypeTag.FLOAT: float,
-            GTypeTag.GHASH: dict,
-            GTypeTag.GLIST: list,
-            GTypeTag.GSLIST: list,
-            GTypeTag.GTYPE: 'gi.repository.GObject.GType',
-            GTypeTag.INT16: int,
-            GTypeTag.INT32: int,
-            GTypeTag.INT64: int,
-            GTypeTag.INT8: int,
-            # We shouldn't typing.Any here, but currently this occurs
-            # only once in a context in which GTypeTag is used, and
-            # it's not worth the additional introspection complication.
-            GTypeTag.INTERFACE: 'typing.Any',
-            GTypeTag.UINT16: int,
-            GTypeTag.UINT32: int,
-            GTypeTag.UINT64: int,
-            GTypeTag.UINT8: int,
-            GTypeTag.UNICHAR: str,
-            GTypeTag.UTF8: str,
-            GTypeTag.VOID: None,
-        }
-        return mapping[self]
-
-
 # TODO: Add annotations for gobject properties
 # TODO: Add annotations for gobject signals
 
 
+class SymbolIndex:
+    """Stub references for GI symbols, by namespace and name
+
+    Every info in a namespace is indexed the first time anything in that
+    namespace is looked up, after which references to its classes are a
+    dictionary lookup rather than being worked out from each class's
+    module and name. The index is kept for the whole run, since it
+    doesn't depend on the module being stubbed.
+    """
+
+    def __init__(self):
+        self.refs = {}
+        self.namespaces = set()
+
+    def add_namespace(self, namespace):
+        module = 'gi.repository.{}'.format(namespace)
+        for info in Repository.get_default().get_infos(namespace):
+            name = info.get_name()
+            self.refs[(namespace, name)] = TypeRef(
+                module, format_cls_name(info))
+        self.namespaces.add(namespace)
+
+    def lookup(self, info):
+        """Get the reference for an info, or None if it isn't indexed"""
+        namespace = info.get_namespace()
+        if namespace not in self.namespaces:
+            # e.g., unresolved infos from namespaces that aren't loaded
+            if not Repository.get_default().is_registered(namespace):
+                return None
+            self.add_namespace(namespace)
+        return self.refs.get((namespace, info.get_name()))
+
+
+#: pygobject's info classes, for `InfoBuilder`
+GI_INFO_TYPES = InfoTypes(
+    CallableInfo=CallableInfo,
+    CallbackInfo=CallbackInfo,
+    ConstantInfo=ConstantInfo,
+    EnumInfo=EnumInfo,
+    FunctionInfo=FunctionInfo,
+    InterfaceInfo=InterfaceInfo,
+    ObjectInfo=ObjectInfo,
+    RegisteredTypeInfo=RegisteredTypeInfo,
+    StructInfo=StructInfo,
+    UnionInfo=UnionInfo,
+    VFuncInfo=VFuncInfo,
+)
+
+
+class GIInfoBuilder(InfoBuilder):
+    """Builds records for pygobject's infos
+
+    Classes are referenced through `symbol_index`, and constants and
+    bases come from the values and types that pygobject gives them.
+    """
+
+    def __init__(self):
+        super().__init__(GI_INFO_TYPES)
+
+    def make_typeref(self, info):
+        return make_typeref(info)
+
+    def make_constant(self, attr_name, constant):
+        return make_variable(attr_name, constant.get_value())
+
+    def get_boxed_base(self, info):
+        parent = info.get_g_type().parent.pytype
+        return make_typeref(parent) if parent else None
+
+
 current_stub_module = None
-current_gi_imports = set()
+#: The builder for the current module, with its memoised type annotations
+info_builder = GIInfoBuilder()
+symbol_index = SymbolIndex()
+#: Stubs rendered by `stub_for()`, by qualified name and compact mode
+symbol_stubs = {}
 
 
 def get_current_module_name():
@@ -107,6 +133,10 @@ def get_current_module_name():
 
 
 def get_effective_module(module):
+    # pygobject's static classes (e.g., GFlags) claim to be from a
+    # 'gobject' module, but are only importable from GObject
+    if module == 'gobject':
+        return 'gi.repository.GObject'
     if module.startswith('gi.overrides'):
         newmodule = 'gi.repository' + module[len('gi.overrides'):]
         log.debug(
@@ -126,258 +156,108 @@ def format_cls_name(cls):
     return cls.__name__
 
 
-def format_module(cls):
-    module_name = get_effective_module(cls.__module__)
-    cls_name = format_cls_name(cls)
+def make_typeref(cls):
+    """Get a reference to a class, or to the class of an info
 
-    if module_name == get_current_module_name():
-        return cls_name
-    current_gi_imports.add(module_name)
-    return '{}.{}'.format(module_name, cls_name)
+    GI classes are looked up in `symbol_index`, and anything else (e.g.,
+    Python classes defined by overrides) is referenced by its own module
+    and name.
+    """
+    if isinstance(cls, BaseInfo):
+        info = cls
+    else:
+        info = getattr(cls, '__info__', None)
+        # Python subclasses of GI classes inherit their parent's info
+        if info is not None and info.get_name() != cls.__name__:
+            info = None
 
+    if info is not None:
+        ref = symbol_index.lookup(info)
+        if ref is not None:
+            return ref
+    return TypeRef(get_effective_module(cls.__module__), format_cls_name(cls))
 
-def format_gi_class(cls):
-    name = format_cls_name(cls)
 
+def get_class_base(cls):
     parent_cls = None
     if hasattr(cls, '__gtype__'):
         parent_cls = cls.__gtype__.parent.pytype
 
+    # Fundamental types have no Python type registered, so use the
+    # static base class that pygobject gives their wrappers instead
+    if parent_cls is None and cls.__bases__[0] in (
+            GObject.GEnum, GObject.GFlags, GObject.GInterface):
+        parent_cls = cls.__bases__[0]
+
     if parent_cls:
-        return "class {}({}):".format(
-            name, format_module(parent_cls))
+        return make_typeref(parent_cls)
+    return None
 
-    return "class {}:".format(name)
 
+def make_python_annotation(annotation):
+    """Get the record annotation for a pure-Python annotation"""
+    if (annotation is None or annotation is inspect.Parameter.empty or
+            isinstance(annotation, str)):
+        return annotation
+    if isinstance(annotation, type) and annotation.__module__ == 'builtins':
+        return annotation
+    return Expression(inspect.formatannotation(annotation))
 
-def get_typeinfo(typeinfo: TypeInfo):
-    """Obtain a python-style type annotation for the given TypeInfo
 
-    This is currently only called when handling function arguments and
-    return values. As such, it doesn't handle all possible `TypeInfo`s.
-    """
+def make_python_default(default):
+    if default is inspect.Parameter.empty or str(default).startswith('<'):
+        return inspect.Parameter.empty
+    if default is None or type(default) in (bool, int, float, str, bytes):
+        return default
+    return Expression(repr(default))
+
+
+def make_function(attr_name, function, *, strip_bool_result=False):
+    assert isinstance(function, (VFuncInfo, FunctionInfo, types.FunctionType))
 
-    type_tag = GTypeTag.from_typeinfo(typeinfo)
-
-    if type_tag == GTypeTag.INTERFACE:
-        iface = typeinfo.get_interface()
-
-        # At this point we have an interface. This may be a GObject
-        # subclass with a fundamental GType like a GEnum, or it could
-        # be a full GObject class, or it could be a callback or
-        # similar.
-
-        if isinstance(iface, CallableInfo):
-            signature, preamble = make_signature(iface)
-
-            def format_annotation(annotation):
-                if annotation is None or isinstance(
-                        annotation, inspect.Parameter.empty):
-                    # FIXME: Can we do any better than Any?
-                    return 'typing.Any'
-                if isinstance(annotation, type):
-                    return annotation.__name__
-                # Object and GObject are the same, but normalising here
-                # makes everything nicer
-                if annotation == 'gi.repository.GObject.Object':
-                    annotation = 'gi.repository.GObject.GObject'
-                return annotation
-
-            args = [
-                format_annotation(v.annotation)
-                for v in signature.parameters.values()
-            ]
-            return_type = format_annotation(signature.return_annotation)
-
-            return "typing.Callable[[{arg_types}], {return_type}]".format(
-                arg_types=', '.join(a for a in args),
-                return_type=return_type,
-            )
-        elif isinstance(iface, RegisteredTypeInfo):
-            # TODO: The following block attempts to handle missing type
-            # information, but in all cases I've checked, the default
-            # format_module() treatment works just fine. Keeping this
-            # code block in place but disabled until I can confirm.
-            if False and iface.get_g_type() == GObject.TYPE_NONE:
-                # This may be a gpointer, although in at least some
-                # cases the gpointer in question has additional type
-                # annotations; it's unclear what's going on here.
-                return typing.Any
-            return format_module(iface)
-
-    # TODO: This handles basic types, but handling for, lists, hashes,
-    # etc. is at best partial.
-    pytype = type_tag.as_pytype()
-    if pytype == list:
-        # TODO: pygobject removes length parameters associated with
-        # arrays based on extra annotations. We don't yet handle this.
-        if type_tag == TypeTag.ARRAY:
-            # TODO: If the array has a length arg,
-            # typeinfo.get_array_length() gives it to us. However, we
-            # need this at a higher level.
-            if typeinfo.get_array_length() >= 0:
-                log.error("Missing array length argument handling!")
-
-        # This is undocumented, but... appears correct?
-        list_type = get_typeinfo(typeinfo.get_param_type(0))
-        return "typing.List[{list_type}]".format(
-            list_type=format_pytype(list_type))
-
-    if type_tag == GTypeTag.VOID and typeinfo.is_pointer():
-        # This is probably an opaque gpointer; we don't know anything
-        # about this, so mark it accordingly.
-        pytype = "typing.Any"
-
-    if pytype is None and type_tag != GTypeTag.VOID:
-        log.error("Incomplete tag mapping for {}".format(type_tag))
-
-    return pytype
-
-
-def details_from_funcinfo(function, *, strip_bool_result=False):
-
-    # TODO: Also handle getters, setters, etc.?
-
-    # `CallableInfo` doesn't have `is_method` or `is_constructor`,
-    # thus this exception handling.
-    try:
-        needs_self = isinstance(function, VFuncInfo) or function.is_method()
-    except AttributeError:
-        needs_self = False
     try:
-        is_static = not needs_self and (
-            function.is_constructor() or function.get_container() is not None)
-    except AttributeError:
-        is_static = False
-
-    # There's no context to determine classmethod vs. staticmethod
-    # here, but sampling a few headers they're all static.
-    preamble = "@staticmethod" if is_static else ""
-
-    parameters = []
-    if needs_self:
-        self_param = inspect.Parameter(
-            'self',
-            kind=inspect.Parameter.POSITIONAL_OR_KEYWORD,
-        )
-        parameters.append(self_param)
-
-    # TODO: We can't do this. The argument list is stateful because of
-    # (at least) array length arguments, so we need to maintain some
-    # state of the type parsing in between everything and return a
-    # reconstucted argument list at the end.
-
-    return_types = [get_typeinfo(function.get_return_type())]
-
-    for argument in function.get_arguments():
-        annotation = get_typeinfo(argument.get_type())
-
-        # FIXME: INOUT should possibly be treated differently here.
-        if argument.get_direction() in (Direction.IN, Direction.INOUT):
-            parameter = inspect.Parameter(
-                argument.get_name(),
-                annotation=annotation,
-                # TODO: I think this is actually true for gi... maybe?
-                kind=inspect.Parameter.POSITIONAL_OR_KEYWORD,
-            )
-            parameters.append(parameter)
+        if isinstance(function, CallableInfo):
+            return info_builder.make_function(
+                attr_name, function, strip_bool_result=strip_bool_result)
         else:
-            return_types.append(annotation)
-
-    # If the function was wrapped with the strip_bool_result decorator
-    # then we just remove the first return type to emulate that.
-    if strip_bool_result:
-        if return_types[0] != bool:
-            raise RuntimeError('Tried to strip a non-boolean return type')
-        return_types = return_types[1:]
-        if not return_types:
-            raise RuntimeError('No returns left after boolean stripping')
-
-    if len(return_types) == 1:
-        return_type = return_types[0]
-    else:
-        # Remove None returns in a list; these are functions with OUT
-        # params that have gained a real Python return type.
-        return_types = [r for r in return_types if r is not None]
-        return_type_strs = [format_pytype(r) for r in return_types]
-        return_type = 'typing.Tuple[{}]'.format(', '.join(return_type_strs))
-
-    return preamble, parameters, return_type
-
-
-def make_signature(function, *, strip_bool_result=False):
-    if isinstance(function, CallableInfo):
-        preamble, parameters, return_type = details_from_funcinfo(
-            function, strip_bool_result=strip_bool_result)
-        signature = inspect.Signature(
-            parameters=parameters,
-            return_annotation=return_type,
-        )
-    elif isinstance(function, types.FunctionType):
-        # FIXME: We could have a static method here, but at this point
-        # we don't have the necessary information to tell. We'd need to
-        # have the defining class here and then do e.g.,
-        #     isinstance(cls.__dict__['from_floats'], staticmethod)
-        preamble = ""
-        signature = inspect.signature(function)
-
-        def sanitise_param_default(param):
-            if str(param.default).startswith('<'):
-                return param.replace(default=inspect.Parameter.empty)
-            return param
-        sanitised_params = [
-            sanitise_param_default(v) for v in signature.parameters.values()
-        ]
-        signature = signature.replace(parameters=sanitised_params)
-    else:
-        raise NotImplementedError
-    return signature, preamble
-
+            # FIXME: We could have a static method here, but at this
+            # point we don't have the necessary information to tell.
+            # We'd need to have the defining class here and then do e.g.,
+            #     isinstance(cls.__dict__['from_floats'], staticmethod)
+            decorator = None
+            signature = inspect.signature(function)
+            parameters = [
+                Parameter(
+                    param.name,
+                    annotation=make_python_annotation(param.annotation),
+                    default=make_python_default(param.default),
+                    kind=param.kind,
+                )
+                for param in signature.parameters.values()
+            ]
+            return_type = make_python_annotation(signature.return_annotation)
+    except Exception as e:
+        raise ValueError(
+            "couldn't make signature for {}: {}".format(attr_name, e))
 
-def format_pytype(pytype):
-    if isinstance(pytype, type):
-        return pytype.__name__
-    return pytype
+    return Function(
+        attr_name, parameters, return_type=return_type, decorator=decorator)
 
 
-def format_variable(name, value):
+def make_variable(name, value):
     if inspect.isclass(value):
-        type_str = format_module(value.__class__)
+        type_ref = make_typeref(value.__class__)
     else:
-        type_str = type(value).__name__
-    return "{} = ...  # type: {}".format(name, type_str)
+        type_ref = type(value).__name__
+    return Variable(name, type_ref)
 
 
-def format_property(name, value, annotations):
+def make_property(name, value, annotations):
     """Handle pure-Python property additions in overrides"""
 
     annotation = annotations.get(name)
-    type_str = annotation.__name__ if annotation else typing.Any
-    return "{} = ...  # type: {}".format(name, type_str)
-
-
-def format_fieldinfo(attr_name, fieldinfo: FieldInfo):
-    pytype = get_typeinfo(fieldinfo.get_type())
-    return "{} = ...  # type: {}".format(attr_name, format_pytype(pytype))
-
-
-def format_functioninfo(attr_name, func_info, *, strip_bool_result=False):
-    assert isinstance(func_info, (VFuncInfo, FunctionInfo, types.FunctionType))
-
-    try:
-        signature, preamble = make_signature(
-            func_info, strip_bool_result=strip_bool_result)
-    except Exception as e:
-        raise ValueError(
-            "couldn't make signature for {}: {}".format(attr_name, e))
-
-    if preamble:
-        preamble += "\n"
-
-    return (
-        "{}"
-        "def {}{}: ...\n"
-    ).format(preamble, attr_name, signature)
+    type_str = annotation.__name__ if annotation else 'typing.Any'
+    return Variable(name, type_str)
 
 
 def attr_generator(cls, attrs):
@@ -403,59 +283,83 @@ def attr_generator(cls, attrs):
                     'static binding): {}'.format(e))
 
 
-def generic_attr_stubber(cls, attr_name, attr, stub_out):
+class ClassContext:
+    """Class-wide data needed when stubbing each of a class's attributes
+
+    This is built once per class (or module) rather than being
+    recomputed for every attribute.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.name = format_cls_name(cls)
+        self.is_override = getattr(cls, '__module__', '').startswith(
+            'gi.overrides')
+
+        # Type hints are only used for pure-Python override properties,
+        # and are expensive to resolve, so don't bother otherwise.
+        self.type_hints = {}
+        if self.is_override:
+            self.type_hints = typing.get_type_hints(cls)
+
+        info = getattr(cls, '__info__', None)
+        try:
+            self.fields = {f.get_name(): f for f in info.get_fields()}
+        except AttributeError:
+            self.fields = {}
+        try:
+            self.methods = {m.get_name(): m for m in info.get_methods()}
+        except AttributeError:
+            self.methods = {}
+
+
+def generic_attr_stubber(context, attr_name, attr, stub_out):
     # Ordering is important here. We need to handle e.g., GFlags
     # before we fall back to int/str/float.
 
-    annotations = typing.get_type_hints(cls)
-
     # TODO: Consider whether we can remove our struct-specific stubber
     # and just use this instead.
-    try:
-        cls_fields = {f.get_name(): f for f in cls.__info__.get_fields()}
-    except AttributeError:
-        cls_fields = {}
+    cls_fields = context.fields
 
     if isinstance(attr, types.FunctionType) and hasattr(attr, '__wrapped__'):
         # FIXME: move this special handling elsewhere
         if attr.__qualname__.startswith(PYGI_BOOL_OVERRIDE_FN):
-            fn_str = format_functioninfo(
+            function = make_function(
                 attr_name, attr.__wrapped__, strip_bool_result=True)
         else:
             log.warn('Unhandled function wrapper {} for {}.{}'.format(
-                attr.__qualname__, format_cls_name(cls), attr_name))
-            fn_str = format_functioninfo(attr_name, attr.__wrapped__)
-        stub_out(fn_str)
+                attr.__qualname__, context.name, attr_name))
+            function = make_function(attr_name, attr.__wrapped__)
+        stub_out(function)
     elif isinstance(attr, (VFuncInfo, FunctionInfo)):
-        stub_out(format_functioninfo(attr_name, attr))
-    elif (isinstance(attr, types.FunctionType) and
-            cls.__module__.startswith('gi.overrides')):
+        stub_out(make_function(attr_name, attr))
+    elif isinstance(attr, types.FunctionType) and context.is_override:
         # This separately handles pure-Python override functions,
         # although at the moment we don't do anything here because none
         # of them have their own annotations.
-        stub_out(format_functioninfo(attr_name, attr))
+        stub_out(make_function(attr_name, attr))
     elif attr_name in cls_fields:
-        stub_out(format_fieldinfo(attr_name, cls_fields[attr_name]))
-    elif (isinstance(attr, property) and
-            cls.__module__.startswith('gi.overrides')):
-        stub_out(format_property(attr_name, attr, annotations))
+        stub_out(info_builder.make_field(attr_name, cls_fields[attr_name]))
+    elif isinstance(attr, property) and context.is_override:
+        stub_out(make_property(attr_name, attr, context.type_hints))
     elif isinstance(attr, (GObject.GType, GObject.GFlags, GObject.GEnum)):
         # TODO: unsure here. just annotate as the parent type? This is the
         # same as below. Do I want this clause for clarity, or what?
-        stub_out(format_variable(attr_name, attr))
+        stub_out(make_variable(attr_name, attr))
     elif isinstance(attr, (int, str, float)):
-        stub_out(format_variable(attr_name, attr))
+        stub_out(make_variable(attr_name, attr))
     else:
         print("unsupported type {} for {}.{}".format(
-            type(attr), format_cls_name(cls), attr_name))
+            type(attr), context.name, attr_name))
 
 
-def generate_gobject_stubs(cls, attrs, stub_out):
-    for attr_name, attr in attr_generator(cls, attrs):
-        generic_attr_stubber(cls, attr_name, attr, stub_out)
+def generate_gobject_stubs(context, attrs, stub_out):
+    for attr_name, attr in attr_generator(context.cls, attrs):
+        generic_attr_stubber(context, attr_name, attr, stub_out)
 
 
-def generate_genum_stub(cls, attrs, stub_out):
+def generate_genum_stub(context, attrs, stub_out):
+    cls = context.cls
 
     # For enums (and flags) we would ideally use the available
     # get_values() introspection. However, the value names are
@@ -474,96 +378,186 @@ def generate_genum_stub(cls, attrs, stub_out):
         else:
             if not attr_name.isupper() or attr not in expected_values:
                 if isinstance(attr, FunctionInfo):
-                    stub_out(format_functioninfo(attr_name, attr))
+                    stub_out(make_function(attr_name, attr))
                     continue
                 log.warn(
                     "Skipping unexpected attribute {} in enum {}".format(
                         attr_name, cls))
                 continue
 
-        stub_out(format_variable(attr_name, attr))
+        stub_out(EnumMember(attr_name, type(attr).__name__, int(attr)))
 
 
-def generate_struct_stub(cls, attrs, stub_out):
+def generate_struct_stub(context, attrs, stub_out):
+    cls = context.cls
 
     # For wrapped structs, the attrs are property objects, so we don't
     # have the same introspection data present. Instead, we use some
     # struct-specific fields + methods introspection.
-    field_map = {f.get_name(): f for f in cls.__info__.get_fields()}
-    method_map = {m.get_name(): m for m in cls.__info__.get_methods()}
+    field_map = context.fields
+    method_map = context.methods
 
     for attr_name, attr in attr_generator(cls, attrs):
-        if attr_name in field_map:
-            stub_out(format_fieldinfo(attr_name, field_map[attr_name]))
-        elif attr_name in method_map:
-            stub_out(format_functioninfo(attr_name, method_map[attr_name]))
+        # A method replaces a field of the same name, e.g., Hook.destroy
+        if attr_name in method_map:
+            stub_out(make_function(attr_name, method_map[attr_name]))
+        elif attr_name in field_map:
+            stub_out(info_builder.make_field(
+                attr_name, field_map[attr_name]))
         else:
             raise NotImplementedError(
                 "Struct {} attribute {} is not in field or method map".format(
                       cls, attr_name))
 
 
-def generate_class_stubs(module, cls):
-    # FIXME: Don't take the stub_str; just make a new one per class and
-    # concatenate them
+def build_class(cls):
+    """Build the record for an introspected class"""
 
     log.debug("Generating stubs for {}".format(cls))
 
-    stub_lines = ['']
-
-    # TODO: Investigate additional bases; see handling for ObjectInfo
-    # multiple interfaces in  gi.module.IntrospectionModule.__getattr__
-    stub_lines.append(format_gi_class(cls))
+    context = ClassContext(cls)
+    members = []
 
     # Sorting for consistency, but also so we're operating on a list copy
     attrs = sorted(cls.__dict__.keys())
 
-    def stub_out(stub):
-        for line in stub.splitlines():
-            if line.strip():
-                line = "    {}".format(line).rstrip()
-            stub_lines.append(line)
-
     # FIXME: GBoxed doesn't have __info__
     try:
         info = cls.__info__
     except AttributeError:
         log.error("Introspected class does not have info: {}".format(cls))
         # FIXME: This is broken for many fundamental types as well
-        generate_gobject_stubs(cls, attrs, stub_out)
-        stub_out("...")
-        return stub_lines
+        generate_gobject_stubs(context, attrs, members.append)
+        return Class(context.name, get_class_base(cls), members)
 
     # At this point, everything we should be dealing with is a
     # RegisteredTypeInfo subclass.
 
     if isinstance(info, (ObjectInfo, InterfaceInfo)):
-        generate_gobject_stubs(cls, attrs, stub_out)
+        generate_gobject_stubs(context, attrs, members.append)
     elif isinstance(info, (StructInfo, UnionInfo)):
         # TODO: Should UnionInfo have different handling?
-        generate_struct_stub(cls, attrs, stub_out)
+        generate_struct_stub(context, attrs, members.append)
     elif isinstance(info, EnumInfo):
-        generate_genum_stub(cls, attrs, stub_out)
+        generate_genum_stub(context, attrs, members.append)
     else:
         raise NotImplementedError
 
-    stub_out("...")
-    return stub_lines
+    return Class(context.name, get_class_base(cls), members)
 
 
-def generate_module_stub(module):
-    stub_str = io.StringIO()
+def generate_class_stubs(module, cls):
+    """Render the stub lines for an introspected class"""
+    renderer = Renderer(get_current_module_name())
+    return renderer.format_class(build_class(cls))
+
+
+def get_namespace(module):
+    return getattr(module, '_introspection_module', module)._namespace
+
+
+def get_callback_names(module):
+    """Get the names of a module's callback types
+
+    pygobject leaves these out of its modules' `dir()`, since they can't
+    be used from Python other than as annotations.
+    """
+    return {
+        info.get_name()
+        for info in Repository.get_default().get_infos(get_namespace(module))
+        if isinstance(info, CallbackInfo)
+    }
+
 
+def get_override_names(module):
+    """Get the names that pygobject's overrides replace in a module"""
+    if not hasattr(module, '_introspection_module'):
+        return set()
+    overrides = sys.modules['gi.overrides.{}'.format(get_namespace(module))]
+    return set(getattr(overrides, '__all__', ()))
+
+
+def get_override(module, attr_name):
+    """Get the override of a module attribute, or None if it has none"""
+    if attr_name not in get_override_names(module):
+        return None
+    overrides = sys.modules['gi.overrides.{}'.format(get_namespace(module))]
+    return getattr(overrides, attr_name, None)
+
+
+def add_override_members(record: Class, override_cls):
+    """Add the public members that an override class adds to a GI class
+
+    Members that the GI class already has keep their introspected
+    stubs, since the override's are plain Python without annotations.
+    """
+    names = {member.name for member in record.members}
+    attrs = sorted(
+        attr_name for attr_name in override_cls.__dict__
+        if not attr_name.startswith('_') and attr_name not in names)
+    if not attrs:
+        return record
+
+    context = ClassContext(override_cls)
+    members = list(record.members)
+    for attr_name, attr in attr_generator(override_cls, attrs):
+        generic_attr_stubber(context, attr_name, attr, members.append)
+    members.sort(key=lambda member: member.name)
+    return Class(record.name, record.base, members)
+
+
+def get_loaded_attr(module, attr_name):
+    """Get a module attribute as it is after `load_module_attrs()`
+
+    For a module with overrides, that merges in everything the
+    introspection module has loaded, so names are resolved from the
+    introspection module, other than overridden names it hasn't loaded.
+    e.g., an overridden class is stubbed from the GI class rather than
+    the override's subclass, which only defines the replaced members.
+    """
+    introspection_module = getattr(module, '_introspection_module', None)
+    if introspection_module is None:
+        return getattr(module, attr_name)
+    if attr_name in get_override_names(module):
+        try:
+            return introspection_module.__dict__[attr_name]
+        except KeyError:
+            return getattr(module, attr_name)
+    try:
+        return getattr(introspection_module, attr_name)
+    except AttributeError:
+        return getattr(module, attr_name)
+
+
+def find_callback_info(module, attr_name):
+    """Get the info of a module's callback type, or None if it isn't one
+
+    Callback types have to be stubbed from their infos, since pygobject
+    raises NotImplementedError when they're accessed as attributes.
+    """
+    info = Repository.get_default().find_by_name(
+        get_namespace(module), attr_name)
+    return info if isinstance(info, CallbackInfo) else None
+
+
+def load_namespace(name, version=None):
+    """Import a namespace's module
+
+    Its version must already be pinned (see `main.require_versions`), so
+    `version` is only accepted for compatibility with other backends.
+    """
+    return importlib.import_module('gi.repository.{}'.format(name))
+
+
+def begin_module_stub(module):
+    """Reset the per-module generation state for a new module"""
     log.debug("Generating module stubs for {}".format(module))
 
     # FIXME: This is wild. Basically, we need a state object at this point
     global current_stub_module
-    global current_gi_imports
+    global info_builder
     current_stub_module = module
-    # We use typing types in a bunch of places; easier to just add this now
-    current_gi_imports = {'typing'}
-
-    attrs = module.__dict__
+    info_builder = GIInfoBuilder()
 
     if not (
             isinstance(module, IntrospectionModule) or
@@ -571,6 +565,17 @@ def generate_module_stub(module):
         raise RuntimeError(
             f'tried to generate a stub for non-introspection module {module}')
 
+
+def load_module_attrs(module):
+    """Load all of a module's attributes and return their sorted names
+
+    This also resets the per-module generation state, so it must be
+    called before generating any stubs for the module.
+    """
+    begin_module_stub(module)
+
+    attrs = module.__dict__
+
     # This trick handles module-level lazy loading for e.g., annotating
     # the top-level Gdk namespace.
     if hasattr(module, '_introspection_module'):
@@ -583,36 +588,168 @@ def generate_module_stub(module):
         for attr in dir(module):
             getattr(module, attr)
 
-    attrs = sorted(attrs)
+    return sorted(set(attrs) | get_callback_names(module))
 
-    attr_stubs = []
 
-    for attr_name, attr in attr_generator(module, attrs):
-        # FIXME: there's way too much overlap here with
-        # generate_gobject_stubs; this could be a lot simpler.
+def list_module_attrs(module):
+    """Get the sorted attribute names of a module without loading them
 
-        # FIXME: Ideally, generic_attr_stubber would handle classes as well,
-        # but this requires it to understand nesting for correct indentation.
-        if inspect.isclass(attr):
-            if attr_name.endswith(('Class', 'Private')):
-                log.debug(
-                    'Skipping GObject-style internal class {}'.format(
-                        attr_name))
-                continue
+    These cover every attribute that `load_module_attrs()` gives a stub
+    to, for generating with `generate_listed_attr_records()`. This also
+    resets the per-module generation state.
+    """
+    begin_module_stub(module)
+    # The module's own attributes are its overrides (other than
+    # deprecated ones) and pygobject's bookkeeping, e.g. `_version`.
+    names = {
+        info.get_name()
+        for info in Repository.get_default().get_infos(get_namespace(module))
+    }
+    names |= set(vars(module))
+    if hasattr(module, '_introspection_module'):
+        names |= set(vars(module._introspection_module))
+    return sorted(names)
 
-            if attr.__module__ in ('gi._glib',):
-                log.debug(
-                    'Skipping statically bound class {}'.format(
-                        attr_name))
-                continue
 
-            attr_stubs.append('')
-            attr_stubs.extend(generate_class_stubs(module, attr))
+def generate_attr_records(module, attrs):
+    """Generate stub records for the given module attributes
 
-        else:
-            generic_attr_stubber(module, attr_name, attr, attr_stubs.append)
+    Yields an `(attr_name, record)` pair for each attribute that has a
+    stub, in the same order as `attrs`.
+    """
+    module_context = ClassContext(module)
+
+    for attr_name in attrs:
+        callback = find_callback_info(module, attr_name)
+        if callback is not None:
+            yield attr_name, info_builder.make_callback_alias(
+                attr_name, callback)
+            continue
 
-    stub_str = "\n".join(
-        "import {}".format(imp) for imp in sorted(current_gi_imports)
-    ) + "\n" + "\n".join(attr_stubs)
-    return stub_str
+        for attr_name, attr in attr_generator(module, [attr_name]):
+            yield from generate_attr_value_records(
+                module_context, attr_name, attr)
+
+
+def generate_attr_value_records(module_context, attr_name, attr):
+    """Generate the records for a loaded module attribute"""
+    # FIXME: there's way too much overlap here with
+    # generate_gobject_stubs; this could be a lot simpler.
+
+    # FIXME: Ideally, generic_attr_stubber would handle classes as well,
+    # but this requires it to understand nesting for correct indentation.
+    if inspect.isclass(attr):
+        if attr_name.endswith(('Class', 'Private')):
+            log.debug(
+                'Skipping GObject-style internal class {}'.format(attr_name))
+            return
+
+        if attr.__module__ in ('gi._glib',):
+            log.debug('Skipping statically bound class {}'.format(attr_name))
+            return
+
+        record = build_class(attr)
+        override = get_override(module_context.cls, attr_name)
+        if inspect.isclass(override) and override is not attr:
+            record = add_override_members(record, override)
+        yield attr_name, record
+
+    else:
+        records = []
+        generic_attr_stubber(module_context, attr_name, attr, records.append)
+        for record in records:
+            yield attr_name, record
+
+
+def build_module_shard(module, index, count):
+    """Build the records for one of `count` shards of a module
+
+    Attributes are dealt round-robin from the sorted attribute list so
+    that runs of similar large classes are spread across shards.
+    """
+    attrs = load_module_attrs(module)
+    records = list(generate_attr_records(module, attrs[index::count]))
+    info_builder.typeinfo_cache.log_stats(module)
+    return Module(module.__name__, records)
+
+
+def build_module(module):
+    """Build the records for a module in a single introspection pass"""
+    return build_module_shard(module, 0, 1)
+
+
+def generate_module_records(module):
+    """Generate all of a module's `(attr_name, record)` pairs lazily"""
+    attrs = load_module_attrs(module)
+    yield from generate_attr_records(module, attrs)
+    info_builder.typeinfo_cache.log_stats(module)
+
+
+def generate_module_stub(module):
+    return render_module(build_module(module))
+
+
+def generate_single_attr_records(module, attr_name):
+    """Generate the records for one attribute, without loading the rest
+
+    These are the same records as `generate_attr_records()` gives for
+    the attribute after `load_module_attrs()`.
+    """
+    callback = find_callback_info(module, attr_name)
+    if callback is not None:
+        yield attr_name, info_builder.make_callback_alias(
+            attr_name, callback)
+        return
+    if attr_name.startswith('__') or attr_name in ATTR_IGNORE_LIST:
+        return
+
+    try:
+        attr = get_loaded_attr(module, attr_name)
+    except AttributeError:
+        return
+    yield from generate_attr_value_records(
+        ClassContext(module), attr_name, attr)
+
+
+def generate_listed_attr_records(module, attrs):
+    """Generate the records for attributes from `list_module_attrs()`
+
+    Only the given attributes are loaded, and their records are the same
+    as after `load_module_attrs()`.
+    """
+    for attr_name in attrs:
+        yield from generate_single_attr_records(module, attr_name)
+
+
+def stub_for(qualified_name, compact=False):
+    """Get the stub for a single attribute of a namespace
+
+    e.g., `stub_for('Gtk.Button')`. Only the namespace's module and that
+    attribute are loaded (along with e.g. its parent classes, which GI
+    loads with it), rather than everything in the namespace; the types
+    it refers to are only looked up in their namespaces' introspection
+    data. The stub includes the imports it needs, and is cached.
+
+    The namespace's version must already be pinned; see
+    `main.require_versions()`.
+    """
+    key = qualified_name, compact
+    if key in symbol_stubs:
+        return symbol_stubs[key]
+
+    namespace, _, attr_name = qualified_name.partition('.')
+    if not attr_name or '.' in attr_name:
+        raise ValueError(
+            'Expected Namespace.name, not {}'.format(qualified_name))
+
+    module = load_namespace(namespace)
+    # Keep the memoised types from earlier calls for the same namespace
+    if current_stub_module is not module:
+        begin_module_stub(module)
+    records = list(generate_single_attr_records(module, attr_name))
+    if not records:
+        raise AttributeError('No stub for {}'.format(qualified_name))
+
+    stub = render_module(Module(module.__name__, records), compact)
+    symbol_stubs[key] = stub
+    return stub
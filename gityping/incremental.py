@@ -0,0 +1,228 @@
+"""Symbol-level incremental regeneration of stubs
+
+Next to each stub, a manifest records a content hash for every
+attribute of the namespace, along with the attribute's lines and
+imports. When the stub is regenerated, only the attributes whose hashes
+have changed are built and rendered again, and their lines are spliced
+into the existing stub in place of the old ones; everything else is
+copied across from the old stub.
+
+An attribute's hash covers its record from a GI-free backend (the GIR
+backend when generating from GIR, and otherwise the typelib backend),
+which captures everything the namespace's introspection data says about
+it. Building these records is cheap compared to introspecting with GI,
+and the GI backends only load the attributes whose hashes have changed.
+For the GI backends, the hash also covers the pygobject version and the
+overrides of the namespace and its dependencies, so any change to those
+overrides means regenerating the whole namespace. So does any change to
+gityping itself. Switching to or from compact mode does the same.
+
+The result is always identical to generating the stub from scratch.
+"""
+
+import collections
+import hashlib
+import importlib
+import json
+import logging
+import sys
+from pathlib import Path
+
+from . import __version__
+from .cache import get_generator_digest, get_overrides_paths
+from .const import BACKENDS, GI_FREE_BACKENDS
+from .render import (
+    Renderer,
+    check_compact_imports,
+    format_module_stub,
+    get_imports,
+    render_module,
+)
+from .writer import get_manifest_path
+
+
+log = logging.getLogger(__name__)
+
+#: A stub attribute, with its hash and its rendered lines and imports
+Symbol = collections.namedtuple('Symbol', ['hash', 'lines', 'imports'])
+
+
+def get_hash_backend(backend):
+    return 'gir' if backend == 'gir' else 'typelib'
+
+
+def get_salt(backend, name, version, compact=False):
+    """Get the data that every attribute hash of a namespace depends on"""
+    salt = hashlib.sha256()
+    salt.update('gityping {} {} ({}{})\0'.format(
+        __version__, get_generator_digest(), backend,
+        ', compact' if compact else '').encode())
+    if backend not in GI_FREE_BACKENDS:
+        gi = sys.modules['gi']
+        salt.update('pygobject {}\0'.format(gi.__version__).encode())
+    for overrides_path in get_overrides_paths(name, version, backend):
+        salt.update(Path(overrides_path).read_bytes())
+    return salt.hexdigest()
+
+
+def group_records(records):
+    """Group `(attr_name, record)` pairs into lists by attribute"""
+    grouped = collections.defaultdict(list)
+    for attr_name, record in records:
+        grouped[attr_name].append(record)
+    return grouped
+
+
+def hash_attrs(backend, name, version, attrs, compact=False):
+    """Hash each of a namespace's attributes
+
+    Returns the hashes, along with the records they were taken from.
+    """
+    hash_backend = get_hash_backend(backend)
+    generator = importlib.import_module(BACKENDS[hash_backend])
+    namespace = generator.load_namespace(name, version)
+    records = group_records(generator.generate_attr_records(namespace, attrs))
+
+    salt = get_salt(backend, name, version, compact)
+    hashes = {}
+    for attr_name in attrs:
+        attr_hash = hashlib.sha256()
+        attr_hash.update('{}\0{}\0'.format(salt, attr_name).encode())
+        attr_hash.update(repr(records.get(attr_name, [])).encode())
+        hashes[attr_name] = attr_hash.hexdigest()
+    return hashes, records
+
+
+def load_symbols(stub_path: Path):
+    """Load the symbols of an existing stub from its manifest
+
+    Returns an empty dictionary if the stub or its manifest is missing,
+    or if they don't match.
+    """
+    try:
+        with get_manifest_path(stub_path).open() as f:
+            manifest = json.load(f)
+        stub_lines = stub_path.read_text().split('\n')
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        log.warning('Ignoring corrupt manifest for {}: {}'.format(
+            stub_path, e))
+        return {}
+
+    # Skip the import header; see render.format_module_stub()
+    body = stub_lines[len(manifest['imports']):]
+    line_count = sum(symbol[2] for symbol in manifest['symbols'])
+    if len(body) != line_count and not (line_count == 0 and body == ['']):
+        log.warning('Ignoring manifest that doesn\'t match {}'.format(
+            stub_path))
+        return {}
+
+    symbols = {}
+    start = 0
+    for attr_name, attr_hash, line_count, imports in manifest['symbols']:
+        symbols[attr_name] = Symbol(
+            attr_hash, body[start:start + line_count], tuple(imports))
+        start += line_count
+    return symbols
+
+
+def count_lines(lines):
+    """Count the lines that stub lines are once they're joined
+
+    Rendered lines may themselves contain newlines, e.g., for decorated
+    functions.
+    """
+    return sum(line.count('\n') + 1 for line in lines)
+
+
+def save_symbols(stub_path: Path, imports, symbols):
+    manifest = {
+        'imports': sorted(imports),
+        'symbols': [
+            [
+                attr_name, symbol.hash, count_lines(symbol.lines),
+                list(symbol.imports),
+            ]
+            for attr_name, symbol in symbols.items()
+        ],
+    }
+    with get_manifest_path(stub_path).open('w') as f:
+        json.dump(manifest, f)
+
+
+def generate_incremental(
+        backend, generator, module, version, writer, compact=False):
+    """Regenerate a namespace's stub, re-rendering only changed attributes
+
+    `generator` is the `backend` module, and `module` the namespace it
+    loaded. Returns the names of the attributes that were re-rendered.
+    As with `StubWriter.write_namespace()`, any stub package left from
+    the package layout is removed.
+    """
+    module_name = module.__name__
+    name = module_name.rsplit('.', 1)[-1]
+    stub_path = writer.get_stub_path(module_name)
+
+    # Only the changed attributes are loaded, once they've been hashed
+    attrs = generator.list_module_attrs(module)
+    try:
+        hashes, hash_records = hash_attrs(
+            backend, name, version, attrs, compact)
+    except (FileNotFoundError, ValueError) as e:
+        log.warning(
+            'Regenerating all of {}, since it can\'t be hashed: {}'.format(
+                module_name, e))
+        writer.remove_manifest(module_name)
+        writer.write_stub(module_name, render_module(
+            generator.build_module(module), compact))
+        writer.remove_package(module_name)
+        return attrs
+
+    old_symbols = load_symbols(stub_path)
+    changed = [
+        attr_name for attr_name in attrs
+        if attr_name not in old_symbols or
+        old_symbols[attr_name].hash != hashes[attr_name]
+    ]
+
+    if get_hash_backend(backend) == backend:
+        records = hash_records
+    else:
+        records = group_records(
+            generator.generate_listed_attr_records(module, changed))
+
+    renderer = Renderer(module_name, compact)
+    symbols = collections.OrderedDict()
+    changed_attrs = set(changed)
+    for attr_name in attrs:
+        if attr_name not in changed_attrs:
+            symbols[attr_name] = old_symbols[attr_name]
+            continue
+
+        attr_records = records.get(attr_name, [])
+        lines = [
+            line for record in attr_records
+            for line in renderer.format_fragment(record)
+        ]
+        imports = get_imports(module_name, attr_records)
+        symbols[attr_name] = Symbol(
+            hashes[attr_name], lines, tuple(sorted(imports)))
+
+    imports = get_imports(module_name, ())
+    for symbol in symbols.values():
+        imports.update(symbol.imports)
+    fragments = [
+        (attr_name, symbol.lines) for attr_name, symbol in symbols.items()]
+    if compact:
+        # Symbols' names are their attributes' names, other than for
+        # GObject.Object, which is never imported under an alias
+        check_compact_imports(module_name, imports, symbols)
+
+    writer.write_stub(
+        module_name, format_module_stub(imports, fragments, compact))
+    save_symbols(stub_path, imports, symbols)
+    writer.remove_package(module_name)
+    log.info('Re-rendered {} of {} attributes of {}'.format(
+        len(changed), len(attrs), module_name))
+    return changed
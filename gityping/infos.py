@@ -0,0 +1,432 @@
+"""Stub records built from introspection infos
+
+The repository, GIR and typelib backends stub a namespace from its
+infos rather than from the classes pygobject creates, and the default
+backend does the same for methods, fields and callbacks. They all share
+`InfoBuilder`, which only uses the parts of the GIRepository info API
+that it calls, so that it works the same over pygobject's infos and
+over the GI-free backends' stand-ins for them. Nothing here may import
+gi.
+"""
+
+import collections
+import enum
+import keyword
+import logging
+
+from .annotations import GTypeTag, combine_return_types
+from .const import ATTR_IGNORE_LIST
+from .ir import (
+    Alias,
+    CallableType,
+    Class,
+    EnumMember,
+    Function,
+    Parameter,
+    Subscript,
+    TypeRef,
+    Variable,
+)
+
+
+log = logging.getLogger(__name__)
+
+#: A backend's info classes, by the names of the GI classes they mirror
+InfoTypes = collections.namedtuple('InfoTypes', [
+    'CallableInfo', 'CallbackInfo', 'ConstantInfo', 'EnumInfo',
+    'FunctionInfo', 'InterfaceInfo', 'ObjectInfo', 'RegisteredTypeInfo',
+    'StructInfo', 'UnionInfo', 'VFuncInfo',
+])
+
+
+class Direction(enum.IntEnum):
+    """Argument directions, with the same values as GI's GIDirection"""
+
+    IN = 0
+    OUT = 1
+    INOUT = 2
+
+
+def escape_name(name):
+    """Escape a name as pygobject does for its infos' names
+
+    pygobject still escapes `print`, which was a keyword in Python 2.
+    """
+    if keyword.iskeyword(name) or name == 'print':
+        return name + '_'
+    return name
+
+
+def unescape_name(name):
+    if name.endswith('_') and escape_name(name[:-1]) == name:
+        return name[:-1]
+    return name
+
+
+def format_info_name(info):
+    # Object and GObject are the same; see gityping.format_cls_name()
+    if info.get_namespace() == 'GObject' and info.get_name() == 'Object':
+        return 'GObject'
+    return info.get_name()
+
+
+class TypeInfoCache:
+    """Memoised `get_typeinfo()` results for a single generation run"""
+
+    def __init__(self):
+        self.results = {}
+        self.hits = 0
+        self.misses = 0
+
+    def log_stats(self, module):
+        log.debug('get_typeinfo cache for {}: {} hits, {} misses'.format(
+            module, self.hits, self.misses))
+
+
+class InfoBuilder:
+    """Builds the stub records for infos
+
+    `types` are the classes of the infos being stubbed. Type annotations
+    are memoised for the lifetime of the builder, so a builder should
+    only be used for a single module.
+    """
+
+    def __init__(self, types: InfoTypes):
+        self.types = types
+        self.typeinfo_cache = TypeInfoCache()
+
+    def make_typeref(self, info):
+        """Get a reference to the class (or callback alias) of an info"""
+        return TypeRef(
+            'gi.repository.{}'.format(info.get_namespace()),
+            format_info_name(info))
+
+    def typeinfo_key(self, typeinfo):
+        """Get a hashable identity for a type, or None if it has none
+
+        The same type is represented by many different type infos, so
+        this is built from the parts that `get_typeinfo()` depends on.
+        """
+        type_tag = typeinfo.get_tag()
+
+        if type_tag == GTypeTag.INTERFACE:
+            iface = typeinfo.get_interface()
+            # Callbacks embedded in struct fields are anonymous, and may
+            # share names with other embedded callbacks.
+            if iface is None or iface.get_container() is not None:
+                return None
+            return (
+                type_tag,
+                typeinfo.is_pointer(),
+                iface.get_namespace(),
+                iface.get_name(),
+            )
+
+        if type_tag in (GTypeTag.ARRAY, GTypeTag.GLIST, GTypeTag.GSLIST):
+            param_type = typeinfo.get_param_type(0)
+            param_key = param_type and self.typeinfo_key(param_type)
+            if param_key is None:
+                return None
+            return (type_tag, typeinfo.is_pointer(), param_key)
+
+        return (type_tag, typeinfo.is_pointer())
+
+    def get_typeinfo(self, typeinfo):
+        """Obtain a python-style type annotation for the given type info
+
+        Results are memoised in `typeinfo_cache`.
+        """
+        key = self.typeinfo_key(typeinfo)
+        if key is None:
+            return self.resolve_typeinfo(typeinfo)
+
+        cache = self.typeinfo_cache
+        try:
+            pytype = cache.results[key]
+        except KeyError:
+            cache.misses += 1
+            pytype = cache.results[key] = self.resolve_typeinfo(typeinfo)
+        else:
+            cache.hits += 1
+        return pytype
+
+    def resolve_typeinfo(self, typeinfo):
+        """Work out a python-style type annotation for the given type info
+
+        This is currently only called when handling function arguments,
+        return values, fields and constants. As such, it doesn't handle
+        all possible type infos. The result is an annotation as
+        described in `gityping.ir`.
+        """
+        type_tag = GTypeTag.from_typeinfo(typeinfo)
+
+        if type_tag == GTypeTag.INTERFACE:
+            iface = typeinfo.get_interface()
+
+            # At this point we have an interface. This may be a GObject
+            # subclass with a fundamental GType like a GEnum, or it could
+            # be a full GObject class, or it could be a callback or
+            # similar.
+
+            if isinstance(iface, self.types.CallableInfo):
+                # Named callbacks are referenced by name, and only
+                # callbacks embedded in struct fields are given in full.
+                if iface.get_container() is None:
+                    return self.make_typeref(iface)
+                return self.make_callable_type(iface)
+            elif isinstance(iface, self.types.RegisteredTypeInfo):
+                # TODO: Interfaces with a GType of G_TYPE_NONE may be
+                # gpointers, although in at least some cases the
+                # gpointer in question has additional type annotations.
+                # In all cases I've checked, a reference works fine.
+                return self.make_typeref(iface)
+
+        # TODO: This handles basic types, but handling for, lists, hashes,
+        # etc. is at best partial.
+        pytype = type_tag.as_pytype()
+        if pytype == list:
+            # TODO: pygobject removes length parameters associated with
+            # arrays based on extra annotations. We don't yet handle this.
+            if type_tag == GTypeTag.ARRAY:
+                # TODO: If the array has a length arg,
+                # typeinfo.get_array_length() gives it to us. However, we
+                # need this at a higher level.
+                if typeinfo.get_array_length() >= 0:
+                    log.error("Missing array length argument handling!")
+
+            # This is undocumented, but... appears correct?
+            param_type = typeinfo.get_param_type(0)
+            if param_type is None:
+                # Unannotated containers hold gpointers
+                return Subscript('typing.List', ['typing.Any'])
+            return Subscript(
+                'typing.List', [self.get_typeinfo(param_type)])
+
+        if type_tag == GTypeTag.VOID and typeinfo.is_pointer():
+            # This is probably an opaque gpointer; we don't know anything
+            # about this, so mark it accordingly.
+            pytype = "typing.Any"
+
+        if pytype is None and type_tag != GTypeTag.VOID:
+            log.error("Incomplete tag mapping for {}".format(type_tag))
+
+        return pytype
+
+    def details_from_funcinfo(self, function, *, strip_bool_result=False):
+
+        # TODO: Also handle getters, setters, etc.?
+
+        # Callback infos don't have `is_method` or `is_constructor`,
+        # thus this exception handling.
+        try:
+            needs_self = isinstance(function, self.types.VFuncInfo) or (
+                function.is_method())
+        except AttributeError:
+            needs_self = False
+        try:
+            is_static = not needs_self and (
+                function.is_constructor() or
+                function.get_container() is not None)
+        except AttributeError:
+            is_static = False
+
+        # There's no context to determine classmethod vs. staticmethod
+        # here, but sampling a few headers they're all static.
+        decorator = "staticmethod" if is_static else None
+
+        parameters = []
+        if needs_self:
+            parameters.append(Parameter('self'))
+
+        # TODO: We can't do this. The argument list is stateful because of
+        # (at least) array length arguments, so we need to maintain some
+        # state of the type parsing in between everything and return a
+        # reconstucted argument list at the end.
+
+        return_types = [self.get_typeinfo(function.get_return_type())]
+
+        for argument in function.get_arguments():
+            annotation = self.get_typeinfo(argument.get_type())
+
+            # FIXME: INOUT should possibly be treated differently here.
+            if argument.get_direction() in (Direction.IN, Direction.INOUT):
+                # TODO: I think POSITIONAL_OR_KEYWORD is actually true for
+                # gi... maybe?
+                parameters.append(Parameter(
+                    argument.get_name(), annotation=annotation))
+            else:
+                return_types.append(annotation)
+
+        return_type = combine_return_types(
+            return_types, strip_bool_result=strip_bool_result)
+        return decorator, parameters, return_type
+
+    def make_callable_type(self, callback):
+        decorator, parameters, return_type = self.details_from_funcinfo(
+            callback)
+        return CallableType([p.annotation for p in parameters], return_type)
+
+    def make_callback_alias(self, attr_name, callback):
+        """Make the module-level alias that a named callback is used by"""
+        return Alias(attr_name, self.make_callable_type(callback))
+
+    def make_function(self, attr_name, function, *, strip_bool_result=False):
+        decorator, parameters, return_type = self.details_from_funcinfo(
+            function, strip_bool_result=strip_bool_result)
+        return Function(
+            attr_name, parameters, return_type=return_type,
+            decorator=decorator)
+
+    def make_field(self, attr_name, field):
+        return Variable(attr_name, self.get_typeinfo(field.get_type()))
+
+    def make_constant(self, attr_name, constant):
+        annotation = self.get_typeinfo(constant.get_type())
+        if not isinstance(annotation, type):
+            # Constants of enum types are just ints
+            annotation = int
+        return Variable(attr_name, annotation)
+
+    def get_boxed_base(self, info):
+        """Get the base of a struct or union's wrapper
+
+        pygobject's boxed and struct wrappers have no GObject base, other
+        than for fundamental types that GI doesn't describe.
+        """
+        return None
+
+    def get_class_base(self, info):
+        """Get the base that pygobject gives the wrapper of an info
+
+        This mirrors the bases pygobject gives its wrapper classes,
+        without creating the wrapper.
+        """
+        if isinstance(info, self.types.ObjectInfo):
+            parent = info.get_parent()
+            return self.make_typeref(parent) if parent else None
+        if isinstance(info, self.types.EnumInfo):
+            if info.is_flags():
+                return TypeRef('gi.repository.GObject', 'GFlags')
+            return TypeRef('gi.repository.GObject', 'GEnum')
+        if isinstance(info, self.types.InterfaceInfo):
+            return TypeRef('gi.repository.GObject', 'GInterface')
+        return self.get_boxed_base(info)
+
+    def get_info_members(self, info):
+        """Get the members of a class from its info
+
+        Returns `(attr_name, build)` pairs, where `build(attr_name)`
+        gives the member's record. This follows pygobject's naming when
+        setting up wrapper classes.
+        """
+        members = []
+
+        def add_function(attr_name, function):
+            members.append((
+                attr_name,
+                lambda name: self.make_function(name, function),
+            ))
+
+        for method in info.get_methods():
+            add_function(method.__name__, method)
+
+        # pygobject adds the class struct's methods as class methods,
+        # unless they would mask an inherited attribute.
+        class_struct = None
+        if isinstance(info, self.types.ObjectInfo):
+            class_struct = info.get_class_struct()
+        if class_struct is not None and class_struct.get_methods():
+            inherited = self.get_inherited_names(info)
+            for method in class_struct.get_methods():
+                if method.__name__ not in inherited:
+                    add_function(method.__name__, method)
+
+        if isinstance(info, self.types.EnumInfo):
+            enum_type = format_info_name(info)
+            for value in info.get_values():
+                members.append((
+                    value.get_name_unescaped().upper(),
+                    lambda name, value=value.get_value(): EnumMember(
+                        name, enum_type, value),
+                ))
+            return members
+
+        if isinstance(info, (
+                self.types.ObjectInfo, self.types.StructInfo,
+                self.types.UnionInfo)):
+            for field in info.get_fields():
+                members.append((
+                    field.get_name().replace('-', '_'),
+                    lambda name, field=field: self.make_field(name, field),
+                ))
+
+        if isinstance(info, (self.types.ObjectInfo, self.types.InterfaceInfo)):
+            for constant in info.get_constants():
+                members.append((
+                    constant.get_name(),
+                    lambda name, constant=constant: self.make_constant(
+                        name, constant),
+                ))
+
+        # pygobject doesn't expose GObject.Object's vfuncs, since they
+        # would break its static bindings.
+        if isinstance(info, self.types.ObjectInfo) and not (
+                info.get_namespace() == 'GObject' and
+                info.get_name() == 'Object'):
+            for vfunc in info.get_vfuncs():
+                add_function('do_{}'.format(vfunc.__name__), vfunc)
+
+        return members
+
+    def get_inherited_names(self, info):
+        """Get the names of the members an object's wrapper inherits"""
+        names = set()
+        for base in info.get_interfaces():
+            names.update(name for name, _ in self.get_info_members(base))
+        parent = info.get_parent()
+        if parent is not None:
+            names.update(name for name, _ in self.get_info_members(parent))
+            names.update(self.get_inherited_names(parent))
+        return names
+
+    def build_info_class(self, info):
+        log.debug("Generating stubs for {}".format(info))
+
+        builders = {}
+        for attr_name, build in self.get_info_members(info):
+            builders.setdefault(attr_name, build)
+
+        members = [
+            builders[attr_name](attr_name)
+            for attr_name in sorted(builders)
+            if attr_name.isidentifier() and not (
+                attr_name.startswith('__') or attr_name in ATTR_IGNORE_LIST)
+        ]
+        return Class(
+            format_info_name(info), self.get_class_base(info), members)
+
+    def is_class_info(self, info):
+        return isinstance(info, self.types.RegisteredTypeInfo) and (
+            not isinstance(info, self.types.CallbackInfo))
+
+    def build_info_record(self, attr_name, info):
+        """Build the record for a module attribute from its info
+
+        Returns None for attributes that aren't stubbed.
+        """
+        if self.is_class_info(info):
+            if attr_name.endswith(('Class', 'Private')):
+                log.debug(
+                    'Skipping GObject-style internal class {}'.format(
+                        attr_name))
+                return None
+            return self.build_info_class(info)
+        elif isinstance(info, self.types.FunctionInfo):
+            return self.make_function(attr_name, info)
+        elif isinstance(info, self.types.ConstantInfo):
+            return self.make_constant(attr_name, info)
+        elif isinstance(info, self.types.CallbackInfo):
+            return self.make_callback_alias(attr_name, info)
+
+        log.warning('Unsupported info {} for {}'.format(info, attr_name))
+        return None
@@ -0,0 +1,178 @@
+"""Intermediate representation of generated stubs
+
+Introspection produces these records, and `gityping.render` turns them
+into stub text. Records are deliberately small (`__slots__` only, with
+tuples for sequences) and don't reference any GI objects, so that a
+whole namespace can be kept in memory, compared, or pickled to send
+between processes.
+
+Annotations in records are one of:
+
+ * a builtin type such as `int` or `str`, rendered by name;
+ * `None`, for no value;
+ * a string, which is rendered as is but quoted in signatures;
+ * a `TypeRef`, `Subscript` or `CallableType`;
+ * an `Expression`, which is rendered as is everywhere; or
+ * `inspect.Parameter.empty`, for no annotation at all.
+"""
+
+import inspect
+
+
+class Record:
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, slot) == getattr(other, slot)
+            for slot in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, slot) for slot in self.__slots__))
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, ', '.join(
+            repr(getattr(self, slot)) for slot in self.__slots__))
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+
+class Expression(Record):
+    """Python source for an annotation or default, rendered as is"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        # inspect renders annotations and defaults it doesn't know using
+        # their repr, so this makes them appear verbatim in signatures.
+        return self.text
+
+
+class TypeRef(Record):
+    """A reference to a class in a (possibly different) stub module"""
+
+    __slots__ = ('module', 'name')
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+
+
+class Subscript(Record):
+    """A subscripted generic such as `typing.List[int]`"""
+
+    __slots__ = ('origin', 'args')
+
+    def __init__(self, origin, args):
+        self.origin = origin
+        self.args = tuple(args)
+
+
+class CallableType(Record):
+    """A callback signature
+
+    Named callback types are referenced with a `TypeRef` to their
+    `Alias`, so this only appears in aliases and for anonymous callbacks
+    such as those embedded in struct fields.
+    """
+
+    __slots__ = ('args', 'return_type')
+
+    def __init__(self, args, return_type):
+        self.args = tuple(args)
+        self.return_type = return_type
+
+
+class Parameter(Record):
+    __slots__ = ('name', 'annotation', 'default', 'kind')
+
+    def __init__(
+            self, name, annotation=inspect.Parameter.empty,
+            default=inspect.Parameter.empty,
+            kind=inspect.Parameter.POSITIONAL_OR_KEYWORD):
+        self.name = name
+        self.annotation = annotation
+        self.default = default
+        self.kind = kind
+
+
+class Function(Record):
+    """A function or method, optionally decorated (e.g., staticmethod)"""
+
+    __slots__ = ('name', 'decorator', 'parameters', 'return_type')
+
+    def __init__(
+            self, name, parameters, return_type=inspect.Parameter.empty,
+            decorator=None):
+        self.name = name
+        self.decorator = decorator
+        self.parameters = tuple(parameters)
+        self.return_type = return_type
+
+
+class Variable(Record):
+    """A module or class attribute, including struct fields"""
+
+    __slots__ = ('name', 'annotation')
+
+    def __init__(self, name, annotation):
+        self.name = name
+        self.annotation = annotation
+
+
+class Alias(Record):
+    """A module-level type alias, e.g., for a named callback type"""
+
+    __slots__ = ('name', 'annotation')
+
+    def __init__(self, name, annotation):
+        self.name = name
+        self.annotation = annotation
+
+
+class EnumMember(Record):
+    """A value of an enum or flags class"""
+
+    __slots__ = ('name', 'enum_type', 'value')
+
+    def __init__(self, name, enum_type, value):
+        self.name = name
+        self.enum_type = enum_type
+        self.value = value
+
+
+class Class(Record):
+    """A class and its members, in attribute order
+
+    `base` is a `TypeRef` or None.
+    """
+
+    __slots__ = ('name', 'base', 'members')
+
+    def __init__(self, name, base, members):
+        self.name = name
+        self.base = base
+        self.members = tuple(members)
+
+
+class Module(Record):
+    """A stub module and its members
+
+    `members` are `(attr_name, record)` pairs in attribute order, since
+    a class may be rendered with a name other than its attribute's.
+    """
+
+    __slots__ = ('name', 'members')
+
+    def __init__(self, name, members):
+        self.name = name
+        self.members = tuple(members)
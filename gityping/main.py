@@ -1,34 +1,41 @@
 import collections
+import functools
 import importlib
 import logging
-import logging.config
 import sys
 from pathlib import Path
 
 import click
 
-from .const import MODULES
-from .gityping import generate_module_stub
+from .const import (
+    BACKENDS,
+    CHECKERS,
+    GI_FREE_BACKENDS,
+    LAYOUTS,
+    MODULES,
+    REQUEST_KINDS,
+)
 
+# Everything else (and GI in particular) is imported by the commands that
+# need it, so that `--help` and usage errors only pay for importing click.
 
-def ensure_module(stubs_base_path: Path, module) -> Path:
-    *parent, name = module.__name__.split('.')
-    path = stubs_base_path.joinpath(*parent)
-    path.mkdir(parents=True, exist_ok=True)
 
-    current = path
-    while current != stubs_base_path:
-        package_marker = current / '__init__.py'
-        if not package_marker.exists():
-            package_marker.touch()
-        current = current.parent
-    return path / '{}.pyi'.format(name)
+log = logging.getLogger(__name__)
 
 
-def write_to_stubs(module, stub_str: str, stubs_base_path: Path):
-    stub_file = ensure_module(stubs_base_path, module)
-    with stub_file.open('w') as f:
-        f.write(stub_str)
+def require_versions(modules=MODULES):
+    import gi
+
+    for name, version in modules:
+        gi.require_version(name, version)
+
+
+def get_module(name):
+    return importlib.import_module('gi.repository.{}'.format(name))
+
+
+def get_backend(name):
+    return importlib.import_module(BACKENDS[name])
 
 
 def get_modules():
@@ -37,19 +44,19 @@ def get_modules():
     This can be used interactively like:
         from gityping import *; globals().update(gimme())
     """
-    import gi
+    require_versions()
 
     modules = collections.OrderedDict()
 
     for name, version in MODULES:
-        gi.require_version(name, version)
-        module = importlib.import_module('gi.repository.{}'.format(name))
-        modules[name] = module
+        modules[name] = get_module(name)
 
     return modules
 
 
 def setup_logging(debug):
+    import logging.config
+
     config = {
         'version': 1,
         'disable_existing_loggers': False,
@@ -76,16 +83,489 @@ def setup_logging(debug):
     logging.config.dictConfig(config)
 
 
-@click.command()
+class DefaultCommandGroup(click.Group):
+    """A command group that runs a default command if none is given
+
+    This keeps `gityping [MODULES]...` working alongside subcommands.
+    """
+
+    def __init__(self, *args, default_command, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_command = default_command
+
+    def parse_args(self, ctx, args):
+        if not args or (
+                args[0] not in self.commands and
+                args[0] not in self.get_help_option_names(ctx)):
+            args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup, default_command='generate')
+def main():
+    """Generate typing stubs for GObject introspection bindings"""
+
+
+@main.command()
 @click.argument('modules', default=None, nargs=-1)
 @click.option('--debug', is_flag=True, default=False)
-def main(modules, debug):
+@click.option(
+    '--force', is_flag=True, default=False,
+    help='Regenerate stubs even if their fingerprint is unchanged')
+@click.option(
+    '--jobs', '-j', type=click.IntRange(min=1), default=1,
+    help='Number of worker processes for generating namespaces')
+@click.option(
+    '--max-namespaces-per-worker', type=click.IntRange(min=1), default=None,
+    help='Replace worker processes after this many namespaces or shards')
+@click.option(
+    '--shards', type=click.IntRange(min=1), default=1,
+    help='Number of worker tasks to split each namespace across')
+@click.option(
+    '--backend', type=click.Choice(list(BACKENDS)), default='module',
+    help='Source of introspection data for generating stubs')
+@click.option(
+    '--profile', is_flag=True, default=False,
+    help='Profile the generation of each namespace')
+@click.option(
+    '--profile-dir', type=click.Path(file_okay=False), default='profile',
+    help='Directory for profiling results')
+@click.option(
+    '--discover', is_flag=True, default=False,
+    help='Generate installed namespaces and their dependencies, in '
+         'dependency order, rather than the configured namespaces')
+@click.option(
+    '--matrix', is_flag=True, default=False,
+    help='Generate a separate stub tree for each NAME-VERSION target, '
+         'e.g., Gtk-3.0 and Gtk-4.0')
+@click.option(
+    '--watch', is_flag=True, default=False,
+    help='Keep running, and regenerate stubs when typelibs (or GIRs) '
+         'change; only for the gir and typelib backends')
+@click.option(
+    '--incremental', is_flag=True, default=False,
+    help='Only re-render the classes and functions of a stale namespace '
+         'that changed, when generating in this process')
+@click.option(
+    '--layout', type=click.Choice(LAYOUTS), default='module',
+    help='Write each namespace as a single stub module, or as a stub '
+         'package split by initial letter')
+@click.option(
+    '--compact', is_flag=True, default=False,
+    help='Write smaller stubs, referencing other namespaces through '
+         'short imports and leaving out unneeded blank lines')
+@click.option(
+    '--symbols', is_flag=True, default=False,
+    help='Also write a queryable database of the stubs\' symbols; see '
+         'the query command')
+def generate(
+        modules, debug, force, jobs, max_namespaces_per_worker, shards,
+        backend, profile, profile_dir, discover, matrix, watch, incremental,
+        layout, compact, symbols):
+    """Generate stubs for the given (or all configured) namespaces"""
     setup_logging(debug)
 
+    if incremental and layout != 'module':
+        raise click.UsageError(
+            '--incremental is only supported for the module layout')
+    if symbols and (incremental or matrix):
+        raise click.UsageError(
+            '--symbols is not supported with --incremental or --matrix')
+    if watch and backend not in GI_FREE_BACKENDS:
+        # GI can't reload a namespace once it's loaded, so a warm process
+        # couldn't regenerate with it.
+        raise click.UsageError(
+            '--watch is only supported for the gir and typelib backends')
+
+    options = dict(
+        jobs=jobs, max_namespaces_per_worker=max_namespaces_per_worker,
+        shards=shards, backend=backend, debug=debug,
+        profile_dir=Path(profile_dir) if profile else None,
+        discover=discover, matrix=matrix, incremental=incremental,
+        layout=layout, compact=compact, symbols=symbols,
+    )
+    generate_namespaces(modules, force=force, **options)
+    if not watch:
+        return
+
+    from .watch import watch_namespaces
+
+    def regenerate(names):
+        log.info('Regenerating after changes to {}'.format(
+            ', '.join(sorted(names))))
+        generate_namespaces(modules, force=False, **options)
+
+    try:
+        watch_namespaces(backend, regenerate)
+    except OSError as e:
+        raise click.ClickException('Couldn\'t watch for changes: {}'.format(e))
+
+
+def generate_namespaces(
+        modules, *, force, jobs, max_namespaces_per_worker, shards, backend,
+        profile_dir, discover, matrix, incremental=False, layout='module',
+        compact=False, symbols=False, debug=False):
+    """Generate stubs for the given namespaces, skipping unchanged ones
+
+    `incremental` enables symbol-level regeneration of namespaces
+    generated in this process; see `gityping.incremental`. If `symbols`
+    is set, generated namespaces are also written to the symbol
+    database; see `gityping.symbols`.
+    """
+    from .cache import (
+        load_fingerprints,
+        namespace_fingerprint,
+        save_fingerprints,
+    )
+    from .incremental import generate_incremental
+    from .package import render_package
+    from .parallel import generate_stubs
+    from .pipeline import stream_module_stub
+    from .profiling import (
+        clear_profiles,
+        get_profile_path,
+        profiled,
+        write_summary,
+    )
+    from .writer import StubWriter
+
     stub_base = Path('stubs')
-    module_dict = get_modules()
-    if modules:
-        module_dict = {k: v for k, v in module_dict.items() if k in modules}
-    for module in module_dict.values():
-        stub = generate_module_stub(module)
-        write_to_stubs(module, stub, stub_base)
+
+    if matrix:
+        from .discovery import discover_targets
+        from .matrix import generate_matrix
+
+        if not modules:
+            raise click.UsageError('--matrix needs targets to generate')
+        try:
+            targets = discover_targets(modules)
+        except FileNotFoundError as e:
+            raise click.UsageError(str(e))
+        generate_matrix(
+            targets, stub_base, jobs, backend=backend, shards=shards,
+            force=force, max_namespaces_per_worker=max_namespaces_per_worker,
+            profile_dir=profile_dir, layout=layout, compact=compact,
+            debug=debug,
+        )
+        return
+
+    writer = StubWriter(stub_base, layout)
+    dependencies = None
+    if discover:
+        from .discovery import discover_namespaces
+
+        try:
+            graph = discover_namespaces(modules)
+        except FileNotFoundError as e:
+            raise click.UsageError(str(e))
+        targets = [(name, node.version) for name, node in graph.items()]
+        dependencies = {
+            (name, node.version): [
+                (dependency, graph[dependency].version)
+                for dependency in node.dependencies
+            ]
+            for name, node in graph.items()
+        }
+    else:
+        targets = [(n, v) for n, v in MODULES if not modules or n in modules]
+
+    # Versions must be pinned before anything is loaded, since loading
+    # one namespace pulls in its dependencies.
+    pinned = targets if discover else MODULES
+    if backend not in GI_FREE_BACKENDS:
+        require_versions(pinned)
+
+    database = None
+    if symbols:
+        from .symbols import SymbolDatabase, get_database_path
+
+        database = SymbolDatabase(get_database_path(stub_base))
+
+    versions = dict(targets)
+    fingerprints = load_fingerprints(stub_base)
+    stale = collections.OrderedDict()
+    for name, version in targets:
+        fingerprint = namespace_fingerprint(name, version, backend, compact)
+        stub_path = writer.get_namespace_path(
+            'gi.repository.{}'.format(name))
+        if (not force and fingerprints.get(name) == fingerprint and
+                stub_path.exists() and (
+                    database is None or
+                    database.get_fingerprint(name) == fingerprint)):
+            log.info('Skipping unchanged namespace {}'.format(name))
+            continue
+        stale[name] = fingerprint
+
+    def add_module_symbols(name, version, module):
+        if database is None:
+            return
+        database.begin_namespace(name)
+        for attr_name, record in module.members:
+            database.add_record(name, record)
+
+    def mark_generated(name):
+        fingerprints[name] = stale[name]
+        save_fingerprints(stub_base, fingerprints)
+        if database is not None:
+            database.finish_namespace(name, versions[name], stale[name])
+
+    if profile_dir:
+        clear_profiles(profile_dir, stale)
+
+    if stale and jobs > 1 and len(stale) * shards > 1:
+        stubs = generate_stubs(
+            [(name, versions[name]) for name in stale], jobs,
+            backend=backend, shards=shards,
+            max_namespaces_per_worker=max_namespaces_per_worker,
+            profile_dir=profile_dir, dependencies=dependencies,
+            pinned=pinned, layout=layout, compact=compact,
+            on_module=add_module_symbols, debug=debug,
+        )
+        for name, version, stub in stubs:
+            writer.write_namespace('gi.repository.{}'.format(name), stub)
+            mark_generated(name)
+    else:
+        generator = get_backend(backend)
+        for name in stale:
+            profile_path = None
+            if profile_dir:
+                profile_path = get_profile_path(profile_dir, name)
+            with profiled(profile_path):
+                module = generator.load_namespace(name, versions[name])
+                if layout == 'package':
+                    module_record = generator.build_module(module)
+                    add_module_symbols(name, versions[name], module_record)
+                    writer.write_namespace(module.__name__, render_package(
+                        module_record, compact))
+                else:
+                    if incremental:
+                        generate_incremental(
+                            backend, generator, module, versions[name],
+                            writer, compact)
+                    else:
+                        on_record = None
+                        if database is not None:
+                            database.begin_namespace(name)
+                            on_record = functools.partial(
+                                database.add_record, name)
+                        stream_module_stub(
+                            generator, module, writer, compact=compact,
+                            on_record=on_record)
+                        writer.remove_manifest(module.__name__)
+                        writer.remove_package(module.__name__)
+            mark_generated(name)
+
+    writer.log_summary()
+    if database is not None:
+        database.close()
+    if profile_dir:
+        summary_path = write_summary(profile_dir, stale)
+        log.info('Wrote profiling summary to {}'.format(summary_path))
+
+
+@main.command()
+@click.argument('names', nargs=-1, required=True)
+@click.option(
+    '--database', type=click.Path(dir_okay=False), default=None,
+    help='Symbol database to query, by default the one written to the '
+         'stubs directory by `generate --symbols`')
+@click.option(
+    '--members', is_flag=True, default=False,
+    help='Show the members of the given classes or namespaces')
+@click.option(
+    '--json', 'as_json', is_flag=True, default=False,
+    help='Write results as JSON')
+def query(names, database, members, as_json):
+    """Look up symbols by qualified name, e.g., Gtk.TreeView.get_path
+
+    The last part of a name may be a glob pattern, e.g., Gtk.Tree*.
+    """
+    import json
+
+    from .symbols import (
+        SymbolDatabase,
+        format_symbol,
+        get_database_path,
+        symbol_to_dict,
+    )
+
+    setup_logging(False)
+    path = Path(database) if database else get_database_path(Path('stubs'))
+    if not path.exists():
+        raise click.ClickException(
+            'No symbol database at {}; generate stubs with --symbols '
+            'first'.format(path))
+
+    results = []
+    with SymbolDatabase(path) as db:
+        for name in names:
+            try:
+                if members:
+                    namespace, _, owner = name.partition('.')
+                    symbols = db.get_members(namespace, owner)
+                else:
+                    symbols = db.lookup(name)
+            except ValueError as e:
+                raise click.UsageError(str(e))
+            if not symbols:
+                log.warning('No symbols match {}'.format(name))
+            results.extend(symbols)
+
+    if as_json:
+        click.echo(json.dumps(
+            [symbol_to_dict(symbol) for symbol in results], indent=2))
+    else:
+        for symbol in results:
+            click.echo(format_symbol(symbol))
+    if not results:
+        sys.exit(1)
+
+
+@main.command()
+@click.argument('modules', default=None, nargs=-1)
+@click.option('--debug', is_flag=True, default=False)
+@click.option(
+    '--backend', type=click.Choice(list(BACKENDS)), default='module',
+    help='Source of introspection data for generating stubs')
+@click.option(
+    '--socket', 'socket_path', type=click.Path(dir_okay=False),
+    default=None,
+    help='Unix socket to listen on, by default one in XDG_RUNTIME_DIR')
+def serve(modules, debug, backend, socket_path):
+    """Serve stubs of the given (or all configured) namespaces
+
+    The namespaces are loaded once, and stubs are then rendered on
+    request; see the request command.
+    """
+    import signal
+
+    from .server import StubService, get_socket_path, run_server
+
+    setup_logging(debug)
+
+    targets = [(n, v) for n, v in MODULES if not modules or n in modules]
+    if backend not in GI_FREE_BACKENDS:
+        require_versions(targets)
+    service = StubService(backend, targets)
+    service.load()
+
+    # Clean up the socket when stopped by e.g. systemd
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        run_server(
+            service, Path(socket_path) if socket_path else get_socket_path())
+    except OSError as e:
+        raise click.ClickException(str(e))
+    except KeyboardInterrupt:
+        pass
+
+
+@main.command()
+@click.argument(
+    'kind', type=click.Choice(REQUEST_KINDS))
+@click.argument('names', nargs=-1)
+@click.option(
+    '--socket', 'socket_path', type=click.Path(dir_okay=False),
+    default=None, help='Unix socket of the stub server')
+@click.option(
+    '--compact', is_flag=True, default=False,
+    help='Request stubs in compact mode')
+def request(kind, names, socket_path, compact):
+    """Request stubs or signatures from a running stub server
+
+    NAMES are namespaces (e.g., Gtk), classes (e.g., Gtk.Button) or
+    functions (e.g., Gtk.Button.set_label), depending on KIND.
+    """
+    import json
+
+    from .server import RequestError, StubClient
+
+    if kind != 'metrics' and not names:
+        raise click.UsageError('A {} request needs names'.format(kind))
+
+    try:
+        client = StubClient(Path(socket_path) if socket_path else None)
+    except OSError as e:
+        raise click.ClickException(
+            'Couldn\'t connect to a stub server ({}); start one with the '
+            'serve command'.format(e))
+    with client:
+        if kind == 'metrics':
+            click.echo(json.dumps(client.request(kind), indent=2))
+            return
+        for name in names:
+            try:
+                result = client.request(kind, name, compact)
+            except RequestError as e:
+                raise click.ClickException(str(e))
+            if kind == 'signature':
+                result = '\n'.join(result)
+            click.echo(result)
+
+
+@main.command()
+@click.argument('modules', default=None, nargs=-1)
+@click.option('--debug', is_flag=True, default=False)
+@click.option(
+    '--repetitions', '-n', type=click.IntRange(min=1), default=5,
+    help='Number of timed runs per namespace')
+@click.option(
+    '--warmup', type=click.IntRange(min=0), default=1,
+    help='Number of untimed runs per namespace before timing')
+@click.option(
+    '--backend', type=click.Choice(list(BACKENDS)), default='module',
+    help='Source of introspection data for generating stubs')
+@click.option(
+    '--output', '-o', type=click.File('w'), default='-',
+    help='File to write JSON results to')
+def bench(modules, debug, repetitions, warmup, backend, output):
+    """Benchmark stub generation for each namespace"""
+    import json
+
+    from .bench import run_benchmarks
+
+    setup_logging(debug)
+
+    names = [n for n, v in MODULES if not modules or n in modules]
+    results = run_benchmarks(
+        names, backend=backend, repetitions=repetitions, warmup=warmup)
+    json.dump(results, output, indent=2)
+    output.write('\n')
+
+
+@main.command('bench-layouts')
+@click.argument('modules', default=None, nargs=-1)
+@click.option('--debug', is_flag=True, default=False)
+@click.option(
+    '--checker', type=click.Choice(sorted(CHECKERS)), default='mypy',
+    help='Type checker to time on the sample project')
+@click.option(
+    '--repetitions', '-n', type=click.IntRange(min=1), default=5,
+    help='Number of timed checker runs per layout')
+@click.option(
+    '--warmup', type=click.IntRange(min=0), default=1,
+    help='Number of untimed checker runs per layout before timing')
+@click.option(
+    '--backend', type=click.Choice(list(BACKENDS)), default='module',
+    help='Source of introspection data for generating stubs')
+@click.option(
+    '--output', '-o', type=click.File('w'), default='-',
+    help='File to write JSON results to')
+def bench_layouts(
+        modules, debug, checker, repetitions, warmup, backend, output):
+    """Benchmark a type checker on a sample project for each layout"""
+    import json
+
+    from .bench import run_layout_benchmarks
+
+    setup_logging(debug)
+
+    names = [n for n, v in MODULES if not modules or n in modules]
+    try:
+        results = run_layout_benchmarks(
+            names, checker=checker, backend=backend,
+            repetitions=repetitions, warmup=warmup)
+    except FileNotFoundError as e:
+        raise click.ClickException(str(e))
+    json.dump(results, output, indent=2)
+    output.write('\n')
@@ -0,0 +1,113 @@
+"""Generation of a version matrix of namespaces
+
+Each matrix target (e.g., `Gtk-3.0` and `Gtk-4.0`) gets a complete stub
+tree of its own in a version-qualified directory under the stubs base
+(e.g., `stubs/Gtk-3.0`), holding the target and everything it depends
+on. Every namespace version is generated once, in a worker that only
+pins the versions it needs, and its stub is then written to each tree
+that needs it. Dependencies shared between targets, like GLib and
+GObject, are only generated once, and targets are generated in
+parallel rather than one after the other.
+
+Fingerprints are kept per tree, just as for the stubs base of a normal
+run.
+"""
+
+import collections
+import logging
+
+from .cache import load_fingerprints, namespace_fingerprint, save_fingerprints
+from .discovery import build_matrix
+from .parallel import generate_stubs
+from .profiling import clear_profiles, write_summary
+from .writer import StubWriter
+
+
+log = logging.getLogger(__name__)
+
+
+def format_target(target):
+    return '{}-{}'.format(*target)
+
+
+def get_namespace_graph(matrix):
+    """Merge the graphs of a matrix into one graph of namespace versions
+
+    Returns a dictionary mapping each `(name, version)` to the namespace
+    versions it depends on, and one mapping it to the matrix targets
+    whose trees need it.
+    """
+    dependencies = collections.OrderedDict()
+    trees = collections.defaultdict(list)
+    for target, graph in matrix.items():
+        for name, node in graph.items():
+            namespace = (name, node.version)
+            dependencies[namespace] = [
+                (dependency, graph[dependency].version)
+                for dependency in sorted(node.dependencies)
+            ]
+            trees[namespace].append(target)
+    return dependencies, trees
+
+
+def generate_matrix(
+        targets, stub_base, jobs, *, backend='module', shards=1,
+        force=False, max_namespaces_per_worker=None, profile_dir=None,
+        layout='module', compact=False, debug=False):
+    """Generate a stub tree for each `(name, version)` target
+
+    Targets whose dependencies can't all be found are skipped.
+    """
+    matrix = build_matrix(targets)
+    dependencies, trees = get_namespace_graph(matrix)
+
+    writers = collections.OrderedDict(
+        (target, StubWriter(stub_base / format_target(target), layout))
+        for target in matrix
+    )
+    fingerprints = {
+        target: load_fingerprints(writer.stubs_base_path)
+        for target, writer in writers.items()
+    }
+
+    stale = collections.OrderedDict()
+    for namespace in dependencies:
+        name, version = namespace
+        fingerprint = namespace_fingerprint(
+            name, version, backend, compact)
+        module_name = 'gi.repository.{}'.format(name)
+        if not force and all(
+                fingerprints[target].get(name) == fingerprint and
+                writers[target].get_namespace_path(module_name).exists()
+                for target in trees[namespace]):
+            log.info('Skipping unchanged namespace {}'.format(
+                format_target(namespace)))
+            continue
+        stale[namespace] = fingerprint
+
+    labels = [format_target(namespace) for namespace in stale]
+    if profile_dir:
+        clear_profiles(profile_dir, labels)
+
+    if stale:
+        stubs = generate_stubs(
+            list(stale), jobs, backend=backend, shards=shards,
+            max_namespaces_per_worker=max_namespaces_per_worker,
+            profile_dir=profile_dir, dependencies=dependencies,
+            isolated=True, layout=layout, compact=compact, debug=debug,
+        )
+        for name, version, stub in stubs:
+            namespace = (name, version)
+            for target in trees[namespace]:
+                writer = writers[target]
+                writer.write_namespace('gi.repository.{}'.format(name), stub)
+                fingerprints[target][name] = stale[namespace]
+                save_fingerprints(
+                    writer.stubs_base_path, fingerprints[target])
+
+    for writer in writers.values():
+        log.info('{}: {} stubs written, {} unchanged'.format(
+            writer.stubs_base_path, writer.written, writer.unchanged))
+    if profile_dir:
+        summary_path = write_summary(profile_dir, labels)
+        log.info('Wrote profiling summary to {}'.format(summary_path))
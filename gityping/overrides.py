@@ -0,0 +1,308 @@
+"""pygobject's Python overrides, read without importing gi
+
+The GI-free backends can't import `gi.overrides`, so instead they find
+a namespace's overrides module on `sys.path` and parse it, to get the
+public members that its override classes add to GI classes. These are
+stubbed as `gityping.add_override_members()` stubs them after importing
+the classes, other than members that can only be known by running the
+module (e.g., wrapped GI functions), which are left out.
+"""
+
+import ast
+import inspect
+import logging
+import sys
+from pathlib import Path
+
+from .ir import Class, Expression, Function, Parameter, Variable
+
+
+log = logging.getLogger(__name__)
+
+#: Members that override classes add, by namespace and class name
+override_members = {}
+
+
+def get_overrides_dirs():
+    """Get the directories that `gi.overrides` modules are found in
+
+    pygobject extends `gi.overrides` over every `gi/overrides` directory
+    on `sys.path`, so they're given in the same order.
+    """
+    directories = []
+    for entry in sys.path:
+        directory = Path(entry or '.') / 'gi' / 'overrides'
+        if directory.is_dir() and directory not in directories:
+            directories.append(directory)
+    return directories
+
+
+def find_overrides(namespace):
+    """Get the path of a namespace's overrides module, or None"""
+    for directory in get_overrides_dirs():
+        overrides_path = directory / '{}.py'.format(namespace)
+        if overrides_path.exists():
+            return overrides_path
+    return None
+
+
+def get_exported_names(tree):
+    """Get the names that a module literally adds to its `__all__`"""
+    names = set()
+    for node in tree.body:
+        value = None
+        if isinstance(node, (ast.Assign, ast.AugAssign)):
+            targets = (
+                node.targets if isinstance(node, ast.Assign)
+                else [node.target])
+            if any(getattr(t, 'id', None) == '__all__' for t in targets):
+                value = node.value
+        elif (
+                isinstance(node, ast.Expr) and
+                isinstance(node.value, ast.Call) and
+                isinstance(node.value.func, ast.Attribute) and
+                getattr(node.value.func.value, 'id', None) == '__all__' and
+                node.value.args):
+            value = node.value.args[0]
+            if node.value.func.attr == 'append':
+                value = ast.List([value])
+        if value is None:
+            continue
+        try:
+            names.update(ast.literal_eval(value))
+        except (TypeError, ValueError):
+            log.debug('Skipping non-literal __all__ at line {}'.format(
+                node.lineno))
+    return names
+
+
+def get_introspection_aliases(tree, namespace):
+    """Get the names that a module binds its introspection module to"""
+    aliases = set()
+    for node in tree.body:
+        if not (
+                isinstance(node, ast.Assign) and
+                isinstance(node.value, ast.Call)):
+            continue
+        # e.g., `gi.module.get_introspection_module('GObject')`
+        func = node.value.func
+        func_name = getattr(func, 'attr', getattr(func, 'id', None))
+        if func_name != 'get_introspection_module':
+            continue
+        try:
+            args = [ast.literal_eval(arg) for arg in node.value.args]
+        except (TypeError, ValueError):
+            continue
+        if args == [namespace]:
+            aliases.update(
+                t.id for t in node.targets if isinstance(t, ast.Name))
+    return aliases
+
+
+def make_default(node):
+    """Get the record default for a default value's expression
+
+    This matches `gityping.make_python_default()` for literals, and
+    anything else has to be evaluated, so it's left as `...`.
+    """
+    try:
+        value = ast.literal_eval(node)
+    except (TypeError, ValueError):
+        return Expression('...')
+    if value is None or type(value) in (bool, int, float, str, bytes):
+        return value
+    return Expression(repr(value))
+
+
+def make_annotation(node):
+    if node is None:
+        return inspect.Parameter.empty
+    if isinstance(node, ast.Name):
+        return node.id
+    return 'typing.Any'
+
+
+def make_function(name, node):
+    """Make the record for a function definition, as it would be imported
+
+    Decorators other than those handled by `get_class_members()` are
+    assumed to wrap the function, as `functools.wraps()` does.
+    """
+    args = node.args
+    positional = [
+        (arg, inspect.Parameter.POSITIONAL_ONLY)
+        for arg in getattr(args, 'posonlyargs', [])
+    ] + [
+        (arg, inspect.Parameter.POSITIONAL_OR_KEYWORD) for arg in args.args
+    ]
+    defaults = [None] * (len(positional) - len(args.defaults))
+    defaults.extend(args.defaults)
+
+    parameters = []
+
+    def add_parameter(arg, kind, default=None):
+        parameters.append(Parameter(
+            arg.arg,
+            annotation=make_annotation(arg.annotation),
+            default=(
+                inspect.Parameter.empty if default is None
+                else make_default(default)),
+            kind=kind,
+        ))
+
+    for (arg, kind), default in zip(positional, defaults):
+        add_parameter(arg, kind, default)
+    if args.vararg:
+        add_parameter(args.vararg, inspect.Parameter.VAR_POSITIONAL)
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        add_parameter(arg, inspect.Parameter.KEYWORD_ONLY, default)
+    if args.kwarg:
+        add_parameter(args.kwarg, inspect.Parameter.VAR_KEYWORD)
+
+    return Function(
+        name, parameters, return_type=make_annotation(node.returns))
+
+
+def get_decorator_names(node):
+    names = set()
+    for decorator in node.decorator_list:
+        if isinstance(decorator, ast.Name):
+            names.add(decorator.id)
+        elif isinstance(decorator, ast.Attribute):
+            # e.g., `@prop.setter`
+            names.add(decorator.attr)
+    return names
+
+
+def get_class_members(node, functions):
+    """Get the records for the public members a class body defines
+
+    `functions` are the module's own function definitions, by name,
+    which class attributes may be bound to. Like `__dict__`, a later
+    definition of a name replaces an earlier one.
+    """
+    definitions = dict(functions)
+    hints = {
+        item.target.id: item.annotation for item in node.body
+        if isinstance(item, ast.AnnAssign) and
+        isinstance(item.target, ast.Name)
+    }
+    members = {}
+    for item in node.body:
+        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            definitions[item.name] = item
+            decorators = get_decorator_names(item)
+            if 'classmethod' in decorators:
+                # The module backend can't stub bound class methods
+                members.pop(item.name, None)
+            elif decorators & {'property', 'setter', 'getter', 'deleter'}:
+                hint = hints.get(item.name)
+                members[item.name] = Variable(
+                    item.name,
+                    hint.id if isinstance(hint, ast.Name) else 'typing.Any')
+            else:
+                members[item.name] = make_function(item.name, item)
+            continue
+
+        if not (
+                isinstance(item, ast.Assign) and
+                all(isinstance(t, ast.Name) for t in item.targets)):
+            continue
+        value = item.value
+        try:
+            constant = ast.literal_eval(value)
+        except (TypeError, ValueError):
+            constant = None
+        # Calls like `deprecated(func, ...)` are treated as decorators
+        call_name = wrapped = None
+        if isinstance(value, ast.Call):
+            call_name = getattr(value.func, 'id', None)
+            if value.args and isinstance(value.args[0], ast.Name):
+                wrapped = definitions.get(value.args[0].id)
+        elif isinstance(value, ast.Name):
+            wrapped = definitions.get(value.id)
+
+        for target in item.targets:
+            name = target.id
+            if call_name == 'property':
+                members[name] = Variable(name, 'typing.Any')
+            elif wrapped is not None and call_name != 'classmethod':
+                members[name] = make_function(name, wrapped)
+            elif type(constant) in (bool, int, float, str):
+                members[name] = Variable(name, type(constant).__name__)
+            else:
+                log.debug('Skipping unreadable override member {}.{}'.format(
+                    node.name, name))
+                members.pop(name, None)
+
+    return {
+        name: record for name, record in members.items()
+        if not name.startswith('_')
+    }
+
+
+def read_override_members(namespace, overrides_path: Path):
+    """Read the members that a module's override classes add"""
+    tree = ast.parse(overrides_path.read_bytes(), str(overrides_path))
+    exported = get_exported_names(tree)
+    aliases = get_introspection_aliases(tree, namespace)
+    functions = {
+        node.name: node for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    }
+
+    classes = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or node.name not in exported:
+            continue
+        # Only overrides that subclass their GI class add to it
+        if not any(
+                isinstance(base, ast.Attribute) and
+                base.attr == node.name and
+                getattr(base.value, 'id', None) in aliases
+                for base in node.bases):
+            continue
+        classes[node.name] = get_class_members(node, functions)
+    return classes
+
+
+def get_override_members(namespace):
+    """Get the members that a namespace's override classes add
+
+    Returns a dict of `{class_name: {attr_name: record}}`, which is
+    empty if the namespace has no overrides.
+    """
+    try:
+        return override_members[namespace]
+    except KeyError:
+        pass
+
+    overrides_path = find_overrides(namespace)
+    if overrides_path is None:
+        members = {}
+    else:
+        members = read_override_members(namespace, overrides_path)
+    override_members[namespace] = members
+    return members
+
+
+def forget_namespace(namespace):
+    """Drop the override members read for a namespace"""
+    override_members.pop(namespace, None)
+
+
+def add_override_members(record: Class, namespace, attr_name):
+    """Add the public members that an override class adds to a GI class
+
+    This is the GI-free equivalent of `gityping.add_override_members()`,
+    and likewise keeps the introspected stubs of the GI class's members.
+    """
+    added = get_override_members(namespace).get(attr_name, {})
+    names = {member.name for member in record.members}
+    members = list(record.members)
+    members.extend(
+        member for name, member in added.items() if name not in names)
+    if len(members) == len(record.members):
+        return record
+    members.sort(key=lambda member: member.name)
+    return Class(record.name, record.base, members)
@@ -0,0 +1,146 @@
+"""Rendering of namespaces as stub packages
+
+In the package layout, a namespace's stub is a package rather than a
+single module. Its attributes are split by initial letter across
+private submodules (e.g., `Gtk/_b.pyi` for `Gtk.Button` and
+`Gtk.Box`), and the package's `__init__.pyi` explicitly re-exports each
+of them. Type checkers can then resolve `Gtk.Button` from the
+`__init__.pyi` and the one submodule that defines it, without parsing
+every other class in the namespace.
+
+Submodules refer to their own namespace's classes by bare name, as in
+the module layout, importing any that are defined in other submodules.
+Stub packages can also be rendered in compact mode; see
+`gityping.render`.
+"""
+
+import collections
+
+from .render import (
+    Renderer,
+    check_compact_imports,
+    format_import,
+    get_imports,
+    iter_record_refs,
+    render_module,
+)
+
+
+#: Name of a stub package's own module, relative to the package
+PACKAGE_INIT = '__init__'
+
+
+def get_submodule_name(attr_name):
+    """Get the submodule of a stub package that defines an attribute"""
+    letter = attr_name.lstrip('_')[:1].lower()
+    if not letter.isalpha():
+        letter = 'other'
+    return '_{}'.format(letter)
+
+
+def split_module(module):
+    """Split a module record's members into submodules
+
+    Returns a dictionary mapping submodule names to their
+    `(attr_name, record)` pairs, along with one mapping the names
+    defined by the records to their submodule.
+    """
+    submodules = collections.OrderedDict()
+    definitions = {}
+    for attr_name, record in module.members:
+        submodule = get_submodule_name(attr_name)
+        submodules.setdefault(submodule, []).append((attr_name, record))
+        definitions[record.name] = submodule
+    return submodules, definitions
+
+
+def get_local_imports(module_name, submodule, members, definitions):
+    """Get the names a submodule uses from its package's other submodules
+
+    Returns a dictionary mapping other submodules to the sets of names
+    to import from them.
+    """
+    local_imports = collections.defaultdict(set)
+    for attr_name, record in members:
+        for ref in iter_record_refs(record):
+            if ref.module != module_name:
+                continue
+            # References to names that aren't stubbed stay unresolved,
+            # just as in the module layout.
+            defined_in = definitions.get(ref.name)
+            if defined_in is not None and defined_in != submodule:
+                local_imports[defined_in].add(ref.name)
+    return local_imports
+
+
+def format_submodule_stub(imports, local_imports, fragments, compact=False):
+    """Assemble a submodule stub; see `render.format_module_stub()`"""
+    header = [format_import(imp, compact) for imp in sorted(imports)]
+    header.extend(
+        "from .{} import {}".format(submodule, ", ".join(sorted(names)))
+        for submodule, names in sorted(local_imports.items())
+    )
+
+    attr_stubs = []
+    for attr_name, lines in sorted(fragments, key=lambda f: f[0]):
+        attr_stubs.extend(lines)
+    return "\n".join(header) + "\n" + "\n".join(attr_stubs)
+
+
+def format_package_init(submodules, compact=False):
+    """Assemble a package's `__init__.pyi`, re-exporting its submodules
+
+    `submodules` maps submodule names to the names they define.
+    """
+    lines = []
+    for submodule, names in sorted(submodules.items()):
+        if compact:
+            lines.append("from .{} import {}".format(submodule, ", ".join(
+                "{0} as {0}".format(name) for name in sorted(names))))
+            continue
+        lines.append("from .{} import (".format(submodule))
+        lines.extend(
+            "    {0} as {0},".format(name) for name in sorted(names))
+        lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+def render_package(module, compact=False):
+    """Render a module record as the stubs of a stub package
+
+    Returns a dictionary mapping module names relative to the package
+    (with `PACKAGE_INIT` for the package itself) to their stub text.
+    """
+    renderer = Renderer(module.name, compact)
+    submodules, definitions = split_module(module)
+
+    stubs = collections.OrderedDict()
+    stubs[PACKAGE_INIT] = format_package_init({
+        submodule: {record.name for attr_name, record in members}
+        for submodule, members in submodules.items()
+    }, compact)
+    for submodule, members in submodules.items():
+        fragments = [
+            (attr_name, renderer.format_fragment(record))
+            for attr_name, record in members
+        ]
+        imports = get_imports(
+            module.name, (record for attr_name, record in members))
+        local_imports = get_local_imports(
+            module.name, submodule, members, definitions)
+        if compact:
+            check_compact_imports(module.name, imports, definitions)
+        stubs[submodule] = format_submodule_stub(
+            imports, local_imports, fragments, compact)
+    return stubs
+
+
+def render_namespace(module, layout='module', compact=False):
+    """Render a module record in an output layout
+
+    This gives the stub text for the module layout, and a dictionary
+    of stubs (see `render_package()`) for the package layout.
+    """
+    if layout == 'package':
+        return render_package(module, compact)
+    return render_module(module, compact)
@@ -0,0 +1,179 @@
+"""Process pool generation of namespace stubs
+
+GI state is per-process, so each namespace is loaded and stubbed in a
+worker interpreter, and only its stub records (see `gityping.ir`) are
+sent back to the parent to be rendered. Workers are started with
+'spawn' rather than forked, so that they never inherit a
+half-initialised GI state from the parent.
+
+A namespace may also be split into several shards, each of which
+loads the whole namespace but only builds its share of attributes.
+
+Given a dependency graph (see `gityping.discovery`), a namespace's
+tasks are only started once all of its dependencies are complete, with
+independent namespaces generated in parallel.
+
+Versions are pinned process-wide, so generating different versions of
+a namespace in one run needs isolated workers: each task gets a fresh
+interpreter that pins only the versions that its namespace needs.
+"""
+
+import collections
+import multiprocessing
+import queue
+
+from .const import GI_FREE_BACKENDS, MODULES
+from .ir import Module
+from .package import render_namespace
+
+
+def init_worker(backend, pinned, debug):
+    from .main import require_versions, setup_logging
+
+    # Spawned workers start with no logging configured
+    setup_logging(debug)
+    if backend not in GI_FREE_BACKENDS:
+        require_versions(pinned)
+
+
+def get_task_label(name, version, pinned):
+    """Name a task's namespace, qualified by version if it's isolated"""
+    if pinned is None:
+        return name
+    return '{}-{}'.format(name, version)
+
+
+def generate_namespace_shard(task):
+    from .main import get_backend, require_versions
+    from .profiling import get_profile_path, profiled
+
+    name, version, backend, index, count, profile_dir, pinned = task
+    if pinned is not None and backend not in GI_FREE_BACKENDS:
+        require_versions(pinned)
+
+    profile_path = None
+    if profile_dir is not None:
+        profile_path = get_profile_path(
+            profile_dir, get_task_label(name, version, pinned), index, count)
+
+    with profiled(profile_path):
+        generator = get_backend(backend)
+        module = generator.build_module_shard(
+            generator.load_namespace(name, version), index, count)
+    return (name, version), module
+
+
+def get_closure(target, dependencies):
+    """Get a target and everything it (transitively) depends on"""
+    closure = []
+    pending = [target]
+    while pending:
+        target = pending.pop(0)
+        if target not in closure:
+            closure.append(target)
+            pending.extend(dependencies.get(target, ()))
+    return closure
+
+
+def generate_stubs(
+        targets, jobs, *, backend='module', shards=1,
+        max_namespaces_per_worker=None, profile_dir=None, dependencies=None,
+        pinned=MODULES, isolated=False, layout='module', compact=False,
+        on_module=None, debug=False):
+    """Generate stubs for the given namespaces in a pool of workers
+
+    `targets` are `(name, version)` pairs. Yields `(name, version, stub)`
+    as namespaces complete, which is not necessarily in the order given.
+    Each namespace is split into `shards` worker tasks whose records are
+    merged in the parent; the result is identical to a serial
+    `generate_module_stub()`. For the package layout, the stub is
+    instead a dictionary of stubs; see `gityping.package`. If `compact`
+    is set, stubs are rendered in compact mode; see `gityping.render`.
+    If given, `on_module` is called with each namespace's name, version
+    and merged module record before it's rendered.
+
+    If `dependencies` maps targets to the targets they depend on, each
+    namespace waits for those of its dependencies that are also being
+    generated. The graph must be acyclic.
+
+    Workers pin the `(name, version)` pairs in `pinned` before loading
+    anything, which must include the targets. If `isolated` is set,
+    `pinned` is ignored and each task instead runs in its own worker,
+    pinning its target and the target's dependencies; targets may then
+    include more than one version of a namespace.
+
+    Workers are replaced after handling `max_namespaces_per_worker`
+    tasks, to stop memory held by lazily-created pygobject wrapper
+    classes from accumulating.
+
+    If `profile_dir` is given, each task is profiled in its worker; see
+    `gityping.profiling`. Isolated tasks are profiled under
+    version-qualified names (e.g., `Gtk-3.0`). Workers log as the CLI
+    does, including debug messages if `debug` is set.
+    """
+    targets = list(targets)
+    dependencies = dependencies or {}
+
+    tasks = collections.OrderedDict()
+    for target in targets:
+        task_pins = None
+        if isolated:
+            task_pins = tuple(get_closure(target, dependencies))
+        tasks[target] = [
+            target + (backend, index, shards, profile_dir, task_pins)
+            for index in range(shards)
+        ]
+
+    waiting = {
+        target: set(dependencies.get(target, ())).intersection(targets)
+        for target in targets
+    }
+
+    pending_members = collections.defaultdict(list)
+    pending_shards = collections.Counter(
+        {target: shards for target in targets})
+    results = queue.Queue()
+
+    if isolated:
+        pinned = ()
+        if backend not in GI_FREE_BACKENDS:
+            max_namespaces_per_worker = 1
+
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(
+        processes=min(jobs, len(targets) * shards),
+        initializer=init_worker,
+        initargs=(backend, tuple(pinned), debug),
+        maxtasksperchild=max_namespaces_per_worker,
+    )
+
+    def start_ready():
+        for target in [t for t in targets if t in waiting and not waiting[t]]:
+            del waiting[target]
+            for task in tasks[target]:
+                pool.apply_async(
+                    generate_namespace_shard, (task,),
+                    callback=results.put, error_callback=results.put)
+
+    with pool:
+        start_ready()
+        for _ in targets:
+            while True:
+                result = results.get()
+                if isinstance(result, BaseException):
+                    raise result
+                target, module = result
+                pending_members[target].extend(module.members)
+                pending_shards[target] -= 1
+                if not pending_shards[target]:
+                    break
+
+            for deps in waiting.values():
+                deps.discard(target)
+            start_ready()
+
+            name, version = target
+            module = Module(module.name, pending_members.pop(target))
+            if on_module is not None:
+                on_module(name, version, module)
+            yield name, version, render_namespace(module, layout, compact)
@@ -0,0 +1,114 @@
+"""Streaming generation of stubs from introspection to disk
+
+Attributes are discovered and classified one at a time by a backend's
+`generate_module_records()` in the calling thread, since GI isn't safe
+to use from several threads. The resulting records don't touch GI, so
+they are passed through a bounded queue to a writer thread that renders
+them and streams the result to disk, so only a handful of classes are
+held in memory at once.
+
+The imports a stub needs are only known once every record has been
+seen, so the import header is written last, in front of the
+streamed body, and the finished stub is then handed to the `StubWriter`.
+"""
+
+import collections
+import queue
+import shutil
+import tempfile
+import threading
+
+from .render import (
+    Renderer,
+    check_compact_imports,
+    format_import,
+    get_imports,
+)
+from .writer import StubWriter
+
+
+#: Final queue message, noting whether every record was queued
+StubEnd = collections.namedtuple('StubEnd', ['complete'])
+
+
+def format_imports(imports, compact=False):
+    # This must match the header from render.format_module_stub()
+    return "\n".join(
+        format_import(imp, compact) for imp in sorted(imports)) + "\n"
+
+
+def write_stub_stream(
+        writer: StubWriter, module_name: str, record_queue, errors,
+        compact=False):
+    """Render queued records to a module's stub until the end of the stub
+
+    Any error is added to `errors`, after which the queue is drained
+    without writing so that the producer never blocks.
+    """
+    renderer = Renderer(module_name, compact)
+    imports = get_imports(module_name, ())
+    names = set()
+    with tempfile.TemporaryFile('w+') as body:
+        separator = ''
+        while True:
+            item = record_queue.get()
+            if isinstance(item, StubEnd):
+                break
+            if errors:
+                continue
+            try:
+                for line in renderer.format_fragment(item):
+                    body.write(separator)
+                    body.write(line)
+                    separator = '\n'
+                imports.update(get_imports(module_name, [item]))
+                names.add(item.name)
+            except Exception as e:
+                errors.append(e)
+
+        if not item.complete or errors:
+            return
+
+        try:
+            if compact:
+                check_compact_imports(module_name, imports, names)
+            body.seek(0)
+            with writer.open_stub(module_name) as f:
+                f.write(format_imports(imports, compact))
+                shutil.copyfileobj(body, f)
+        except Exception as e:
+            errors.append(e)
+
+
+def stream_module_stub(
+        backend, module, writer: StubWriter, *, queue_size=16,
+        compact=False, on_record=None):
+    """Generate a module's stub with the given backend and write it
+
+    The result is identical to writing the rendering of the backend's
+    `build_module()` records with `writer.write_stub()`. If given,
+    `on_record` is called in this thread with each record as it's built.
+    """
+    record_queue = queue.Queue(maxsize=queue_size)
+    errors = []
+    writer_thread = threading.Thread(
+        target=write_stub_stream,
+        args=(writer, module.__name__, record_queue, errors, compact),
+        name='stub-writer-{}'.format(module.__name__),
+        daemon=True,
+    )
+    writer_thread.start()
+
+    complete = False
+    try:
+        for attr_name, record in backend.generate_module_records(module):
+            record_queue.put(record)
+            if on_record is not None:
+                on_record(record)
+        complete = True
+    finally:
+        record_queue.put(StubEnd(complete))
+        writer_thread.join()
+
+    if errors:
+        raise errors[0]
@@ -0,0 +1,80 @@
+"""Per-namespace profiling of stub generation
+
+Each namespace (or namespace shard) is profiled separately with
+cProfile, in whichever process generates it, and its stats are dumped
+to `<name>.prof` in the profile directory. Once a run is complete, the
+top cumulative hot spots in gityping itself are summarised per
+namespace in `summary.txt`.
+"""
+
+import contextlib
+import cProfile
+import io
+import pstats
+from pathlib import Path
+
+
+#: Regex restricting the summary to functions in the gityping package
+SUMMARY_RESTRICTION = r'gityping[/\\][^/\\]+\.py'
+
+#: Number of functions listed per namespace in the summary
+SUMMARY_LIMIT = 25
+
+
+def get_profile_path(profile_dir: Path, name, index=0, count=1) -> Path:
+    if count > 1:
+        return profile_dir / '{}.{}.prof'.format(name, index)
+    return profile_dir / '{}.prof'.format(name)
+
+
+@contextlib.contextmanager
+def profiled(profile_path):
+    """Profile the block, dumping stats to `profile_path` if it's set"""
+    if profile_path is None:
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(profile_path))
+
+
+def clear_profiles(profile_dir: Path, names):
+    for name in names:
+        for pattern in ('{}.prof', '{}.*.prof'):
+            for profile_path in profile_dir.glob(pattern.format(name)):
+                profile_path.unlink()
+
+
+def format_summary(name, profile_paths):
+    summary = io.StringIO()
+    summary.write('{}\n{}\n'.format(name, '=' * len(name)))
+    stats = pstats.Stats(*(str(p) for p in profile_paths), stream=summary)
+    stats.sort_stats('cumulative').print_stats(
+        SUMMARY_RESTRICTION, SUMMARY_LIMIT)
+    return summary.getvalue()
+
+
+def write_summary(profile_dir: Path, names):
+    """Summarise the profiles of the given namespaces
+
+    Stats from the shards of a namespace are combined.
+    """
+    sections = []
+    for name in names:
+        profile_paths = sorted(
+            list(profile_dir.glob('{}.prof'.format(name))) +
+            list(profile_dir.glob('{}.*.prof'.format(name)))
+        )
+        if profile_paths:
+            sections.append(format_summary(name, profile_paths))
+
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    summary_path = profile_dir / 'summary.txt'
+    summary_path.write_text('\n'.join(sections))
+    return summary_path
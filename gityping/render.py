@@ -0,0 +1,303 @@
+"""Rendering of stub records as stub text
+
+See `gityping.ir` for the records rendered here. Rendering is entirely
+separate from introspection, so this module doesn't need GI.
+
+In compact mode, other modules are imported under their own short
+names (e.g., `from gi.repository import Gdk`) rather than being
+referenced by their full names, annotations in signatures aren't
+quoted, variables are declared with annotations, and blank lines and
+`...` bodies are only written where they're needed. The result means
+the same to type checkers, in much less text.
+"""
+
+import inspect
+
+from .ir import (
+    Alias,
+    CallableType,
+    Class,
+    EnumMember,
+    Expression,
+    Function,
+    Subscript,
+    TypeRef,
+    Variable,
+)
+
+
+def make_class_stub_out(stub_lines):
+    """Get a `stub_out` callback that adds indented stubs to `stub_lines`"""
+
+    def stub_out(stub):
+        for line in stub.splitlines():
+            if line.strip():
+                line = "    {}".format(line).rstrip()
+            stub_lines.append(line)
+    return stub_out
+
+
+def get_module_alias(module_name):
+    """Get the name a module is imported under in compact stubs"""
+    return module_name.rsplit('.', 1)[-1]
+
+
+def format_import(module_name, compact=False):
+    if compact and '.' in module_name:
+        return "from {} import {}".format(*module_name.rsplit('.', 1))
+    return "import {}".format(module_name)
+
+
+def check_compact_imports(module_name, imports, names):
+    """Check that a compact stub's imports don't shadow any other names
+
+    `names` are the names defined by the stub itself. Raises ValueError
+    if two imports would have the same alias, or an import's alias
+    would hide one of these names.
+    """
+    aliases = {}
+    for imp in imports:
+        alias = get_module_alias(imp)
+        if alias in names or aliases.setdefault(alias, imp) != imp:
+            raise ValueError(
+                "can't import {} as {} in compact stub for {}".format(
+                    imp, alias, module_name))
+
+
+def iter_annotation_refs(annotation):
+    """Iterate over the class references that an annotation renders"""
+    if isinstance(annotation, TypeRef):
+        yield annotation
+    elif isinstance(annotation, Subscript):
+        for arg in annotation.args:
+            yield from iter_annotation_refs(arg)
+    elif isinstance(annotation, CallableType):
+        for arg in annotation.args:
+            yield from iter_annotation_refs(arg)
+        yield from iter_annotation_refs(annotation.return_type)
+
+
+def iter_record_refs(record):
+    """Iterate over the class references that a record renders"""
+    if isinstance(record, Class):
+        if record.base:
+            yield record.base
+        for member in record.members:
+            yield from iter_record_refs(member)
+    elif isinstance(record, Function):
+        for parameter in record.parameters:
+            yield from iter_annotation_refs(parameter.annotation)
+        yield from iter_annotation_refs(record.return_type)
+    elif isinstance(record, (Variable, Alias)):
+        yield from iter_annotation_refs(record.annotation)
+
+
+def get_imports(module_name, records):
+    """Get the modules that a module's stub for `records` must import
+
+    These are worked out from the records' references after the fact,
+    so rendering itself has no side effects.
+    """
+    # We use typing types in a bunch of places; easier to just add this now
+    imports = {'typing'}
+    for record in records:
+        imports.update(
+            ref.module for ref in iter_record_refs(record)
+            if ref.module != module_name
+        )
+    return imports
+
+
+class Renderer:
+    """Renders records as stub text for a single module
+
+    References to classes in other modules are qualified, by the
+    modules' aliases if `compact` is set; see `get_imports()` for the
+    modules these need.
+    """
+
+    def __init__(self, module_name, compact=False):
+        self.module_name = module_name
+        self.compact = compact
+
+    def format_ref(self, ref: TypeRef):
+        if ref.module == self.module_name:
+            return ref.name
+        if self.compact:
+            return '{}.{}'.format(get_module_alias(ref.module), ref.name)
+        return '{}.{}'.format(ref.module, ref.name)
+
+    def format_annotation(self, annotation):
+        """Format an annotation as it appears outside of signatures"""
+        if isinstance(annotation, type):
+            return annotation.__name__
+        if annotation is None:
+            return 'None'
+        if isinstance(annotation, str):
+            return annotation
+        if isinstance(annotation, Expression):
+            return annotation.text
+        if isinstance(annotation, TypeRef):
+            return self.format_ref(annotation)
+        if isinstance(annotation, Subscript):
+            return '{}[{}]'.format(annotation.origin, ', '.join(
+                self.format_annotation(arg) for arg in annotation.args))
+        if isinstance(annotation, CallableType):
+            return self.format_callable(annotation)
+        raise TypeError('Unsupported annotation {!r}'.format(annotation))
+
+    def format_callable_annotation(self, annotation):
+        if annotation is None or annotation is inspect.Parameter.empty:
+            # FIXME: Can we do any better than Any?
+            return 'typing.Any'
+        annotation = self.format_annotation(annotation)
+        # Object and GObject are the same, but normalising here
+        # makes everything nicer
+        if annotation == 'gi.repository.GObject.Object':
+            annotation = 'gi.repository.GObject.GObject'
+        return annotation
+
+    def format_callable(self, callable_type: CallableType):
+        return "typing.Callable[[{arg_types}], {return_type}]".format(
+            arg_types=', '.join(
+                self.format_callable_annotation(arg)
+                for arg in callable_type.args
+            ),
+            return_type=self.format_callable_annotation(
+                callable_type.return_type),
+        )
+
+    def signature_annotation(self, annotation):
+        # inspect renders builtin types by name and everything else by
+        # repr, so anything we format ourselves ends up quoted.
+        if (annotation is None or annotation is inspect.Parameter.empty or
+                isinstance(annotation, (type, Expression))):
+            return annotation
+        if self.compact:
+            # Stubs are never evaluated, so forward references don't
+            # need quoting
+            return Expression(self.format_annotation(annotation))
+        return self.format_annotation(annotation)
+
+    def format_signature(self, function: Function):
+        parameters = [
+            inspect.Parameter(
+                parameter.name,
+                kind=parameter.kind,
+                default=parameter.default,
+                annotation=self.signature_annotation(parameter.annotation),
+            )
+            for parameter in function.parameters
+        ]
+        return str(inspect.Signature(
+            parameters=parameters,
+            return_annotation=self.signature_annotation(function.return_type),
+        ))
+
+    def format_function(self, function: Function):
+        try:
+            signature = self.format_signature(function)
+        except Exception as e:
+            raise ValueError(
+                "couldn't make signature for {}: {}".format(function.name, e))
+
+        preamble = ""
+        if function.decorator:
+            preamble = "@{}\n".format(function.decorator)
+
+        return (
+            "{}"
+            "def {}{}: ...{}"
+        ).format(
+            preamble, function.name, signature,
+            "" if self.compact else "\n")
+
+    def format_variable(self, variable: Variable):
+        annotation = self.format_annotation(variable.annotation)
+        if self.compact:
+            return "{}: {}".format(variable.name, annotation)
+        return "{} = ...  # type: {}".format(variable.name, annotation)
+
+    def format_alias(self, alias: Alias):
+        return "{} = {}".format(
+            alias.name, self.format_annotation(alias.annotation))
+
+    def format_enum_member(self, member: EnumMember):
+        return "{} = ...  # type: {}".format(member.name, member.enum_type)
+
+    def format_member(self, record):
+        if isinstance(record, Function):
+            return self.format_function(record)
+        if isinstance(record, Variable):
+            return self.format_variable(record)
+        if isinstance(record, EnumMember):
+            return self.format_enum_member(record)
+        if isinstance(record, Alias):
+            return self.format_alias(record)
+        raise TypeError('Unsupported member {!r}'.format(record))
+
+    def format_class_header(self, cls: Class):
+        if cls.base:
+            return "class {}({}):".format(cls.name, self.format_ref(cls.base))
+        return "class {}:".format(cls.name)
+
+    def format_class(self, cls: Class):
+        stub_lines = [] if self.compact else ['']
+
+        # TODO: Investigate additional bases; see handling for ObjectInfo
+        # multiple interfaces in  gi.module.IntrospectionModule.__getattr__
+        stub_lines.append(self.format_class_header(cls))
+
+        stub_out = make_class_stub_out(stub_lines)
+        for member in cls.members:
+            stub_out(self.format_member(member))
+        if not (self.compact and cls.members):
+            stub_out("...")
+        return stub_lines
+
+    def format_fragment(self, record):
+        """Format a module-level record as a list of stub lines"""
+        if isinstance(record, Class):
+            if self.compact:
+                return self.format_class(record)
+            return [''] + self.format_class(record)
+        return [self.format_member(record)]
+
+
+def format_module_stub(imports, fragments, compact=False):
+    """Assemble a module stub from its imports and attribute fragments
+
+    `fragments` are `(attr_name, lines)` pairs, in any order.
+    """
+    attr_stubs = []
+    for attr_name, lines in sorted(fragments, key=lambda f: f[0]):
+        attr_stubs.extend(lines)
+
+    stub_str = "\n".join(
+        format_import(imp, compact) for imp in sorted(imports)
+    ) + "\n" + "\n".join(attr_stubs)
+    return stub_str
+
+
+def render_fragments(module, compact=False):
+    """Render a module record's members as `(attr_name, lines)` fragments
+
+    Returns the fragments along with the imports they need.
+    """
+    renderer = Renderer(module.name, compact)
+    fragments = [
+        (attr_name, renderer.format_fragment(record))
+        for attr_name, record in module.members
+    ]
+    imports = get_imports(
+        module.name, (record for attr_name, record in module.members))
+    if compact:
+        check_compact_imports(module.name, imports, {
+            record.name for attr_name, record in module.members})
+    return fragments, imports
+
+
+def render_module(module, compact=False):
+    """Render a module record as stub text"""
+    fragments, imports = render_fragments(module, compact)
+    return format_module_stub(imports, fragments, compact)
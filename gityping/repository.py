@@ -0,0 +1,109 @@
+"""Stub generation directly from a namespace's GIRepository infos
+
+The default backend loads every attribute of a module so that pygobject
+creates its wrapper classes, and then introspects those classes. This
+backend instead enumerates the namespace's infos from the repository
+and stubs them directly, only touching the Python module for names that
+pygobject's overrides replace.
+"""
+
+import inspect
+import logging
+
+from gi._gi import Repository
+
+from . import gityping
+from .const import ATTR_IGNORE_LIST
+from .gityping import (
+    add_override_members,
+    get_namespace,
+    get_override_names,
+)
+from .ir import Module
+from .render import render_module
+
+
+log = logging.getLogger(__name__)
+
+load_namespace = gityping.load_namespace
+load_module_attrs = list_module_attrs = gityping.list_module_attrs
+
+
+def get_namespace_infos(module):
+    repository = Repository.get_default()
+    return {
+        info.get_name(): info
+        for info in repository.get_infos(get_namespace(module))
+    }
+
+
+def is_info_subclass(cls, info):
+    """Whether a class is, or subclasses, the GI class for an info"""
+    return (
+        inspect.isclass(cls) and gityping.info_builder.is_class_info(info) and
+        getattr(cls, '__info__', None) == info)
+
+
+def generate_attr_records(module, attrs):
+    """Generate stub records for the given module attributes
+
+    This is the equivalent of `gityping.generate_attr_records()`,
+    which is still used for attributes without an info and for most
+    overridden ones. An override that subclasses its GI class is instead
+    stubbed from the class's info, with the override's extra members
+    added, as the default backend does. Records are generated in the
+    same order as `attrs`.
+    """
+    overrides = get_override_names(module)
+    infos = get_namespace_infos(module)
+
+    for attr_name in attrs:
+        info = infos.get(attr_name)
+        override = None
+        if attr_name in overrides:
+            override = gityping.get_override(module, attr_name)
+            if not is_info_subclass(override, info):
+                info = None
+        if info is None:
+            yield from gityping.generate_single_attr_records(
+                module, attr_name)
+            continue
+        if attr_name.startswith('__') or attr_name in ATTR_IGNORE_LIST:
+            continue
+        if not attr_name.isidentifier():
+            log.debug('Skipping invalid identifier {}'.format(
+                attr_name))
+            continue
+
+        record = gityping.info_builder.build_info_record(attr_name, info)
+        if record is None:
+            continue
+        if override is not None:
+            record = add_override_members(record, override)
+        yield attr_name, record
+
+
+generate_listed_attr_records = generate_attr_records
+
+
+def build_module_shard(module, index, count):
+    """Build the records for a shard of the module; see gityping.py"""
+    attrs = load_module_attrs(module)
+    records = list(generate_attr_records(module, attrs[index::count]))
+    gityping.info_builder.typeinfo_cache.log_stats(module)
+    return Module(module.__name__, records)
+
+
+def build_module(module):
+    return build_module_shard(module, 0, 1)
+
+
+def generate_module_records(module):
+    """Generate all of a module's records lazily; see gityping.py"""
+    attrs = load_module_attrs(module)
+    yield from generate_attr_records(module, attrs)
+    gityping.info_builder.typeinfo_cache.log_stats(module)
+
+
+def generate_module_stub(module):
+    return render_module(build_module(module))
@@ -0,0 +1,318 @@
+"""A long-lived stub server, holding loaded namespaces warm
+
+Importing pygobject and loading a namespace like Gtk takes seconds,
+which editor integrations and hooks otherwise pay every time they need
+a stub. The server loads the configured namespaces once, builds their
+module records, and then renders stubs from those records on request,
+caching each namespace's rendered stub.
+
+Requests and responses are single lines of JSON over a Unix socket, and
+a connection can be used for any number of requests. A request gives
+its kind and, other than for metrics, a qualified name:
+
+    {"kind": "namespace", "name": "Gtk", "compact": false}
+    {"kind": "class", "name": "Gtk.Button"}
+    {"kind": "signature", "name": "Gtk.Button.set_label"}
+    {"kind": "metrics"}
+
+and is answered with either `{"result": ...}` or `{"error": ...}`,
+along with the milliseconds taken to handle it. GI can't reload a
+namespace, so the server has to be restarted to pick up changes to
+typelibs or overrides.
+"""
+
+import collections
+import importlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .bench import percentile
+from .const import BACKENDS, REQUEST_KINDS
+from .ir import Class, Function, Module
+from .render import Renderer, render_module
+from .symbols import split_qualified_name
+
+
+log = logging.getLogger(__name__)
+
+#: Number of recent requests of each kind to report latencies over
+METRICS_WINDOW = 1000
+
+
+class RequestError(Exception):
+    """A request that can't be answered, e.g., for an unknown name"""
+
+
+def get_socket_path() -> Path:
+    """Get the default socket path, private to the current user"""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return Path(runtime_dir) / 'gityping-{}.sock'.format(os.getuid())
+
+
+class Metrics:
+    """Per-kind request counts and latencies"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.counts = collections.Counter()
+        self.errors = collections.Counter()
+        self.latencies = collections.defaultdict(
+            lambda: collections.deque(maxlen=METRICS_WINDOW))
+
+    def record(self, kind, elapsed, error=False):
+        self.counts[kind] += 1
+        if error:
+            self.errors[kind] += 1
+        self.latencies[kind].append(elapsed)
+
+    def summary(self):
+        """Summarise latencies in milliseconds over recent requests"""
+        kinds = collections.OrderedDict()
+        for kind in sorted(self.counts):
+            latencies = sorted(self.latencies[kind])
+            kinds[kind] = collections.OrderedDict([
+                ('count', self.counts[kind]),
+                ('errors', self.errors[kind]),
+                ('median_ms', round(statistics.median(latencies) * 1000, 3)),
+                ('p95_ms', round(percentile(latencies, 0.95) * 1000, 3)),
+                ('max_ms', round(latencies[-1] * 1000, 3)),
+            ])
+        return collections.OrderedDict([
+            ('uptime_seconds', round(time.monotonic() - self.started, 1)),
+            ('requests', kinds),
+        ])
+
+
+def get_named_members(module, attr_name, record_type):
+    """Get a module's records of a type for an attribute name
+
+    Records are looked up by the attribute they're stubbed for, since
+    e.g. `GObject.Object` has the record name `GObject`.
+    """
+    return [
+        (name, record) for name, record in module.members
+        if name == attr_name and isinstance(record, record_type)
+    ]
+
+
+class StubService:
+    """Stubs rendered from namespaces that are loaded once
+
+    `targets` are the `(name, version)` pairs of the namespaces to load
+    with the given backend. Requests are handled one at a time, since
+    neither GI nor the caches are thread-safe.
+    """
+
+    def __init__(self, backend, targets):
+        self.generator = importlib.import_module(BACKENDS[backend])
+        self.versions = collections.OrderedDict(targets)
+        self.modules = {}
+        self.stubs = {}
+        self.metrics = Metrics()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Load and build every namespace, so that requests are warm"""
+        for name, version in self.versions.items():
+            start = time.perf_counter()
+            namespace = self.generator.load_namespace(name, version)
+            self.modules[name] = self.generator.build_module(namespace)
+            log.info('Loaded {} {} in {:.2f}s'.format(
+                name, version, time.perf_counter() - start))
+
+    def get_module(self, name) -> Module:
+        try:
+            return self.modules[name]
+        except KeyError:
+            raise RequestError('Namespace {} isn\'t loaded'.format(name))
+
+    def get_namespace_stub(self, name, compact=False):
+        key = name, compact
+        if key not in self.stubs:
+            self.stubs[key] = render_module(self.get_module(name), compact)
+        return self.stubs[key]
+
+    def get_class_stub(self, qualified_name, compact=False):
+        namespace, _, class_name = qualified_name.partition('.')
+        module = self.get_module(namespace)
+        members = get_named_members(module, class_name, Class)
+        if not members:
+            raise RequestError('No class {}'.format(qualified_name))
+        return render_module(Module(module.name, members), compact)
+
+    def get_signatures(self, qualified_name, compact=False):
+        """Get the signatures of a function or method, as in its stub
+
+        This is a list, since e.g. overrides may define a name twice.
+        """
+        try:
+            namespace, owner, name = split_qualified_name(qualified_name)
+        except ValueError as e:
+            raise RequestError(str(e))
+        module = self.get_module(namespace)
+        if owner:
+            records = [
+                member
+                for _, record in get_named_members(module, owner, Class)
+                for member in record.members
+                if isinstance(member, Function) and member.name == name
+            ]
+        else:
+            records = [
+                record
+                for _, record in get_named_members(module, name, Function)
+            ]
+        renderer = Renderer(module.name, compact)
+        signatures = [
+            '{}{}'.format(record.name, renderer.format_signature(record))
+            for record in records
+        ]
+        if not signatures:
+            raise RequestError('No function {}'.format(qualified_name))
+        return signatures
+
+    def handle(self, request):
+        kind = request.get('kind')
+        if kind not in REQUEST_KINDS:
+            raise RequestError('Unknown request kind {!r}'.format(kind))
+        if kind == 'metrics':
+            return self.metrics.summary()
+
+        name = request.get('name')
+        if not isinstance(name, str):
+            raise RequestError('A {} request needs a name'.format(kind))
+        compact = bool(request.get('compact', False))
+        if kind == 'namespace':
+            return self.get_namespace_stub(name, compact)
+        if kind == 'class':
+            return self.get_class_stub(name, compact)
+        return self.get_signatures(name, compact)
+
+    def respond(self, line: bytes):
+        """Handle a line of JSON, returning the response to send"""
+        with self.lock:
+            return self.respond_locked(line)
+
+    def respond_locked(self, line: bytes):
+        start = time.perf_counter()
+        request = None
+        try:
+            request = json.loads(line.decode())
+            if not isinstance(request, dict):
+                raise RequestError('Requests must be JSON objects')
+            response = {'result': self.handle(request)}
+        except (RequestError, ValueError) as e:
+            response = {'error': str(e)}
+        except Exception as e:
+            log.exception('Failed to handle {!r}'.format(request))
+            response = {'error': 'Internal error: {}'.format(e)}
+
+        kind = request.get('kind') if isinstance(request, dict) else None
+        if kind not in REQUEST_KINDS:
+            kind = 'invalid'
+        elapsed = time.perf_counter() - start
+        self.metrics.record(kind, elapsed, error='error' in response)
+        response['elapsed_ms'] = round(elapsed * 1000, 3)
+        log.debug('Handled {} request in {:.3f}ms'.format(
+            kind, elapsed * 1000))
+        return response
+
+
+class StubRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            response = self.server.service.respond(line)
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
+
+
+class StubServer(socketserver.ThreadingUnixStreamServer):
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, service: StubService):
+        self.service = service
+        super().__init__(str(socket_path), StubRequestHandler)
+
+
+def remove_stale_socket(socket_path: Path):
+    """Remove a socket left behind by a server that's no longer running
+
+    Raises `OSError` if a server is still listening on it.
+    """
+    if not socket_path.exists():
+        return
+    try:
+        with StubClient(socket_path):
+            pass
+    except ConnectionRefusedError:
+        socket_path.unlink()
+        return
+    raise OSError('A server is already listening on {}'.format(socket_path))
+
+
+def run_server(service: StubService, socket_path: Path):
+    """Answer requests for the service's stubs until interrupted"""
+    remove_stale_socket(socket_path)
+    # Only the current user can connect; the socket's directory may not
+    # be private, as it is for XDG_RUNTIME_DIR.
+    umask = os.umask(0o177)
+    try:
+        server = StubServer(socket_path, service)
+    finally:
+        os.umask(umask)
+
+    log.info('Listening on {}'.format(socket_path))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        socket_path.unlink()
+
+
+class StubClient:
+    """A connection to a stub server, for any number of requests"""
+
+    def __init__(self, socket_path: Path = None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self.socket.connect(str(socket_path or get_socket_path()))
+        except OSError:
+            self.socket.close()
+            raise
+        self.file = self.socket.makefile('rwb')
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def request(self, kind, name=None, compact=False):
+        """Make a request, returning its result
+
+        Raises `RequestError` if the server couldn't answer it.
+        """
+        request = {'kind': kind, 'name': name, 'compact': compact}
+        self.file.write(json.dumps(request).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('The stub server closed the connection')
+        response = json.loads(line.decode())
+        if 'error' in response:
+            raise RequestError(response['error'])
+        return response['result']
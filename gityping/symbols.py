@@ -0,0 +1,257 @@
+"""A queryable database of the symbols in generated stubs
+
+When enabled, every record that a run renders as a stub is also written
+to an SQLite database in the stubs base directory, along with its
+namespace, owning class, kind, parameters, and return or value type.
+Types are rendered as they are in compact stubs (e.g., `Gtk.TreePath`),
+and a function's full signature is stored as it appears in stubs.
+
+A namespace's symbols are replaced as a whole each time it's generated,
+in a single transaction, and the namespace's fingerprint is stored with
+them so that a missing or outdated database causes regeneration just
+like a missing stub. Lookups by qualified name (e.g.,
+`Gtk.TreeView.get_path_at_pos`) are a single indexed query.
+"""
+
+import collections
+import inspect
+import sqlite3
+from pathlib import Path
+
+from .ir import Alias, Class, EnumMember, Function, Variable
+from .render import Renderer
+
+
+#: Name of the symbol database file in the stubs base directory
+DATABASE_FILENAME = 'gityping-symbols.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS namespaces (
+    name TEXT PRIMARY KEY,
+    version TEXT NOT NULL,
+    fingerprint TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    id INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    base TEXT,
+    type TEXT,
+    signature TEXT,
+    value INTEGER
+);
+CREATE INDEX IF NOT EXISTS symbols_by_name ON symbols (namespace, owner, name);
+CREATE TABLE IF NOT EXISTS parameters (
+    symbol_id INTEGER NOT NULL REFERENCES symbols (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    annotation TEXT,
+    default_value TEXT,
+    PRIMARY KEY (symbol_id, position)
+) WITHOUT ROWID;
+"""
+
+#: A stub symbol; `owner` is its class's name, or '' at module level
+Symbol = collections.namedtuple('Symbol', [
+    'namespace', 'owner', 'name', 'kind', 'base', 'type', 'signature',
+    'value', 'parameters',
+])
+
+SymbolParameter = collections.namedtuple('SymbolParameter', [
+    'name', 'kind', 'annotation', 'default',
+])
+
+
+def get_database_path(stubs_base_path: Path) -> Path:
+    return stubs_base_path / DATABASE_FILENAME
+
+
+def get_function_kind(function: Function, owner):
+    if function.decorator:
+        return function.decorator
+    return 'method' if owner else 'function'
+
+
+def split_qualified_name(qualified_name):
+    """Split e.g. `Gtk.TreeView.get_path_at_pos` into its parts
+
+    Returns the namespace, owning class ('' at module level) and name.
+    """
+    parts = qualified_name.split('.')
+    if len(parts) == 2:
+        return parts[0], '', parts[1]
+    if len(parts) == 3:
+        return tuple(parts)
+    raise ValueError(
+        'Expected Namespace.name or Namespace.Class.name, not {}'.format(
+            qualified_name))
+
+
+class SymbolDatabase:
+    """An SQLite database of stub symbols
+
+    This is used from a single thread, which for generation is the one
+    that builds records; see `pipeline.stream_module_stub()`.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path))
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+        # Types are rendered with references qualified by namespace
+        self.renderer = Renderer(None, compact=True)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_fingerprint(self, namespace):
+        row = self.connection.execute(
+            'SELECT fingerprint FROM namespaces WHERE name = ?',
+            (namespace,)).fetchone()
+        return row[0] if row else None
+
+    def begin_namespace(self, namespace):
+        """Start replacing a namespace's symbols
+
+        Nothing is visible to readers until `finish_namespace()`, and
+        the old symbols are kept if the database is closed before then.
+        """
+        self.connection.execute(
+            'DELETE FROM symbols WHERE namespace = ?', (namespace,))
+        self.connection.execute(
+            'DELETE FROM namespaces WHERE name = ?', (namespace,))
+
+    def finish_namespace(self, namespace, version, fingerprint):
+        self.connection.execute(
+            'INSERT INTO namespaces (name, version, fingerprint) '
+            'VALUES (?, ?, ?)', (namespace, version, fingerprint))
+        self.connection.commit()
+
+    def format_type(self, annotation):
+        if annotation is inspect.Parameter.empty:
+            return None
+        return self.renderer.format_annotation(annotation)
+
+    def add_symbol(self, namespace, owner, record):
+        base = type_ = signature = value = None
+        if isinstance(record, Class):
+            kind = 'class'
+            if record.base:
+                base = self.renderer.format_ref(record.base)
+        elif isinstance(record, Function):
+            kind = get_function_kind(record, owner)
+            type_ = self.format_type(record.return_type)
+            signature = self.renderer.format_signature(record)
+        elif isinstance(record, Variable):
+            kind = 'variable'
+            type_ = self.format_type(record.annotation)
+        elif isinstance(record, Alias):
+            kind = 'alias'
+            type_ = self.format_type(record.annotation)
+        elif isinstance(record, EnumMember):
+            kind = 'enum-member'
+            type_ = '{}.{}'.format(namespace, record.enum_type)
+            value = record.value
+        else:
+            raise TypeError('Unsupported record {!r}'.format(record))
+
+        cursor = self.connection.execute(
+            'INSERT INTO symbols (namespace, owner, name, kind, base, type, '
+            'signature, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (namespace, owner, record.name, kind, base, type_, signature,
+             value))
+
+        if isinstance(record, Function):
+            self.connection.executemany(
+                'INSERT INTO parameters (symbol_id, position, name, kind, '
+                'annotation, default_value) VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (cursor.lastrowid, position, parameter.name,
+                     parameter.kind.name.lower(),
+                     self.format_type(parameter.annotation),
+                     None if parameter.default is inspect.Parameter.empty
+                     else repr(parameter.default))
+                    for position, parameter in enumerate(record.parameters)
+                ])
+        elif isinstance(record, Class):
+            for member in record.members:
+                self.add_symbol(namespace, record.name, member)
+
+    def add_record(self, namespace, record):
+        """Add a module-level record and all of its members"""
+        self.add_symbol(namespace, '', record)
+
+    def get_parameters(self, symbol_id):
+        return [
+            SymbolParameter(*row) for row in self.connection.execute(
+                'SELECT name, kind, annotation, default_value '
+                'FROM parameters WHERE symbol_id = ? ORDER BY position',
+                (symbol_id,))
+        ]
+
+    def make_symbols(self, rows):
+        return [
+            Symbol(*row[1:], parameters=self.get_parameters(row[0]))
+            for row in rows
+        ]
+
+    def lookup(self, qualified_name):
+        """Get the symbols with a qualified name
+
+        Names are given as `Namespace.name` or `Namespace.Class.name`,
+        and the last part may be a glob pattern (e.g., `Gtk.Tree*`).
+        Returns a list, since e.g. overrides may define a name twice.
+        """
+        namespace, owner, name = split_qualified_name(qualified_name)
+        return self.make_symbols(self.connection.execute(
+            'SELECT id, namespace, owner, name, kind, base, type, '
+            'signature, value FROM symbols '
+            'WHERE namespace = ? AND owner = ? AND name GLOB ? '
+            'ORDER BY name, id', (namespace, owner, name)))
+
+    def get_members(self, namespace, owner):
+        """Get the members of a class, or of a namespace if `owner` is ''"""
+        return self.lookup('{}.{}'.format(
+            namespace, '{}.*'.format(owner) if owner else '*'))
+
+
+def get_qualified_name(symbol: Symbol):
+    return '.'.join(
+        part for part in (symbol.namespace, symbol.owner, symbol.name)
+        if part)
+
+
+def format_symbol(symbol: Symbol):
+    """Format a symbol as a line of stub-like text"""
+    name = get_qualified_name(symbol)
+    if symbol.kind == 'class':
+        return 'class {}{}'.format(
+            name, '({})'.format(symbol.base) if symbol.base else '')
+    if symbol.signature is not None:
+        preamble = ''
+        if symbol.kind in ('staticmethod', 'classmethod'):
+            preamble = '@{} '.format(symbol.kind)
+        return '{}{}{}'.format(preamble, name, symbol.signature)
+    if symbol.kind == 'alias':
+        return '{} = {}'.format(name, symbol.type)
+    if symbol.kind == 'enum-member':
+        return '{}: {} = {}'.format(name, symbol.type, symbol.value)
+    return '{}: {}'.format(name, symbol.type)
+
+
+def symbol_to_dict(symbol: Symbol):
+    """Convert a symbol to a JSON-serialisable dictionary"""
+    result = collections.OrderedDict(symbol._asdict())
+    result['parameters'] = [p._asdict() for p in symbol.parameters]
+    return result
@@ -0,0 +1,835 @@
+"""Stub generation from compiled typelibs, without importing gi
+
+This backend memory-maps a namespace's `.typelib` and decodes its
+header, directory and blobs with `struct` as they're needed, rather than
+loading it with libgirepository. Only the blobs for the names being
+stubbed (and the types they refer to) are ever decoded, and no shared
+libraries are loaded into the generator process.
+
+The reader mirrors the parts of the GIRepository info API that
+`infos.InfoBuilder` uses, so stubs are built in the same way as the
+repository backend's, and the layouts here follow `gitypelib-internal.h`.
+The members that pygobject's override classes add are read from their
+source; see `gityping.overrides`.
+"""
+
+import collections
+import enum
+import logging
+import mmap
+import os
+import struct
+import sysconfig
+from pathlib import Path
+
+from .annotations import GTypeTag
+from .const import (
+    ATTR_IGNORE_LIST,
+    GOBJECT_STATIC_CLASSES,
+    MODULES,
+    PYGI_MODULE_ATTRS,
+)
+from .infos import (
+    Direction,
+    InfoBuilder,
+    InfoTypes,
+    escape_name,
+    unescape_name,
+)
+from .ir import Class, Module, Variable
+from .overrides import add_override_members
+from .render import render_module
+
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'GOBJ\nMETADATA\r\n\x1a'
+MAJOR_VERSION = 4
+
+#: The typelib header, up to and including the blob sizes
+HEADER = struct.Struct('=16sBBxxHHIxxxxxxxxIxxxxIIxxxxxxxx18H')
+
+#: Names of the blob sizes recorded in the header, in order
+BLOB_SIZES = (
+    'entry', 'function', 'callback', 'signal', 'vfunc', 'arg', 'property',
+    'field', 'value', 'attribute', 'constant', 'error_domain', 'signature',
+    'enum', 'struct', 'object', 'interface', 'union',
+)
+
+#: Sizes of the blobs we decode; other sizes mean a different layout
+EXPECTED_BLOB_SIZES = {
+    'entry': 12,
+    'function': 20,
+    'callback': 12,
+    'vfunc': 20,
+    'arg': 16,
+    'field': 16,
+    'value': 12,
+    'constant': 24,
+    'signature': 8,
+    'enum': 24,
+    'struct': 32,
+    'object': 60,
+    'interface': 40,
+    'union': 40,
+}
+
+U8 = struct.Struct('=B')
+U16 = struct.Struct('=H')
+U32 = struct.Struct('=I')
+I32 = struct.Struct('=i')
+
+#: Directory entries, with `offset` being the namespace of non-local ones
+DirEntry = collections.namedtuple(
+    'DirEntry', ['blob_type', 'local', 'name', 'offset'])
+
+
+class BlobType(enum.IntEnum):
+    INVALID = 0
+    FUNCTION = 1
+    CALLBACK = 2
+    STRUCT = 3
+    BOXED = 4
+    ENUM = 5
+    FLAGS = 6
+    OBJECT = 7
+    INTERFACE = 8
+    CONSTANT = 9
+    INVALID_0 = 10
+    UNION = 11
+
+
+def get_typelib_search_path():
+    """Get the directories to look for typelibs in, in order"""
+    search_path = [
+        Path(p)
+        for p in os.environ.get('GI_TYPELIB_PATH', '').split(os.pathsep)
+        if p
+    ]
+    libdirs = ['/usr/local/lib', '/usr/lib64', '/usr/lib']
+    multiarch = sysconfig.get_config_var('MULTIARCH')
+    if multiarch:
+        libdirs.insert(2, '/usr/lib/{}'.format(multiarch))
+    search_path.extend(Path(d) / 'girepository-1.0' for d in libdirs)
+    return search_path
+
+
+def find_typelib(name, version) -> Path:
+    filename = '{}-{}.typelib'.format(name, version)
+    for directory in get_typelib_search_path():
+        typelib_path = directory / filename
+        if typelib_path.exists():
+            return typelib_path
+    raise FileNotFoundError('Couldn\'t find {} in {}'.format(
+        filename, ', '.join(str(d) for d in get_typelib_search_path())))
+
+
+def get_typelib_closure(name, version):
+    """Get a namespace's typelib, followed by all of its dependencies'
+
+    Only the typelibs' headers are read, so unlike requiring the
+    namespace with GI, this doesn't pin any versions.
+    """
+    typelib = get_typelib(name, version)
+    typelibs = [typelib]
+    pending = list(typelib.dependencies.items())
+    seen = {name}
+    while pending:
+        dependency, dependency_version = pending.pop(0)
+        if dependency in seen:
+            continue
+        seen.add(dependency)
+        typelib = get_typelib(dependency, dependency_version)
+        typelibs.append(typelib)
+        pending.extend(typelib.dependencies.items())
+    return typelibs
+
+
+def get_typelib_paths(name, version):
+    """Get the typelibs that a namespace's stub is generated from
+
+    This is the namespace's own typelib, followed by those of all the
+    namespaces it (transitively) depends on.
+    """
+    return [
+        typelib.typelib_path for typelib in get_typelib_closure(name, version)
+    ]
+
+
+class Typelib:
+    """A memory-mapped typelib
+
+    Nothing past the header is decoded until it's asked for.
+    """
+
+    def __init__(self, typelib_path: Path):
+        self.typelib_path = typelib_path
+        with open(str(typelib_path), 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.data) < HEADER.size:
+            raise ValueError('{} is truncated'.format(typelib_path))
+        (
+            magic, major_version, minor_version, self.n_entries,
+            self.n_local_entries, self.directory, dependencies, namespace,
+            nsversion, *blob_sizes
+        ) = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError('{} is not a typelib'.format(typelib_path))
+        if major_version != MAJOR_VERSION:
+            raise ValueError('{} has unsupported version {}.{}'.format(
+                typelib_path, major_version, minor_version))
+
+        self.blob_sizes = dict(zip(BLOB_SIZES, blob_sizes))
+        for blob, size in EXPECTED_BLOB_SIZES.items():
+            if self.blob_sizes[blob] != size:
+                raise ValueError(
+                    '{} has unsupported {} blob size {}'.format(
+                        typelib_path, blob, self.blob_sizes[blob]))
+
+        self.namespace = self.get_string(namespace)
+        self.version = self.get_string(nsversion)
+        self.dependencies = {}
+        if dependencies:
+            for dependency in self.get_string(dependencies).split('|'):
+                name, version = dependency.rsplit('-', 1)
+                self.dependencies[name] = version
+
+        self._entry_indexes = None
+
+    def __repr__(self):
+        return '<Typelib {}-{}>'.format(self.namespace, self.version)
+
+    def close(self):
+        """Unmap the typelib; none of its infos can be used after this"""
+        self.data.close()
+
+    def u8(self, offset):
+        return U8.unpack_from(self.data, offset)[0]
+
+    def u16(self, offset):
+        return U16.unpack_from(self.data, offset)[0]
+
+    def u32(self, offset):
+        return U32.unpack_from(self.data, offset)[0]
+
+    def i32(self, offset):
+        return I32.unpack_from(self.data, offset)[0]
+
+    def get_string(self, offset):
+        end = self.data.find(b'\0', offset)
+        return self.data[offset:end].decode()
+
+    def get_entry(self, index) -> DirEntry:
+        """Decode a directory entry, by its 1-based index"""
+        offset = self.directory + (index - 1) * self.blob_sizes['entry']
+        blob_type, flags, name, entry_offset = struct.unpack_from(
+            '=HHII', self.data, offset)
+        return DirEntry(
+            BlobType(blob_type), bool(flags & 1), self.get_string(name),
+            entry_offset)
+
+    def get_local_names(self):
+        return [
+            self.get_entry(index).name
+            for index in range(1, self.n_local_entries + 1)
+        ]
+
+    def find_entry_index(self, name):
+        if self._entry_indexes is None:
+            self._entry_indexes = {
+                entry_name: index
+                for index, entry_name in enumerate(
+                    self.get_local_names(), 1)
+            }
+        return self._entry_indexes.get(name)
+
+    def find_info(self, name):
+        """Get the info for a local name, or None if there isn't one"""
+        index = self.find_entry_index(name)
+        if index is None:
+            return None
+        return self.get_info(index)
+
+    def get_dependency(self, namespace):
+        """Get the typelib of a (possibly indirect) dependency"""
+        pending = list(self.dependencies.items())
+        seen = set()
+        while pending:
+            name, version = pending.pop(0)
+            if name in seen:
+                continue
+            seen.add(name)
+            typelib = get_typelib(name, version)
+            if name == namespace:
+                return typelib
+            pending.extend(typelib.dependencies.items())
+        raise FileNotFoundError('{} doesn\'t depend on {}'.format(
+            self, namespace))
+
+    def get_info(self, index):
+        """Get the info for a directory entry, loading its typelib if needed
+
+        Returns None if the entry can't be resolved.
+        """
+        entry = self.get_entry(index)
+        if entry.local:
+            return make_info(self, entry.blob_type, entry.offset)
+
+        namespace = self.get_string(entry.offset)
+        if namespace == self.namespace:
+            # Dangling references to names that were left out of this
+            # typelib, e.g., for not being introspectable
+            log.debug('Unresolved reference to {}.{}'.format(
+                namespace, entry.name))
+            return None
+
+        try:
+            typelib = self.get_dependency(namespace)
+        except FileNotFoundError as e:
+            log.error('Couldn\'t resolve {}.{}: {}'.format(
+                namespace, entry.name, e))
+            return None
+        return typelib.find_info(entry.name)
+
+
+#: Typelibs loaded in this process, by namespace and version
+typelibs = {}
+
+
+def get_typelib(namespace, version):
+    try:
+        return typelibs[(namespace, version)]
+    except KeyError:
+        typelib = typelibs[(namespace, version)] = Typelib(
+            find_typelib(namespace, version))
+        return typelib
+
+
+def forget_namespace(namespace):
+    """Drop every cached version of a namespace, e.g., once it's rebuilt"""
+    for key in [key for key in typelibs if key[0] == namespace]:
+        typelibs.pop(key).close()
+
+
+class BaseInfo:
+    """Lazily-decoded view of a blob, mirroring GIBaseInfo"""
+
+    __slots__ = ('typelib', 'offset', 'container')
+
+    #: Offset of the blob's name
+    name_offset = 4
+
+    def __init__(self, typelib: Typelib, offset, container=None):
+        self.typelib = typelib
+        self.offset = offset
+        self.container = container
+
+    def __repr__(self):
+        return '<{} {}.{}>'.format(
+            type(self).__name__, self.get_namespace(), self.get_name())
+
+    def get_name(self):
+        # pygobject escapes keywords in info names
+        return escape_name(self.get_name_unescaped())
+
+    def get_name_unescaped(self):
+        return self.typelib.get_string(
+            self.typelib.u32(self.offset + self.name_offset))
+
+    def get_namespace(self):
+        return self.typelib.namespace
+
+    def get_container(self):
+        return self.container
+
+    @property
+    def __name__(self):
+        return self.get_name()
+
+
+class TypeInfo:
+    """A type, from a simple type blob that may refer to a complex one"""
+
+    __slots__ = ('typelib', 'offset')
+
+    def __init__(self, typelib: Typelib, offset):
+        self.typelib = typelib
+        self.offset = offset
+
+    def get_complex_offset(self):
+        """Get the offset of the complex type blob, or None if simple"""
+        word = self.typelib.u32(self.offset)
+        if word & 0xffffff:
+            return word
+        return None
+
+    def get_tag(self):
+        complex_offset = self.get_complex_offset()
+        if complex_offset is None:
+            return self.typelib.u32(self.offset) >> 27
+        return self.typelib.u8(complex_offset) >> 3
+
+    def is_pointer(self):
+        complex_offset = self.get_complex_offset()
+        if complex_offset is None:
+            return bool(self.typelib.u32(self.offset) >> 24 & 1)
+        return bool(self.typelib.u8(complex_offset) & 1)
+
+    def get_interface(self):
+        return self.typelib.get_info(
+            self.typelib.u16(self.get_complex_offset() + 2))
+
+    def get_param_type(self, n):
+        complex_offset = self.get_complex_offset()
+        if self.get_tag() == GTypeTag.ARRAY:
+            return TypeInfo(self.typelib, complex_offset + 4)
+        if n >= self.typelib.u16(complex_offset + 2):
+            return None
+        return TypeInfo(self.typelib, complex_offset + 4 + 4 * n)
+
+    def get_array_length(self):
+        complex_offset = self.get_complex_offset()
+        if self.typelib.u8(complex_offset + 1) & 0b10:
+            return self.typelib.u16(complex_offset + 2)
+        return -1
+
+
+class EmbeddedCallbackType:
+    """The type of a field with an anonymous callback type
+
+    GI gives these as interface types, whose interface is the callback.
+    """
+
+    __slots__ = ('callback',)
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def get_tag(self):
+        return GTypeTag.INTERFACE
+
+    def is_pointer(self):
+        return True
+
+    def get_interface(self):
+        return self.callback
+
+
+class ArgInfo(BaseInfo):
+    __slots__ = ()
+    name_offset = 0
+
+    def get_direction(self):
+        flags = self.typelib.u32(self.offset + 4)
+        if flags & 0b11 == 0b11:
+            return Direction.INOUT
+        elif flags & 0b10:
+            return Direction.OUT
+        return Direction.IN
+
+    def get_type(self):
+        return TypeInfo(self.typelib, self.offset + 12)
+
+
+class CallableInfo(BaseInfo):
+    __slots__ = ()
+
+    #: Offset of the blob's signature
+    signature_offset = None
+
+    def get_signature(self):
+        return self.typelib.u32(self.offset + self.signature_offset)
+
+    def get_return_type(self):
+        return TypeInfo(self.typelib, self.get_signature())
+
+    def get_arguments(self):
+        signature = self.get_signature()
+        arg_size = self.typelib.blob_sizes['arg']
+        first_arg = signature + self.typelib.blob_sizes['signature']
+        return [
+            ArgInfo(self.typelib, first_arg + n * arg_size)
+            for n in range(self.typelib.u16(signature + 6))
+        ]
+
+
+class FunctionInfo(CallableInfo):
+    __slots__ = ()
+    signature_offset = 12
+
+    def is_constructor(self):
+        return bool(self.typelib.u16(self.offset + 2) & 0b1000)
+
+    def is_method(self):
+        is_static = self.typelib.u16(self.offset + 16) & 1
+        return not (self.is_constructor() or is_static)
+
+
+class CallbackInfo(CallableInfo):
+    __slots__ = ()
+    signature_offset = 8
+
+
+class VFuncInfo(CallableInfo):
+    __slots__ = ()
+    name_offset = 0
+    signature_offset = 16
+
+
+class FieldInfo(BaseInfo):
+    __slots__ = ()
+    name_offset = 0
+
+    def has_embedded_type(self):
+        return bool(self.typelib.u8(self.offset + 4) & 0b100)
+
+    def get_type(self):
+        callback = self.get_embedded_callback()
+        if callback is not None:
+            return EmbeddedCallbackType(callback)
+        return TypeInfo(self.typelib, self.offset + 12)
+
+    def get_embedded_callback(self):
+        """Get the anonymous callback type of the field, if it has one"""
+        if not self.has_embedded_type():
+            return None
+        return CallbackInfo(
+            self.typelib,
+            self.offset + self.typelib.blob_sizes['field'],
+            container=self.container,
+        )
+
+    def get_size(self):
+        """Get the size of the field, including any embedded callback"""
+        size = self.typelib.blob_sizes['field']
+        if self.has_embedded_type():
+            size += self.typelib.blob_sizes['callback']
+        return size
+
+
+class ConstantInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_type(self):
+        return TypeInfo(self.typelib, self.offset + 8)
+
+
+class ValueInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_value(self):
+        if self.typelib.u32(self.offset) & 0b10:
+            return self.typelib.u32(self.offset + 8)
+        return self.typelib.i32(self.offset + 8)
+
+
+class RegisteredTypeInfo(BaseInfo):
+    __slots__ = ()
+
+    def get_blobs(self, start, count, blob_size, info_cls):
+        return [
+            info_cls(self.typelib, start + n * blob_size, container=self)
+            for n in range(count)
+        ]
+
+    def get_fields_from(self, start, count):
+        fields = []
+        for n in range(count):
+            field = FieldInfo(self.typelib, start, container=self)
+            fields.append(field)
+            start += field.get_size()
+        return fields, start
+
+
+class StructInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def is_registered(self):
+        return not self.typelib.u16(self.offset + 2) & 0b10
+
+    def get_fields_end(self):
+        return self.get_fields_from(
+            self.offset + self.typelib.blob_sizes['struct'],
+            self.typelib.u16(self.offset + 20))
+
+    def get_fields(self):
+        return self.get_fields_end()[0]
+
+    def get_methods(self):
+        return self.get_blobs(
+            self.get_fields_end()[1], self.typelib.u16(self.offset + 22),
+            self.typelib.blob_sizes['function'], FunctionInfo)
+
+
+class UnionInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def is_registered(self):
+        return not self.typelib.u16(self.offset + 2) & 0b10
+
+    def get_fields_end(self):
+        return self.get_fields_from(
+            self.offset + self.typelib.blob_sizes['union'],
+            self.typelib.u16(self.offset + 20))
+
+    def get_fields(self):
+        return self.get_fields_end()[0]
+
+    def get_methods(self):
+        return self.get_blobs(
+            self.get_fields_end()[1], self.typelib.u16(self.offset + 22),
+            self.typelib.blob_sizes['function'], FunctionInfo)
+
+
+class EnumInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def is_flags(self):
+        return self.typelib.u16(self.offset) == BlobType.FLAGS
+
+    def get_values(self):
+        return self.get_blobs(
+            self.offset + self.typelib.blob_sizes['enum'],
+            self.typelib.u16(self.offset + 16),
+            self.typelib.blob_sizes['value'], ValueInfo)
+
+    def get_methods(self):
+        sizes = self.typelib.blob_sizes
+        n_values = self.typelib.u16(self.offset + 16)
+        return self.get_blobs(
+            self.offset + sizes['enum'] + n_values * sizes['value'],
+            self.typelib.u16(self.offset + 18),
+            sizes['function'], FunctionInfo)
+
+
+class InterfaceInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def get_counts(self):
+        """Get the numbers of each kind of member, in blob order"""
+        return struct.unpack_from('=6H', self.typelib.data, self.offset + 18)
+
+    def get_members_start(self):
+        n_prerequisites = self.get_counts()[0]
+        return (
+            self.offset + self.typelib.blob_sizes['interface'] +
+            (n_prerequisites + n_prerequisites % 2) * 2
+        )
+
+    def get_methods(self):
+        sizes = self.typelib.blob_sizes
+        (
+            n_prerequisites, n_properties, n_methods, n_signals, n_vfuncs,
+            n_constants,
+        ) = self.get_counts()
+        start = self.get_members_start() + n_properties * sizes['property']
+        return self.get_blobs(
+            start, n_methods, sizes['function'], FunctionInfo)
+
+    def get_constants(self):
+        sizes = self.typelib.blob_sizes
+        (
+            n_prerequisites, n_properties, n_methods, n_signals, n_vfuncs,
+            n_constants,
+        ) = self.get_counts()
+        start = (
+            self.get_members_start() +
+            n_properties * sizes['property'] +
+            n_methods * sizes['function'] +
+            n_signals * sizes['signal'] +
+            n_vfuncs * sizes['vfunc']
+        )
+        return self.get_blobs(
+            start, n_constants, sizes['constant'], ConstantInfo)
+
+
+class ObjectInfo(RegisteredTypeInfo):
+    __slots__ = ()
+
+    def get_parent(self):
+        parent = self.typelib.u16(self.offset + 16)
+        if not parent:
+            return None
+        return self.typelib.get_info(parent)
+
+    def get_class_struct(self):
+        class_struct = self.typelib.u16(self.offset + 18)
+        if not class_struct:
+            return None
+        return self.typelib.get_info(class_struct)
+
+    def get_counts(self):
+        """Get the numbers of each kind of member, in blob order"""
+        return struct.unpack_from('=8H', self.typelib.data, self.offset + 20)
+
+    def get_interfaces(self):
+        start = self.offset + self.typelib.blob_sizes['object']
+        return [
+            self.typelib.get_info(self.typelib.u16(start + 2 * n))
+            for n in range(self.get_counts()[0])
+        ]
+
+    def get_fields_end(self):
+        n_interfaces, n_fields = self.get_counts()[:2]
+        return self.get_fields_from(
+            self.offset + self.typelib.blob_sizes['object'] +
+            (n_interfaces + n_interfaces % 2) * 2,
+            n_fields)
+
+    def get_fields(self):
+        return self.get_fields_end()[0]
+
+    def get_member_blobs(self, member, info_cls):
+        sizes = self.typelib.blob_sizes
+        (
+            n_interfaces, n_fields, n_properties, n_methods, n_signals,
+            n_vfuncs, n_constants, n_field_callbacks,
+        ) = self.get_counts()
+        members = (
+            ('property', n_properties),
+            ('function', n_methods),
+            ('signal', n_signals),
+            ('vfunc', n_vfuncs),
+            ('constant', n_constants),
+        )
+        start = self.get_fields_end()[1]
+        for blob, count in members:
+            if blob == member:
+                return self.get_blobs(start, count, sizes[blob], info_cls)
+            start += count * sizes[blob]
+        raise KeyError(member)
+
+    def get_methods(self):
+        return self.get_member_blobs('function', FunctionInfo)
+
+    def get_vfuncs(self):
+        return self.get_member_blobs('vfunc', VFuncInfo)
+
+    def get_constants(self):
+        return self.get_member_blobs('constant', ConstantInfo)
+
+
+#: Info classes for each kind of directory entry
+INFO_CLASSES = {
+    BlobType.FUNCTION: FunctionInfo,
+    BlobType.CALLBACK: CallbackInfo,
+    BlobType.STRUCT: StructInfo,
+    BlobType.BOXED: StructInfo,
+    BlobType.ENUM: EnumInfo,
+    BlobType.FLAGS: EnumInfo,
+    BlobType.OBJECT: ObjectInfo,
+    BlobType.INTERFACE: InterfaceInfo,
+    BlobType.CONSTANT: ConstantInfo,
+    BlobType.UNION: UnionInfo,
+}
+
+
+def make_info(typelib, blob_type, offset):
+    return INFO_CLASSES[blob_type](typelib, offset)
+
+
+#: The reader's info classes, for `InfoBuilder`
+TYPELIB_INFO_TYPES = InfoTypes(
+    CallableInfo=CallableInfo,
+    CallbackInfo=CallbackInfo,
+    ConstantInfo=ConstantInfo,
+    EnumInfo=EnumInfo,
+    FunctionInfo=FunctionInfo,
+    InterfaceInfo=InterfaceInfo,
+    ObjectInfo=ObjectInfo,
+    RegisteredTypeInfo=RegisteredTypeInfo,
+    StructInfo=StructInfo,
+    UnionInfo=UnionInfo,
+    VFuncInfo=VFuncInfo,
+)
+
+
+class TypelibNamespace(InfoBuilder):
+    """A typelib namespace, standing in for the pygobject module
+
+    This is also the builder for the namespace's stub, and so holds its
+    memoised type annotations.
+    """
+
+    def __init__(self, namespace, version):
+        super().__init__(TYPELIB_INFO_TYPES)
+        self.__name__ = 'gi.repository.{}'.format(namespace)
+        self.typelib = get_typelib(namespace, version)
+
+    def __repr__(self):
+        return '<TypelibNamespace {}-{}>'.format(
+            self.typelib.namespace, self.typelib.version)
+
+
+def load_namespace(name, version=None):
+    """Load a namespace, by default at the version configured in `MODULES`"""
+    return TypelibNamespace(name, version or dict(MODULES)[name])
+
+
+def load_module_attrs(module):
+    """Get the sorted names that a namespace defines"""
+    names = {escape_name(name) for name in module.typelib.get_local_names()}
+    names.update(PYGI_MODULE_ATTRS)
+    if module.typelib.namespace == 'GObject':
+        names.update(GOBJECT_STATIC_CLASSES)
+    return sorted(names)
+
+
+def generate_attr_records(module, attrs):
+    """Generate stub records for the given namespace attributes
+
+    Only the blobs for these attributes are decoded. Classes that
+    pygobject overrides get the members their overrides add. Records are
+    generated in the same order as `attrs`.
+    """
+    namespace = module.typelib.namespace
+    for attr_name in attrs:
+        if attr_name.startswith('__') or attr_name in ATTR_IGNORE_LIST:
+            continue
+        if not attr_name.isidentifier():
+            log.debug('Skipping invalid identifier {}'.format(
+                attr_name))
+            continue
+        if attr_name in PYGI_MODULE_ATTRS:
+            yield attr_name, Variable(
+                attr_name, PYGI_MODULE_ATTRS[attr_name])
+            continue
+        if namespace == 'GObject' and attr_name in GOBJECT_STATIC_CLASSES:
+            yield attr_name, Class(attr_name, None, [])
+            continue
+
+        record = module.build_info_record(
+            attr_name, module.typelib.find_info(unescape_name(attr_name)))
+        if isinstance(record, Class):
+            record = add_override_members(record, namespace, attr_name)
+        if record is not None:
+            yield attr_name, record
+
+
+# Attributes aren't loaded until they're generated, so listing them is
+# the same as loading them; see `gityping.list_module_attrs()`
+list_module_attrs = load_module_attrs
+generate_listed_attr_records = generate_attr_records
+
+
+def build_module_shard(module, index, count):
+    """Build the records for a shard of the namespace; see gityping.py"""
+    attrs = load_module_attrs(module)
+    records = list(generate_attr_records(module, attrs[index::count]))
+    module.typeinfo_cache.log_stats(module)
+    return Module(module.__name__, records)
+
+
+def build_module(module):
+    return build_module_shard(module, 0, 1)
+
+
+def generate_module_records(module):
+    """Generate all of a namespace's records lazily; see gityping.py"""
+    yield from generate_attr_records(module, load_module_attrs(module))
+    module.typeinfo_cache.log_stats(module)
+
+
+def generate_module_stub(module):
+    return render_module(build_module(module))
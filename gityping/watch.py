@@ -0,0 +1,176 @@
+"""Regeneration of stubs when typelibs, GIRs or overrides change
+
+The typelib search path (or, for the GIR backend, the GIR search path)
+and pygobject's overrides directories are watched with inotify. Changes
+are debounced, since rebuilding a library usually rewrites several
+files, and the namespaces whose files changed are then handed to a
+callback in this long-lived process.
+Whether a stub actually needs to be regenerated is still decided by its
+fingerprint; see `gityping.cache`.
+
+Only the GI-free backends can regenerate in a long-lived process, since
+GI can't reload a namespace once it's loaded. The typelibs, GIRs and
+overrides they have read for the changed namespaces are dropped before
+regenerating.
+
+inotify is used directly through libc, so this only works on Linux.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+from pathlib import Path
+
+
+log = logging.getLogger(__name__)
+
+#: Seconds without any changes before regenerating
+DEBOUNCE_SECONDS = 0.5
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+
+#: Events that mean a file in a watched directory has changed
+WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+
+#: The fixed part of `struct inotify_event`, followed by `len` name bytes
+EVENT = struct.Struct('=iIII')
+
+
+class Inotify:
+    """A minimal inotify instance, reporting changed file paths"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        try:
+            self._add_watch = libc.inotify_add_watch
+            init = libc.inotify_init1
+        except AttributeError:
+            raise OSError('inotify isn\'t available on this platform')
+        self._add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+
+        self.fd = init(os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.directories = {}
+
+    def close(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_watch(self, directory: Path, mask=WATCH_MASK):
+        wd = self._add_watch(self.fd, os.fsencode(str(directory)), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        self.directories[wd] = directory
+
+    def read_changes(self, timeout=None):
+        """Wait up to `timeout` seconds for events, and get changed paths"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name and wd in self.directories:
+                changed.add(self.directories[wd] / os.fsdecode(name))
+        return changed
+
+    def wait_for_changes(self, debounce=DEBOUNCE_SECONDS):
+        """Wait for changes, until none have happened for `debounce`"""
+        changed = self.read_changes()
+        while True:
+            more = self.read_changes(debounce)
+            if not more:
+                return changed
+            changed.update(more)
+
+
+def get_watch_dirs(backend):
+    """Get the existing directories that a backend's stubs come from"""
+    from .overrides import get_overrides_dirs
+
+    if backend == 'gir':
+        from .gir import get_gir_search_path
+
+        directories = get_gir_search_path()
+    else:
+        from .typelib import get_typelib_search_path
+
+        directories = get_typelib_search_path()
+    directories += get_overrides_dirs()
+
+    unique = []
+    for directory in directories:
+        if directory.is_dir() and directory not in unique:
+            unique.append(directory)
+    return unique
+
+
+def get_changed_namespace(path: Path):
+    """Get the namespace that a changed file belongs to, if any"""
+    if path.suffix in ('.typelib', '.gir') and '-' in path.stem:
+        return path.stem.rsplit('-', 1)[0]
+    # pygobject's overrides modules are named for their namespaces
+    if path.suffix == '.py' and path.parent.name == 'overrides' and (
+            path.stem != '__init__'):
+        return path.stem
+    return None
+
+
+def forget_namespaces(names):
+    """Drop anything we've read for the given namespaces"""
+    for module_name in (
+            'gityping.gir', 'gityping.overrides', 'gityping.typelib'):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            for name in names:
+                module.forget_namespace(name)
+
+
+def watch_namespaces(backend, on_change, *, debounce=DEBOUNCE_SECONDS):
+    """Call `on_change` with the names of namespaces as they change
+
+    `backend` must be one of the GI-free backends. This never returns.
+    Errors from `on_change` are logged, and watching carries on.
+    """
+    with Inotify() as inotify:
+        for directory in get_watch_dirs(backend):
+            log.debug('Watching {}'.format(directory))
+            inotify.add_watch(directory)
+        log.info('Watching {} directories for changes'.format(
+            len(inotify.directories)))
+
+        while True:
+            changed = inotify.wait_for_changes(debounce)
+            names = set(filter(None, map(get_changed_namespace, changed)))
+            if not names:
+                continue
+
+            forget_namespaces(names)
+            try:
+                on_change(names)
+            except Exception:
+                log.exception('Failed to regenerate stubs')
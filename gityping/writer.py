@@ -0,0 +1,201 @@
+"""Writing generated stubs to disk
+
+Stubs are always written to a temporary file next to their destination
+and only renamed into place if their content differs from what is
+already there. Unchanged stubs keep their mtimes, so type checker caches
+that depend on them stay valid, and readers never see a partial stub.
+
+A namespace is written either as a single stub module or as a stub
+package (see `gityping.package`), depending on the writer's layout.
+Writing a namespace in one layout removes its stubs in the other, so
+that type checkers never see both. Writing it other than incrementally
+also removes its incremental manifest (see `gityping.incremental`),
+which would no longer match the stub.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from .package import PACKAGE_INIT
+
+
+log = logging.getLogger(__name__)
+
+#: Suffix of the incremental manifest kept next to a stub module
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def get_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def file_digest(path: Path):
+    digest = hashlib.sha256()
+    try:
+        with path.open('rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.digest()
+
+
+def get_manifest_path(stub_path: Path) -> Path:
+    return stub_path.with_name(stub_path.name + MANIFEST_SUFFIX)
+
+
+def remove_stub_file(stub_file: Path):
+    stub_file.unlink()
+    log.debug('Removed stub {}'.format(stub_file))
+
+
+class StubWriter:
+    """Writes stub modules under a base path for a single run"""
+
+    def __init__(self, stubs_base_path: Path, layout='module'):
+        self.stubs_base_path = stubs_base_path
+        self.layout = layout
+        self.written = 0
+        self.unchanged = 0
+        self._file_mode = 0o666 & ~get_umask()
+        self._packages = set()
+
+    def get_stub_path(self, module_name: str) -> Path:
+        *parent, name = module_name.split('.')
+        return self.stubs_base_path.joinpath(*parent, '{}.pyi'.format(name))
+
+    def get_package_path(self, module_name: str) -> Path:
+        return self.stubs_base_path.joinpath(*module_name.split('.'))
+
+    def get_namespace_path(self, module_name: str) -> Path:
+        """Get the stub that a namespace's module is written to"""
+        if self.layout == 'package':
+            return self.get_stub_path('{}.{}'.format(
+                module_name, PACKAGE_INIT))
+        return self.get_stub_path(module_name)
+
+    def ensure_package(self, path: Path):
+        """Create a package directory and its parents' package markers
+
+        This is only done once per directory per run, and existing
+        markers are left untouched.
+        """
+        if path in self._packages:
+            return
+        path.mkdir(parents=True, exist_ok=True)
+
+        current = path
+        while current != self.stubs_base_path and (
+                current not in self._packages):
+            package_marker = current / '__init__.py'
+            if not package_marker.exists():
+                package_marker.touch()
+            self._packages.add(current)
+            current = current.parent
+
+    def ensure_stub_package(self, module_name: str) -> Path:
+        """Create the directory for a stub package
+
+        Unlike other packages, this gets no `__init__.py` marker, since
+        its `__init__.pyi` is written as one of its stubs.
+        """
+        path = self.get_package_path(module_name)
+        self.ensure_package(path.parent)
+        path.mkdir(exist_ok=True)
+        self._packages.add(path)
+        return path
+
+    def ensure_module(self, module_name: str) -> Path:
+        stub_file = self.get_stub_path(module_name)
+        self.ensure_package(stub_file.parent)
+        return stub_file
+
+    @contextlib.contextmanager
+    def open_stub(self, module_name: str):
+        """Open a module's stub for writing
+
+        The stub is only replaced if the block completes without error
+        and the written content differs from the existing stub.
+        """
+        stub_file = self.ensure_module(module_name)
+        f = tempfile.NamedTemporaryFile(
+            'w', dir=str(stub_file.parent),
+            prefix='.{}.'.format(stub_file.name), delete=False)
+        temp_file = Path(f.name)
+        try:
+            with f:
+                yield f
+            if file_digest(temp_file) == file_digest(stub_file):
+                log.debug('Stub {} is unchanged'.format(stub_file))
+                self.unchanged += 1
+                return
+            os.chmod(str(temp_file), self._file_mode)
+            os.replace(str(temp_file), str(stub_file))
+            log.debug('Wrote stub {}'.format(stub_file))
+            self.written += 1
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
+
+    def write_stub(self, module_name: str, stub_str: str):
+        with self.open_stub(module_name) as f:
+            f.write(stub_str)
+
+    def write_package(self, module_name: str, stubs):
+        """Write a stub package, given its stubs by relative module name
+
+        Any other stubs left in the package from earlier runs are
+        removed.
+        """
+        package_path = self.ensure_stub_package(module_name)
+        for name, stub_str in stubs.items():
+            self.write_stub('{}.{}'.format(module_name, name), stub_str)
+        for stub_file in package_path.glob('*.pyi'):
+            if stub_file.stem not in stubs:
+                remove_stub_file(stub_file)
+
+    def remove_package(self, module_name: str):
+        """Remove a stub package's stubs, and the package if it's empty"""
+        package_path = self.get_package_path(module_name)
+        if not package_path.is_dir():
+            return
+        for stub_file in package_path.glob('*.pyi'):
+            remove_stub_file(stub_file)
+        try:
+            package_path.rmdir()
+        except OSError as e:
+            log.warning('Not removing stub package {}: {}'.format(
+                package_path, e))
+
+    def remove_manifest(self, module_name: str):
+        """Remove the incremental manifest of a module's stub, if any"""
+        manifest_path = get_manifest_path(self.get_stub_path(module_name))
+        if manifest_path.exists():
+            manifest_path.unlink()
+            log.debug('Removed manifest {}'.format(manifest_path))
+
+    def write_namespace(self, module_name: str, stub):
+        """Write a namespace's stub in the writer's layout
+
+        `stub` is as given by `package.render_namespace()` for the
+        layout.
+        """
+        self.remove_manifest(module_name)
+        if self.layout == 'package':
+            self.write_package(module_name, stub)
+            stub_file = self.get_stub_path(module_name)
+            if stub_file.exists():
+                remove_stub_file(stub_file)
+        else:
+            self.write_stub(module_name, stub)
+            self.remove_package(module_name)
+
+    def log_summary(self):
+        log.info('{} stubs written, {} unchanged'.format(
+            self.written, self.unchanged))
@@ -0,0 +1,16 @@
+from pathlib import Path
+
+from gityping.cache import get_source_paths
+
+
+def test_module_sources_cover_dependencies():
+    import gi
+    gi.require_version('Gio', '2.0')
+
+    source_names = {
+        Path(path).name for path in get_source_paths('Gio', '2.0', 'module')}
+
+    assert {
+        'Gio-2.0.typelib', 'GObject-2.0.typelib', 'GLib-2.0.typelib',
+        'Gio.py', 'GObject.py', 'GLib.py',
+    } <= source_names
@@ -0,0 +1,80 @@
+import pytest
+
+from gityping.discovery import (
+    Node,
+    discover_namespaces,
+    get_generation_order,
+    select_versions,
+)
+from gityping.parallel import generate_stubs
+from gityping.typelib import generate_module_stub, load_namespace
+
+
+@pytest.fixture
+def gio_graph():
+    try:
+        return discover_namespaces(['Gio'])
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+
+
+def test_generation_order_puts_dependencies_first():
+    graph = {
+        'Gtk': Node('3.0', {'Gdk', 'Pango'}),
+        'Pango': Node('1.0', {'GObject'}),
+        'Gdk': Node('3.0', {'GObject', 'Pango'}),
+        'GObject': Node('2.0', {'GLib'}),
+        'GLib': Node('2.0', set()),
+    }
+    assert get_generation_order(graph) == [
+        'GLib', 'GObject', 'Pango', 'Gdk', 'Gtk']
+
+
+def test_generation_order_rejects_cycles():
+    graph = {
+        'A': Node('1.0', {'B'}),
+        'B': Node('1.0', {'A'}),
+        'C': Node('1.0', set()),
+    }
+    with pytest.raises(ValueError, match='A, B'):
+        get_generation_order(graph)
+
+
+def test_select_versions_prefers_configured_versions():
+    available = {
+        'Gtk': ['4.0', '3.0'],
+        'GtkSource': ['4', '3.0'],
+        'Pango': ['1.0'],
+        'Soup': ['3.0', '2.4'],
+    }
+    assert select_versions(available, ['Soup', 'Gtk']) == [
+        ('Soup', '3.0'), ('Gtk', '3.0')]
+
+    # Configured versions that aren't installed fall back to the newest
+    available['GtkSource'] = ['5', '4']
+    assert dict(select_versions(available))['GtkSource'] == '5'
+
+
+def test_discovery_only_includes_dependencies(gio_graph):
+    assert list(gio_graph) == ['GLib', 'GObject', 'Gio']
+    assert gio_graph['Gio'] == Node('2.0', {'GObject'})
+
+
+def test_parallel_generation_follows_dependencies(gio_graph):
+    targets = [(name, node.version) for name, node in gio_graph.items()]
+    dependencies = {
+        (name, node.version): [
+            (dependency, gio_graph[dependency].version)
+            for dependency in node.dependencies
+        ]
+        for name, node in gio_graph.items()
+    }
+
+    stubs = list(generate_stubs(
+        targets[::-1], 3, backend='typelib',
+        dependencies=dependencies))
+
+    assert [name for name, version, stub in stubs] == [
+        'GLib', 'GObject', 'Gio']
+    assert stubs[1][2] == generate_module_stub(
+        load_namespace('GObject', '2.0'))
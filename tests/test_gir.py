@@ -0,0 +1,93 @@
+from pathlib import Path
+
+from gityping.gir import (
+    GirNamespace,
+    build_module_shard,
+    generate_attr_records,
+    generate_module_stub,
+    get_gir_paths,
+    load_module_attrs,
+)
+from gityping.ir import Module
+from gityping.render import render_module
+
+
+GIR_DIR = Path(__file__).resolve().with_name('gir')
+
+
+def test_sample_gir_stub(monkeypatch):
+    monkeypatch.setenv('GI_GIR_PATH', str(GIR_DIR))
+    stub = generate_module_stub(GirNamespace('Sample', '1.0'))
+
+    expected = """import gi.repository.Base
+import gi.repository.GObject
+import typing
+
+
+class Flags(gi.repository.GObject.GFlags):
+    IN = ...  # type: Flags
+    NONE = ...  # type: Flags
+    ...
+MAX_WIDGETS = ...  # type: int
+
+
+class Point:
+    on_change = ...  # type: typing.Callable[[Point], bool]
+    x = ...  # type: float
+    y = ...  # type: float
+    ...
+
+
+class Widget(gi.repository.Base.Thing):
+    def describe(self, flags: 'Flags') -> str: ...
+    def do_draw(self) -> None: ...
+    def foreach(self, func: 'gi.repository.Base.Notify') -> None: ...
+    def get_children(self) -> 'typing.List[Widget]': ...
+    def install_style(self, name: str) -> None: ...
+    parent_instance = ...  # type: gi.repository.Base.Thing
+    def print_(self) -> None: ...
+    ...
+_namespace = ...  # type: str
+_version = ...  # type: str
+def scale(from_: float, points: 'typing.List[Point]', n_points: int) -> 'typing.Tuple[bool, int]': ...
+
+def version() -> str: ...
+"""  # noqa: E501
+    assert stub == expected
+
+
+def test_callback_alias(monkeypatch):
+    monkeypatch.setenv('GI_GIR_PATH', str(GIR_DIR))
+    stub = generate_module_stub(GirNamespace('Base', '1.0'))
+
+    assert 'Notify = typing.Callable[[Thing, typing.Any], typing.Any]' in (
+        stub.splitlines())
+
+
+def test_shadowing_function_name(monkeypatch):
+    monkeypatch.setenv('GI_GIR_PATH', str(GIR_DIR))
+    module = GirNamespace('Sample', '1.0')
+
+    assert 'version' in load_module_attrs(module)
+    [(attr_name, record)] = generate_attr_records(module, ['version'])
+    assert attr_name == record.name == 'version'
+
+
+def test_sharded_gir_matches_serial(monkeypatch):
+    monkeypatch.setenv('GI_GIR_PATH', str(GIR_DIR))
+    expected = generate_module_stub(GirNamespace('Sample', '1.0'))
+
+    members = []
+    for index in range(3):
+        module = GirNamespace('Sample', '1.0')
+        members.extend(build_module_shard(module, index, 3).members)
+
+    assert render_module(Module('gi.repository.Sample', members)) == expected
+
+
+def test_gir_paths_include_dependencies(monkeypatch):
+    monkeypatch.setenv('GI_GIR_PATH', str(GIR_DIR))
+    assert get_gir_paths('Sample', '1.0') == [
+        GIR_DIR / 'Sample-1.0.gir',
+        GIR_DIR / 'Base-1.0.gir',
+    ]
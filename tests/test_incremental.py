@@ -0,0 +1,134 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from gityping import typelib
+from gityping.incremental import generate_incremental
+from gityping.package import render_namespace
+from gityping.writer import StubWriter, get_manifest_path
+
+
+@pytest.fixture
+def gobject():
+    try:
+        return typelib.load_namespace('GObject', '2.0')
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+
+
+def regenerate(writer):
+    return generate_incremental(
+        'typelib', typelib, typelib.load_namespace('GObject', '2.0'), '2.0',
+        writer)
+
+
+def test_incremental_matches_full_generation(gobject, tmp_path):
+    writer = StubWriter(tmp_path)
+    changed = regenerate(writer)
+
+    stub_path = writer.get_stub_path('gi.repository.GObject')
+    assert changed == typelib.load_module_attrs(gobject)
+    assert stub_path.read_text() == typelib.generate_module_stub(gobject)
+    assert get_manifest_path(stub_path).exists()
+
+    assert regenerate(writer) == []
+    assert stub_path.read_text() == typelib.generate_module_stub(gobject)
+
+
+def test_only_changed_symbols_are_rendered(gobject, tmp_path):
+    writer = StubWriter(tmp_path)
+    regenerate(writer)
+    stub_path = writer.get_stub_path('gi.repository.GObject')
+    manifest_path = get_manifest_path(stub_path)
+
+    # Pretend Binding changed, and mark ParamFlags' lines so that we can
+    # tell they were spliced in from the old stub
+    manifest = json.loads(manifest_path.read_text())
+    for symbol in manifest['symbols']:
+        if symbol[0] == 'Binding':
+            symbol[1] = 'stale'
+    manifest_path.write_text(json.dumps(manifest))
+    stub_path.write_text(stub_path.read_text().replace(
+        'class ParamFlags(', 'class ParamFlags (', 1))
+
+    assert regenerate(writer) == ['Binding']
+    expected = typelib.generate_module_stub(gobject)
+    assert stub_path.read_text() == expected.replace(
+        'class ParamFlags(', 'class ParamFlags (', 1)
+
+
+def test_mismatched_manifest_regenerates_everything(gobject, tmp_path):
+    writer = StubWriter(tmp_path)
+    regenerate(writer)
+    stub_path = writer.get_stub_path('gi.repository.GObject')
+    stub_path.write_text(stub_path.read_text() + '\nextra\n')
+
+    assert regenerate(writer) == typelib.load_module_attrs(gobject)
+    assert stub_path.read_text() == typelib.generate_module_stub(gobject)
+
+
+def test_layout_switch_discards_manifest(gobject, tmp_path):
+    regenerate(StubWriter(tmp_path))
+    stub_path = StubWriter(tmp_path).get_stub_path('gi.repository.GObject')
+
+    module = typelib.build_module(gobject)
+    StubWriter(tmp_path, 'package').write_namespace(
+        module.name, render_namespace(module, 'package'))
+    assert not stub_path.exists()
+    assert not get_manifest_path(stub_path).exists()
+
+    # Back in the module layout, nothing is reused from before the switch
+    writer = StubWriter(tmp_path)
+    assert regenerate(writer) == typelib.load_module_attrs(gobject)
+    assert stub_path.read_text() == typelib.generate_module_stub(gobject)
+    assert not writer.get_package_path(module.name).exists()
+
+
+#: Regenerate Gio's stub with the module backend in a fresh process, and
+#: report which attributes were re-rendered and which were loaded
+MODULE_BACKEND_SCRIPT = '''
+import gi
+import json
+import sys
+from pathlib import Path
+gi.require_version('Gio', '2.0')
+from gityping import gityping
+from gityping.incremental import generate_incremental
+from gityping.writer import StubWriter
+module = gityping.load_namespace('Gio')
+changed = generate_incremental(
+    'module', gityping, module, '2.0', StubWriter(Path(sys.argv[1])))
+print(json.dumps([changed, sorted(vars(module._introspection_module))]))
+'''
+
+
+def regenerate_module_backend(stub_dir):
+    result = subprocess.run(
+        [sys.executable, '-c', MODULE_BACKEND_SCRIPT, str(stub_dir)],
+        check=True, universal_newlines=True, stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL)
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_module_backend_only_loads_changed_symbols(tmp_path):
+    gi = pytest.importorskip('gi')
+    gi.require_version('Gio', '2.0')
+    from gi.repository import Gio
+    from gityping import gityping
+
+    regenerate_module_backend(tmp_path)
+    stub_path = StubWriter(tmp_path).get_stub_path('gi.repository.Gio')
+    manifest_path = get_manifest_path(stub_path)
+    manifest = json.loads(manifest_path.read_text())
+    for symbol in manifest['symbols']:
+        if symbol[0] == 'Emblem':
+            symbol[1] = 'stale'
+    manifest_path.write_text(json.dumps(manifest))
+
+    changed, loaded = regenerate_module_backend(tmp_path)
+    assert changed == ['Emblem']
+    assert 'Emblem' in loaded
+    assert 'EmblemedIcon' not in loaded
+    assert stub_path.read_text() == gityping.generate_module_stub(Gio)
@@ -0,0 +1,66 @@
+import pytest
+
+from gityping.discovery import build_matrix
+from gityping.matrix import generate_matrix, get_namespace_graph
+from gityping.typelib import HEADER, find_typelib
+
+
+@pytest.fixture
+def gio_versions(tmp_path, monkeypatch):
+    """Install a copy of Gio-2.0 as a second Gio version, Gio-9.0"""
+    try:
+        gio_path = find_typelib('Gio', '2.0')
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+
+    # GI checks the version in the header, so patch it in place
+    data = bytearray(gio_path.read_bytes())
+    nsversion = HEADER.unpack_from(data)[8]
+    assert data[nsversion:nsversion + 4] == b'2.0\0'
+    data[nsversion:nsversion + 4] = b'9.0\0'
+
+    typelib_dir = tmp_path / 'typelibs'
+    typelib_dir.mkdir()
+    (typelib_dir / 'Gio-9.0.typelib').write_bytes(bytes(data))
+    monkeypatch.setenv('GI_TYPELIB_PATH', str(typelib_dir))
+    return [('Gio', '2.0'), ('Gio', '9.0')]
+
+
+def test_shared_dependencies_are_generated_once(gio_versions):
+    dependencies, trees = get_namespace_graph(build_matrix(gio_versions))
+
+    assert list(dependencies) == [
+        ('GLib', '2.0'), ('GObject', '2.0'), ('Gio', '2.0'), ('Gio', '9.0')]
+    assert dependencies[('Gio', '9.0')] == [('GObject', '2.0')]
+    assert trees[('GObject', '2.0')] == gio_versions
+    assert trees[('Gio', '9.0')] == [('Gio', '9.0')]
+
+
+def test_matrix_writes_version_qualified_trees(gio_versions, tmp_path):
+    stub_base = tmp_path / 'stubs'
+    generate_matrix(gio_versions, stub_base, 2, backend='typelib')
+
+    for tree in ('Gio-2.0', 'Gio-9.0'):
+        stub_dir = stub_base / tree / 'gi' / 'repository'
+        assert sorted(p.name for p in stub_dir.glob('*.pyi')) == [
+            'GLib.pyi', 'GObject.pyi', 'Gio.pyi']
+
+    gio_stubs = [
+        (stub_base / tree / 'gi' / 'repository' / 'Gio.pyi').read_text()
+        for tree in ('Gio-2.0', 'Gio-9.0')
+    ]
+    assert gio_stubs[0] == gio_stubs[1]
+
+
+def test_module_backend_matrix(gio_versions, tmp_path):
+    pytest.importorskip('gi')
+    stub_base = tmp_path / 'stubs'
+    # Fingerprinting both versions mustn't pin either in this process
+    generate_matrix(gio_versions, stub_base, 2, backend='module')
+
+    gio_stubs = [
+        (stub_base / tree / 'gi' / 'repository' / 'Gio.pyi').read_text()
+        for tree in ('Gio-2.0', 'Gio-9.0')
+    ]
+    assert 'class Application(' in gio_stubs[0]
+    assert gio_stubs[0] == gio_stubs[1]
@@ -0,0 +1,48 @@
+from gityping.ir import Class, Function, Module, Parameter, TypeRef
+from gityping.package import get_submodule_name, render_package
+
+
+def test_submodule_names():
+    assert get_submodule_name('Button') == '_b'
+    assert get_submodule_name('bin_new') == '_b'
+    assert get_submodule_name('_2D') == '_other'
+
+
+def test_render_package():
+    widget = TypeRef('gi.repository.Sample', 'Widget')
+    module = Module('gi.repository.Sample', [
+        ('Bin', Class('Bin', widget, [])),
+        ('Box', Class('Box', widget, [])),
+        ('Widget', Class('Widget', TypeRef('gi.repository.Base', 'Thing'), [
+            Function('get_parent', [Parameter('self')], return_type=widget),
+        ])),
+    ])
+
+    stubs = render_package(module)
+
+    assert sorted(stubs) == ['__init__', '_b', '_w']
+    assert stubs['__init__'] == """from ._b import (
+    Bin as Bin,
+    Box as Box,
+)
+from ._w import (
+    Widget as Widget,
+)
+"""
+    assert stubs['_b'] == """import typing
+from ._w import Widget
+
+
+class Bin(Widget):
+    ...
+
+
+class Box(Widget):
+    ..."""
+    assert stubs['_w'].splitlines()[:5] == [
+        'import gi.repository.Base',
+        'import typing',
+        '',
+        '',
+        'class Widget(gi.repository.Base.Thing):',
+    ]
@@ -0,0 +1,17 @@
+import pytest
+
+from gityping.parallel import generate_stubs
+from gityping.typelib import get_typelib
+
+
+def test_workers_log_like_the_cli(capfd):
+    try:
+        get_typelib('GObject', '2.0')
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+
+    targets = [('GLib', '2.0'), ('GObject', '2.0')]
+    list(generate_stubs(targets, 2, backend='typelib', debug=True))
+
+    # Debug logging goes to stdout, in the CLI's format
+    assert '[DEBUG] Generating stubs for' in capfd.readouterr().out
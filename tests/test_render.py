@@ -0,0 +1,97 @@
+import pytest
+
+from gityping.ir import (
+    Alias,
+    CallableType,
+    Class,
+    Function,
+    Module,
+    Parameter,
+    Subscript,
+    TypeRef,
+    Variable,
+)
+from gityping.render import get_imports, render_module
+
+
+def test_imports_come_from_rendered_references():
+    callback = CallableType(
+        [TypeRef('gi.repository.GObject', 'GObject')], None)
+    module = Module('gi.repository.Sample', [
+        ('Thing', Class('Thing', TypeRef('gi.repository.GObject', 'GObject'), [
+            Function('run', [
+                Parameter('self'),
+                Parameter('callback', annotation=callback),
+                Parameter('ready', annotation=TypeRef(
+                    'gi.repository.Gio', 'AsyncReadyCallback')),
+            ]),
+        ])),
+        ('items', Variable('items', Subscript('typing.List', [
+            TypeRef('gi.repository.GLib', 'Variant')]))),
+        ('other', Variable('other', TypeRef('gi.repository.Sample', 'Thing'))),
+    ])
+
+    imports = get_imports(
+        module.name, (record for attr_name, record in module.members))
+
+    assert imports == {
+        'typing', 'gi.repository.Gio', 'gi.repository.GLib',
+        'gi.repository.GObject',
+    }
+    assert render_module(module).splitlines()[:4] == [
+        'import gi.repository.GLib',
+        'import gi.repository.GObject',
+        'import gi.repository.Gio',
+        'import typing',
+    ]
+
+
+def test_callback_aliases():
+    module = Module('gi.repository.Sample', [
+        ('Notify', Alias('Notify', CallableType(
+            [TypeRef('gi.repository.Sample', 'Thing'), 'typing.Any'], None))),
+        ('watch', Function('watch', [
+            Parameter('notify', annotation=TypeRef(
+                'gi.repository.Sample', 'Notify')),
+        ])),
+    ])
+
+    assert render_module(module).splitlines()[1:] == [
+        'Notify = typing.Callable[[Thing, typing.Any], typing.Any]',
+        "def watch(notify: 'Notify'): ...",
+    ]
+
+
+def test_compact_rendering():
+    module = Module('gi.repository.Sample', [
+        ('Empty', Class('Empty', None, [])),
+        ('Thing', Class('Thing', TypeRef('gi.repository.GObject', 'GObject'), [
+            Function('get_variant', [Parameter('self')], return_type=TypeRef(
+                'gi.repository.GLib', 'Variant')),
+            Variable('count', int),
+        ])),
+        ('make', Function('make', [], return_type=TypeRef(
+            'gi.repository.Sample', 'Thing'))),
+    ])
+
+    assert render_module(module, compact=True) == """\
+from gi.repository import GLib
+from gi.repository import GObject
+import typing
+class Empty:
+    ...
+class Thing(GObject.GObject):
+    def get_variant(self) -> GLib.Variant: ...
+    count: int
+def make() -> Thing: ..."""
+
+
+def test_compact_imports_must_not_shadow_names():
+    module = Module('gi.repository.Sample', [
+        ('GLib', Variable('GLib', TypeRef('gi.repository.GLib', 'Variant'))),
+    ])
+
+    assert render_module(module).endswith(
+        'GLib = ...  # type: gi.repository.GLib.Variant')
+    with pytest.raises(ValueError):
+        render_module(module, compact=True)
@@ -0,0 +1,14 @@
+import importlib
+
+import pytest
+
+from gityping import gityping, repository
+
+
+@pytest.mark.parametrize('name', ['GLib', 'GObject', 'Gio'])
+def test_repository_matches_module_backend(name):
+    module = importlib.import_module('gi.repository.{}'.format(name))
+    # The repository backend runs first, since the module backend loads
+    # everything into the module.
+    stub = repository.generate_module_stub(module)
+    assert stub == gityping.generate_module_stub(module)
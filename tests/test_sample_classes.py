@@ -1,5 +1,14 @@
 
-from gityping.gityping import generate_class_stubs
+import importlib
+
+import gi
+import pytest
+
+from gityping.gityping import (
+    generate_class_stubs,
+    generate_module_stub,
+    stub_for,
+)
 
 
 def test_gdk_color():
@@ -30,3 +39,60 @@ class Color:
     ...
 """
     assert stub_lines == foo.splitlines()
+
+
+def split_stub(stub):
+    """Split a stub into its import lines and the rest of its text"""
+    lines = stub.split('\n')
+    imports = [line for line in lines if line.startswith('import ')]
+    return set(imports), '\n'.join(lines[len(imports):])
+
+
+@pytest.mark.parametrize('name', [
+    'GLib.Variant',
+    'GLib.IOChannel',
+    'GLib.DestroyNotify',
+    'GLib.idle_add',
+    'Gio.Application',
+])
+def test_stub_for_matches_module_stub(name):
+    gi.require_version('Gio', '2.0')
+    namespace, _, attr_name = name.partition('.')
+
+    # Get the single stub before anything else loads the whole namespace
+    imports, body = split_stub(stub_for(name))
+    module = importlib.import_module('gi.repository.{}'.format(namespace))
+    module_imports, module_body = split_stub(generate_module_stub(module))
+
+    assert imports <= module_imports
+    assert body.strip() in module_body
+    assert stub_for(name) is stub_for(name)
+
+
+def get_class_stub(stub, name):
+    """Get a class's block from a rendered module stub"""
+    [block] = [
+        block for block in stub.split('\n\n\n')
+        if block.startswith('class {}('.format(name)) or
+        block.startswith('class {}:'.format(name))
+    ]
+    return block
+
+
+def test_module_stub_bases_and_override_members():
+    from gi.repository import GLib
+    stub = generate_module_stub(GLib)
+
+    # Enums and flags subclass pygobject's GEnum and GFlags
+    assert get_class_stub(stub, 'IOCondition').startswith(
+        'class IOCondition(gi.repository.GObject.GFlags):\n')
+    assert get_class_stub(stub, 'IOStatus').startswith(
+        'class IOStatus(gi.repository.GObject.GEnum):\n')
+
+    # Overridden classes keep their GI members, plus the override's own
+    variant = get_class_stub(stub, 'Variant')
+    assert '    def get_int32(self) -> int: ...' in variant
+    assert '    def unpack(self): ...' in variant
+
+    # pygobject exposes Hook.destroy() rather than the destroy field
+    assert '    def destroy(hook_list: ' in get_class_stub(stub, 'Hook')
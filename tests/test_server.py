@@ -0,0 +1,82 @@
+import socket
+import threading
+
+import pytest
+
+from gityping import typelib
+from gityping.render import render_module
+from gityping.server import (
+    RequestError,
+    StubClient,
+    StubServer,
+    StubService,
+    remove_stale_socket,
+)
+
+
+@pytest.fixture(scope='module')
+def service():
+    service = StubService('typelib', [('GObject', '2.0')])
+    try:
+        service.load()
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+    return service
+
+
+@pytest.fixture
+def client(service, tmp_path):
+    server = StubServer(tmp_path / 'stubs.sock', service)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        with StubClient(tmp_path / 'stubs.sock') as client:
+            yield client
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def test_requests(client):
+    gobject = typelib.load_namespace('GObject', '2.0')
+    assert client.request('namespace', 'GObject') == render_module(
+        typelib.build_module(gobject))
+
+    binding = client.request('class', 'GObject.Binding', compact=True)
+    assert binding.startswith('import typing\nclass Binding(GObject):\n')
+    assert client.request('signature', 'GObject.Binding.unbind') == [
+        'unbind(self) -> None']
+    # GObject.Object's record is named GObject, but it's looked up by name
+    assert '\nclass GObject:\n' in client.request('class', 'GObject.Object')
+    assert client.request('signature', 'GObject.Object.notify') == [
+        'notify(self, property_name: str) -> None']
+
+    for kind, name in [
+            ('namespace', 'Gtk'), ('class', 'GObject.signal_new'),
+            ('signature', 'GObject.Binding.missing'), ('signature', 'GObject'),
+            ('signature', 'GObject.GObject.notify'), ('bogus', 'GObject')]:
+        with pytest.raises(RequestError):
+            client.request(kind, name)
+
+    metrics = client.request('metrics')['requests']
+    assert {
+        kind: (kind_metrics['count'], kind_metrics['errors'])
+        for kind, kind_metrics in metrics.items()
+    } == {
+        'namespace': (2, 1),
+        'class': (3, 1),
+        'signature': (5, 3),
+        'invalid': (1, 1),
+    }
+    for kind_metrics in metrics.values():
+        assert kind_metrics['max_ms'] >= kind_metrics['p95_ms'] >= (
+            kind_metrics['median_ms'])
+
+
+def test_stale_socket_is_removed(tmp_path):
+    socket_path = tmp_path / 'stubs.sock'
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(str(socket_path))
+    remove_stale_socket(socket_path)
+    assert not socket_path.exists()
@@ -0,0 +1,17 @@
+from gityping.gityping import (
+    build_module_shard,
+    generate_module_stub,
+)
+from gityping.ir import Module
+from gityping.render import render_module
+
+
+def test_sharded_glib_matches_serial():
+    from gi.repository import GLib
+    expected = generate_module_stub(GLib)
+
+    members = []
+    for index in range(3):
+        members.extend(build_module_shard(GLib, index, 3).members)
+
+    assert render_module(Module(GLib.__name__, members)) == expected
@@ -0,0 +1,58 @@
+import re
+import subprocess
+import sys
+
+
+#: Modules that only the commands themselves should import
+DEFERRED_MODULES = (
+    'gi', 'gityping.gityping', 'multiprocessing', 'cProfile', 'json',
+    'logging.config',
+)
+
+HELP_SCRIPT = '''
+import sys
+from gityping.main import main
+try:
+    main(['--help'])
+except SystemExit:
+    pass
+print(' '.join(sorted(sys.modules)))
+'''
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable] + list(args), check=True, universal_newlines=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def get_import_times(statement):
+    """Get the cumulative import time in microseconds of each module"""
+    result = run_python('-X', 'importtime', '-c', statement)
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$', line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def test_help_does_not_import_backends():
+    output = run_python('-c', HELP_SCRIPT).stdout.splitlines()
+    modules = set(output[-1].split())
+    assert 'click' in modules
+    assert not modules.intersection(DEFERRED_MODULES)
+
+
+def test_startup_is_dominated_by_click():
+    # Import click first so that the stdlib modules it shares with
+    # gityping are counted against it, and take the best of a few runs
+    # since import times are noisy.
+    runs = [
+        get_import_times('import click; import gityping.main')
+        for _ in range(3)
+    ]
+    click_time = min(times['click'] for times in runs)
+    gityping_time = min(times['gityping.main'] for times in runs)
+
+    assert gityping_time < click_time
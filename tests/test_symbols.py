@@ -0,0 +1,82 @@
+import pytest
+
+from gityping.ir import (
+    Alias,
+    CallableType,
+    Class,
+    EnumMember,
+    Function,
+    Parameter,
+    TypeRef,
+    Variable,
+)
+from gityping.symbols import SymbolDatabase, format_symbol
+
+
+@pytest.fixture
+def database(tmp_path):
+    widget = TypeRef('gi.repository.Sample', 'Widget')
+    with SymbolDatabase(tmp_path / 'symbols.sqlite') as db:
+        db.begin_namespace('Sample')
+        for record in [
+            Class('Widget', TypeRef('gi.repository.Base', 'Thing'), [
+                Function(
+                    'get_parent', [Parameter('self')], return_type=widget),
+                Function(
+                    'new', [Parameter('name', str, default='x')],
+                    return_type=widget, decorator='staticmethod'),
+                Variable('parent', widget),
+            ]),
+            Class('Flags', TypeRef('gi.repository.GObject', 'GFlags'), [
+                EnumMember('NONE', 'Flags', 0),
+            ]),
+            Alias('Callback', CallableType([widget], bool)),
+        ]:
+            db.add_record('Sample', record)
+        db.finish_namespace('Sample', '1.0', 'abc')
+        yield db
+
+
+def test_lookup(database):
+    assert database.get_fingerprint('Sample') == 'abc'
+    assert database.get_fingerprint('Other') is None
+
+    symbol, = database.lookup('Sample.Widget.new')
+    assert symbol.kind == 'staticmethod'
+    assert symbol.type == 'Sample.Widget'
+    assert [tuple(p) for p in symbol.parameters] == [
+        ('name', 'positional_or_keyword', 'str', "'x'")]
+    assert [format_symbol(s) for s in database.lookup('Sample.*')] == [
+        'Sample.Callback = typing.Callable[[Sample.Widget], bool]',
+        'class Sample.Flags(GObject.GFlags)',
+        'class Sample.Widget(Base.Thing)',
+    ]
+    assert database.lookup('Sample.Missing') == []
+    with pytest.raises(ValueError):
+        database.lookup('Sample')
+
+
+def test_members(database):
+    assert [
+        format_symbol(s) for s in database.get_members('Sample', 'Widget')
+    ] == [
+        'Sample.Widget.get_parent(self) -> Sample.Widget',
+        "@staticmethod Sample.Widget.new(name: str = 'x') -> Sample.Widget",
+        'Sample.Widget.parent: Sample.Widget',
+    ]
+    assert [
+        format_symbol(s) for s in database.get_members('Sample', 'Flags')
+    ] == ['Sample.Flags.NONE: Sample.Flags = 0']
+
+
+def test_namespace_is_replaced(database):
+    database.begin_namespace('Sample')
+    database.add_record('Sample', Class('Widget', None, []))
+    database.finish_namespace('Sample', '2.0', 'def')
+
+    assert database.get_fingerprint('Sample') == 'def'
+    assert len(database.lookup('Sample.*')) == 1
+    assert database.get_members('Sample', 'Widget') == []
+    count, = database.connection.execute(
+        'SELECT COUNT(*) FROM parameters').fetchone()
+    assert count == 0
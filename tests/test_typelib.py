@@ -0,0 +1,102 @@
+import os
+import re
+
+import pytest
+
+import gityping.typelib
+
+from gityping.const import GOBJECT_STATIC_CLASSES
+from gityping.ir import Function, Module, Parameter, TypeRef
+from gityping.pipeline import stream_module_stub
+from gityping.render import render_module
+from gityping.typelib import (
+    TypelibNamespace,
+    build_module,
+    build_module_shard,
+    generate_attr_records,
+    generate_module_stub,
+    forget_namespace,
+    get_typelib,
+    load_namespace,
+)
+from gityping.writer import StubWriter
+
+
+@pytest.fixture
+def gobject():
+    try:
+        return TypelibNamespace('GObject', '2.0')
+    except FileNotFoundError as e:
+        pytest.skip(str(e))
+
+
+def test_typelib_header(gobject):
+    typelib = get_typelib('GObject', '2.0')
+    assert typelib.namespace == 'GObject'
+    assert typelib.version == '2.0'
+    assert typelib.dependencies == {'GLib': '2.0'}
+    assert 'Binding' in typelib.get_local_names()
+
+
+def test_forgotten_typelib_is_unmapped(gobject):
+    typelib = get_typelib('GObject', '2.0')
+    forget_namespace('GObject')
+    assert typelib.data.closed
+    assert get_typelib('GObject', '2.0') is not typelib
+
+
+def test_typelib_class_records(gobject):
+    [(attr_name, binding)] = generate_attr_records(gobject, ['Binding'])
+    assert attr_name == 'Binding'
+    assert binding.base == TypeRef('gi.repository.GObject', 'GObject')
+
+    methods = {m.name: m for m in binding.members}
+    assert methods['get_source_property'] == Function(
+        'get_source_property', [Parameter('self')], return_type=str)
+
+
+def test_sharded_typelib_matches_serial(gobject):
+    expected = generate_module_stub(gobject)
+
+    members = []
+    for index in range(3):
+        module = TypelibNamespace('GObject', '2.0')
+        members.extend(build_module_shard(module, index, 3).members)
+
+    assert render_module(Module(gobject.__name__, members)) == expected
+
+
+def test_compact_stream_matches_render(gobject, tmp_path):
+    writer = StubWriter(tmp_path)
+    stream_module_stub(gityping.typelib, gobject, writer, compact=True)
+
+    expected = render_module(build_module(gobject), compact=True)
+    stub_path = writer.get_stub_path('gi.repository.GObject')
+    assert stub_path.read_text() == expected
+    assert 'gi.repository.GLib.' not in expected
+
+
+def test_gobject_bases_are_defined(gobject, tmp_path):
+    mypy = pytest.importorskip('mypy.api')
+    writer = StubWriter(tmp_path)
+    for name in ('GLib', 'GObject', 'Gio'):
+        module = build_module(load_namespace(name, '2.0'))
+        writer.write_namespace(module.name, render_module(module))
+
+    stdout, _, _ = mypy.run([
+        '--config-file=', '--no-incremental', '--cache-dir', os.devnull,
+        str(tmp_path / 'gi' / 'repository'),
+    ])
+    undefined = set(re.findall(
+        r'Name "(?:gi\.repository\.GObject\.)?(\w+)" is not defined',
+        stdout))
+    assert not undefined & set(GOBJECT_STATIC_CLASSES)
+
+
+def test_typelib_matches_repository_backend(gobject):
+    pytest.importorskip('gi')
+    from gityping import repository
+
+    module = repository.load_namespace('Gio')
+    stub = generate_module_stub(load_namespace('Gio', '2.0'))
+    assert stub == repository.generate_module_stub(module)
@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+from gityping.main import main
+from gityping.watch import Inotify, get_changed_namespace
+
+
+@pytest.fixture
+def inotify():
+    try:
+        with Inotify() as inotify:
+            yield inotify
+    except OSError as e:
+        pytest.skip(str(e))
+
+
+def test_changes_are_debounced(inotify, tmp_path):
+    inotify.add_watch(tmp_path)
+    for name in ('Gtk-3.0.typelib', 'Gdk-3.0.typelib'):
+        (tmp_path / name).write_bytes(b'')
+    (tmp_path / 'Gtk-3.0.typelib').write_bytes(b'rebuilt')
+
+    changed = inotify.wait_for_changes(debounce=0.1)
+
+    assert changed == {
+        tmp_path / 'Gtk-3.0.typelib', tmp_path / 'Gdk-3.0.typelib'}
+    assert inotify.read_changes(timeout=0) == set()
+
+
+@pytest.mark.parametrize('path, namespace', [
+    ('/usr/lib/girepository-1.0/GtkSource-3.0.typelib', 'GtkSource'),
+    ('/usr/share/gir-1.0/Gtk-4.0.gir', 'Gtk'),
+    ('/usr/lib/python3/dist-packages/gi/overrides/Gtk.py', 'Gtk'),
+    ('/usr/lib/python3/dist-packages/gi/overrides/__init__.py', None),
+    ('/usr/lib/girepository-1.0/.Gtk-3.0.typelib.swp', None),
+])
+def test_changed_namespace(path, namespace):
+    assert get_changed_namespace(Path(path)) == namespace
+
+
+def test_watch_needs_gi_free_backend(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        main(['generate', '--watch', '--backend', 'module'])
+
+    assert excinfo.value.code == 2
+    assert '--watch is only supported' in capsys.readouterr().err
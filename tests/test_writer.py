@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from gityping.writer import StubWriter
+
+
+def test_write_stub_creates_packages(tmp_path):
+    writer = StubWriter(tmp_path)
+    writer.write_stub('gi.repository.Gdk', 'import typing\n')
+
+    assert (tmp_path / 'gi' / 'repository' / 'Gdk.pyi').read_text() == (
+        'import typing\n')
+    assert (tmp_path / 'gi' / '__init__.py').exists()
+    assert (tmp_path / 'gi' / 'repository' / '__init__.py').exists()
+    assert not (tmp_path / '__init__.py').exists()
+    assert (writer.written, writer.unchanged) == (1, 0)
+
+
+def test_unchanged_stub_is_not_replaced(tmp_path):
+    StubWriter(tmp_path).write_stub('gi.repository.Gdk', 'import typing\n')
+    stub_file = tmp_path / 'gi' / 'repository' / 'Gdk.pyi'
+    before = os.stat(str(stub_file))
+
+    writer = StubWriter(tmp_path)
+    writer.write_stub('gi.repository.Gdk', 'import typing\n')
+
+    after = os.stat(str(stub_file))
+    assert (before.st_ino, before.st_mtime_ns) == (
+        after.st_ino, after.st_mtime_ns)
+    assert (writer.written, writer.unchanged) == (0, 1)
+    assert sorted(os.listdir(str(stub_file.parent))) == [
+        'Gdk.pyi', '__init__.py']
+
+
+def test_failed_write_keeps_existing_stub(tmp_path):
+    writer = StubWriter(tmp_path)
+    writer.write_stub('gi.repository.Gdk', 'import typing\n')
+
+    with pytest.raises(RuntimeError):
+        with writer.open_stub('gi.repository.Gdk') as f:
+            f.write('partial')
+            raise RuntimeError
+
+    stub_file = tmp_path / 'gi' / 'repository' / 'Gdk.pyi'
+    assert stub_file.read_text() == 'import typing\n'
+    assert sorted(os.listdir(str(stub_file.parent))) == [
+        'Gdk.pyi', '__init__.py']
+
+
+def test_write_namespace_replaces_other_layout(tmp_path):
+    stub = 'import typing\n'
+    StubWriter(tmp_path).write_namespace('gi.repository.Gdk', stub)
+
+    writer = StubWriter(tmp_path, 'package')
+    writer.write_namespace('gi.repository.Gdk', {
+        '__init__': 'from ._w import (\n    Window as Window,\n)\n',
+        '_w': 'class Window: ...\n',
+    })
+
+    repository = tmp_path / 'gi' / 'repository'
+    assert sorted(os.listdir(str(repository))) == ['Gdk', '__init__.py']
+    assert sorted(os.listdir(str(repository / 'Gdk'))) == [
+        '__init__.pyi', '_w.pyi']
+    assert writer.get_namespace_path('gi.repository.Gdk') == (
+        repository / 'Gdk' / '__init__.pyi')
+
+    StubWriter(tmp_path).write_namespace('gi.repository.Gdk', stub)
+    assert sorted(os.listdir(str(repository))) == ['Gdk.pyi', '__init__.py']